@@ -1,10 +1,10 @@
 import logging
 from flask import Flask
 from .config import Config
-from .models.depth_model import model
+from .services.inference_pool import depth_model
 
 # Import blueprints
-from .routes import health_bp, depth_bp, models_bp, splat_bp
+from .routes import health_bp, depth_bp, models_bp, splat_bp, video_bp, jobs_bp
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -19,9 +19,11 @@ def create_app(config_class=Config):
     app.register_blueprint(depth_bp)
     app.register_blueprint(models_bp)
     app.register_blueprint(splat_bp)
+    app.register_blueprint(video_bp)
+    app.register_blueprint(jobs_bp)
     
     # Initialize Model on startup with default model
     logger.info(f"Initializing application with default model: {Config.DEFAULT_MODEL}")
-    model.initialize(Config.DEFAULT_MODEL)
+    depth_model.initialize(Config.DEFAULT_MODEL)
         
     return app
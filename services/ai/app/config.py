@@ -15,6 +15,9 @@ class Config:
             "name": "Small",
             "params": "25M",
             "memory": "~100MB",
+            "memory_mb": 100,  # Estimate used by the model pool for admission
+            "precision": os.environ.get("DEPTH_PRECISION_SMALL", "fp32"),  # fp32 or int8 (CPU only)
+            "backend": os.environ.get("DEPTH_BACKEND_SMALL", "torch"),  # torch or onnx (ONNX Runtime, CPU only)
             "description": "Fast, good for previews",
         },
         "base": {
@@ -22,6 +25,9 @@ class Config:
             "name": "Base",
             "params": "97M",
             "memory": "~400MB",
+            "memory_mb": 400,  # Estimate used by the model pool for admission
+            "precision": os.environ.get("DEPTH_PRECISION_BASE", "fp32"),  # fp32 or int8 (CPU only)
+            "backend": os.environ.get("DEPTH_BACKEND_BASE", "torch"),  # torch or onnx (ONNX Runtime, CPU only)
             "description": "Balanced quality/speed",
         },
         "large": {
@@ -29,6 +35,9 @@ class Config:
             "name": "Large",
             "params": "335M",
             "memory": "~1.3GB",
+            "memory_mb": 1300,  # Estimate used by the model pool for admission
+            "precision": os.environ.get("DEPTH_PRECISION_LARGE", "fp32"),  # fp32 or int8 (CPU only)
+            "backend": os.environ.get("DEPTH_BACKEND_LARGE", "torch"),  # torch or onnx (ONNX Runtime, CPU only)
             "description": "Best detail (hair, fences)",
         },
     }
@@ -36,10 +45,58 @@ class Config:
     # Default model (environment variable or fallback to small for dev)
     DEFAULT_MODEL = os.environ.get("DEPTH_MODEL", "small")
     
+    # Inference worker processes per lane (0 runs inference inside the HTTP worker)
+    DEPTH_INFERENCE_WORKERS = int(os.environ.get("DEPTH_INFERENCE_WORKERS", 0))
+    SPLAT_INFERENCE_WORKERS = int(os.environ.get("SPLAT_INFERENCE_WORKERS", 0))
+    # Concurrent inference calls per worker process (0 sizes it from the lane:
+    # scheduler concurrency for depth so batches can coalesce, 1 for splat)
+    INFERENCE_WORKER_THREADS = int(os.environ.get("INFERENCE_WORKER_THREADS", 0))
+    
+    # Memory budget for resident depth models; least recently used are evicted beyond it
+    MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", 2048))
+    
     # Processing Limits
     MAX_VIDEO_FRAMES = 100
     MAX_VIDEO_DURATION = 300  # seconds
     BATCH_SIZE = 10
+    MAX_BATCH_IMAGES = int(os.environ.get("DEPTH_BATCH_MAX_IMAGES", 64))
+    
+    # Micro-batching: concurrent /api/depth requests arriving within the window
+    # are coalesced into one forward pass (window 0 disables coalescing)
+    DEPTH_BATCH_WINDOW_MS = float(os.environ.get("DEPTH_BATCH_WINDOW_MS", 10))
+    DEPTH_MAX_BATCH_SIZE = int(os.environ.get("DEPTH_MAX_BATCH_SIZE", 8))
+    
+    # Scheduler: every model call runs in a lane slot. Free slots go to the
+    # lowest "priority" value first; full queues are answered with 429 + Retry-After
+    SCHEDULER_MAX_CONCURRENT = int(os.environ.get("SCHEDULER_MAX_CONCURRENT", 8))
+    SCHEDULER_LANES = {
+        "interactive_depth": {"priority": 0, "concurrency": DEPTH_MAX_BATCH_SIZE, "max_queue": 32},
+        "interactive_splat": {"priority": 1, "concurrency": 1, "max_queue": 4},
+        "bulk_depth": {"priority": 2, "concurrency": 2, "max_queue": 64},
+        "video": {"priority": 3, "concurrency": 1, "max_queue": 2},
+    }
+    
+    # Depth result cache: encoded maps keyed by image hash + model + output
+    # parameters. Memory tier per process; the disk tier (0 disables) is shared
+    DEPTH_CACHE_MEMORY_MB = float(os.environ.get("DEPTH_CACHE_MEMORY_MB", 64))
+    DEPTH_CACHE_DISK_MB = float(os.environ.get("DEPTH_CACHE_DISK_MB", 0))
+    
+    # Generated splats kept under TEMP_DIR/splat-cache (least recently used evicted)
+    SPLAT_CACHE_DISK_MB = float(os.environ.get("SPLAT_CACHE_DISK_MB", 2048))
+    
+    # Depth model behind quality=preview splats (see utils.preview_splats)
+    SPLAT_PREVIEW_MODEL = os.environ.get("SPLAT_PREVIEW_MODEL", "small")
+    if SPLAT_PREVIEW_MODEL not in AVAILABLE_MODELS:
+        raise ValueError(f"SPLAT_PREVIEW_MODEL must be one of {list(AVAILABLE_MODELS)}, not '{SPLAT_PREVIEW_MODEL}'")
+    
+    # SHARP precision: fp32, or bf16 autocast (CPU/CUDA; ~2x faster on CPUs with AVX512-BF16/AMX)
+    SHARP_PRECISION = os.environ.get("SHARP_PRECISION", "fp32")
+    
+    # Asynchronous jobs (/api/jobs): background threads, how long finished jobs
+    # and their files are kept, and how many unfinished jobs are accepted
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOB_TTL_SECONDS = float(os.environ.get("JOB_TTL_SECONDS", 3600))
+    MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", 16))
     
     # Paths
     TEMP_DIR = os.environ.get("TEMP_DIR", "/tmp/immichvr-ai")
@@ -0,0 +1,356 @@
+"""
+Lean Depth Anything V2 inference on tensors.
+
+The transformers depth-estimation pipeline round-trips every request through
+PIL: generic preprocessing on a PIL image, bicubic upsampling of the
+prediction back to the input size, conversion to a PIL image, after which
+the caller converts to NumPy again to normalize. At 12 MP inputs those
+conversions are a measurable share of the CPU time per request.
+
+DepthEngine instead loads the network through AutoModelForDepthEstimation,
+resizes and normalizes the uint8 input on the model's device, returns the
+raw predicted_depth tensor, and turns it into an 8-bit (or 16-bit) map in
+one fused upsample + min/max stretch + cast step.
+"""
+import logging
+import os
+import tempfile
+import warnings
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+
+# Depth Anything V2 preprocessing: ImageNet statistics, ViT-14 patches, 518 px short side
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+INPUT_SIZE = 518
+PATCH_SIZE = 14
+
+# fp32: weights as published; int8: dynamic quantization of the ViT Linear layers (CPU only)
+DEPTH_PRECISIONS = ("fp32", "int8")
+
+# torch: eager PyTorch on any device; onnx: ONNX Runtime on CPU (see onnx_engine)
+DEPTH_BACKENDS = ("torch", "onnx")
+
+# Share of the fp32 memory estimate left after int8 quantization (Linear weights dominate the ViT)
+PRECISION_MEMORY_FACTOR = {"fp32": 1.0, "int8": 0.35}
+
+
+def torch_device(device) -> torch.device:
+    """Map a pipeline-style device (-1 CPU, N CUDA index, 'mps') to a torch.device."""
+    if device == -1:
+        return torch.device("cpu")
+    if isinstance(device, int):
+        return torch.device("cuda", device)
+    return torch.device(device)
+
+
+def image_shape(image) -> tuple:
+    """(height, width) of a PIL image or an HxWx3 array."""
+    if hasattr(image, 'height'):
+        return image.height, image.width
+    return tuple(image.shape[:2])
+
+
+def input_shape(height: int, width: int, size: int = INPUT_SIZE, multiple: int = PATCH_SIZE) -> tuple:
+    """
+    Network input shape for an image: aspect ratio kept, short side at least size,
+    both sides multiples of the patch size (Depth Anything's 'lower_bound' resize).
+    """
+    scale = size / min(height, width)
+
+    def constrain(value):
+        rounded = int(round(value / multiple) * multiple)
+        return rounded if rounded >= size else int(np.ceil(value / multiple) * multiple)
+
+    return constrain(height * scale), constrain(width * scale)
+
+
+def load_pretrained(model_id: str):
+    """
+    Load a Depth Anything model from the Hugging Face cache, downloading it if needed.
+
+    low_cpu_mem_usage builds the modules on the meta device and assigns the
+    memory-mapped safetensors weights, skipping the random initialization
+    and the second copy of every weight. local_files_only avoids the Hub
+    round trips when the model is cached, which is most of a reload's time
+    after an idle unload.
+    """
+    from transformers import AutoModelForDepthEstimation
+
+    try:
+        return AutoModelForDepthEstimation.from_pretrained(model_id, low_cpu_mem_usage=True, local_files_only=True)
+    except OSError:
+        # Not in the cache yet
+        return AutoModelForDepthEstimation.from_pretrained(model_id, low_cpu_mem_usage=True)
+
+
+def quantize_int8(model):
+    """
+    Dynamically quantize the backbone's Linear layers to int8, in place.
+
+    Weights are stored as int8 and activations are quantized per batch at run
+    time, so no calibration data is needed. The convolutional DPT head stays
+    fp32: it is a small share of the compute and the most sensitive to
+    precision.
+    """
+    backbone = getattr(model, "backbone", model)
+    torch.ao.quantization.quantize_dynamic(backbone, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _int8_cache_path(model_id: str, cache_dir: str) -> str:
+    """Cache file for a quantized model; pickled modules are only valid for the library versions that wrote them."""
+    import transformers
+    name = f"{model_id.replace('/', '--')}-int8-torch{torch.__version__}-transformers{transformers.__version__}.pt"
+    return os.path.join(cache_dir, name)
+
+
+def output_shape(image_hw: tuple, prediction_hw: tuple, output: dict = None) -> tuple:
+    """
+    Shape to return a depth map at.
+
+    Args:
+        image_hw: (height, width) of the input image
+        prediction_hw: (height, width) of the raw prediction
+        output: Optional 'resolution' ('input' or 'native', the model's own
+                resolution), 'scale' (fraction, at most 1) and 'max_size'
+                (bound on the longer side); 'source_shape' stands in for
+                image_hw when the image was decoded at reduced size.
+                None returns the input size
+
+    Returns:
+        (height, width), never larger than the chosen base resolution
+    """
+    if not output:
+        return tuple(image_hw)
+    if output.get("resolution") == "native":
+        height, width = prediction_hw
+    else:
+        height, width = output.get("source_shape") or image_hw
+
+    scale = output.get("scale") or 1.0
+    if output.get("max_size"):
+        scale = min(scale, output["max_size"] / max(height, width))
+    if scale >= 1.0:
+        return height, width
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+
+# Maps stretched to the full 8 or 16-bit range, or the raw values at half precision
+DEPTH_DTYPES = ("uint8", "uint16", "float16")
+
+
+def postprocess_depth(predicted_depth: torch.Tensor, size: tuple = None, dtype: str = "uint8") -> dict:
+    """
+    Upsample a raw prediction and convert it in one pass on its device.
+
+    Args:
+        predicted_depth: (h, w) relative depth as returned by the network
+        size: Output (height, width); the prediction's own shape if None
+        dtype: 'uint8' or 'uint16' to stretch min/max to the full range,
+               'float16' to keep the model's values
+
+    Returns:
+        dict: 'depth', a (height, width) array of dtype (a uniform prediction
+              maps to mid-range), and the prediction's 'depth_min' / 'depth_max'
+    """
+    with torch.inference_mode():
+        depth = predicted_depth[None, None].float()
+        if size is not None and tuple(size) != tuple(depth.shape[-2:]):
+            depth = F.interpolate(depth, size=tuple(size), mode="bicubic", align_corners=False)
+        else:
+            # Never scale the caller's tensor in place
+            depth = depth.clone()
+
+        low, high = (float(value) for value in torch.aminmax(depth))
+        result = {"depth_min": low, "depth_max": high}
+
+        if dtype == "float16":
+            result["depth"] = depth[0, 0].to(torch.float16).cpu().numpy()
+            return result
+
+        peak = 255 if dtype == "uint8" else 65535
+        if high - low < 1e-10:
+            result["depth"] = np.full(depth.shape[-2:], (peak + 1) // 2, dtype=dtype)
+            return result
+
+        stretched = depth.sub_(low).mul_(peak / (high - low))[0, 0]
+        if dtype == "uint8":
+            result["depth"] = stretched.to(torch.uint8).cpu().numpy()
+        else:
+            # torch has no general uint16 support; int32 carries the values across
+            result["depth"] = stretched.round_().to(torch.int32).cpu().numpy().astype(np.uint16)
+        return result
+
+
+class DepthEngine:
+    """
+    A loaded Depth Anything network plus tensor pre/post-processing.
+
+    Args:
+        model: AutoModelForDepthEstimation instance, already on device
+        device: torch.device the model lives on
+        batch_size: Images per forward pass when predicting several at once
+        precision: Key of DEPTH_PRECISIONS the model was loaded with
+    """
+
+    backend = "torch"
+
+    def __init__(self, model, device: torch.device, batch_size: int = 8, precision: str = "fp32"):
+        self.model = model
+        self.device = device
+        self.batch_size = batch_size
+        self.precision = precision
+
+        # (x / 255 - mean) / std folded into one multiply-add
+        std = torch.tensor(IMAGENET_STD, device=device).view(1, 3, 1, 1)
+        mean = torch.tensor(IMAGENET_MEAN, device=device).view(1, 3, 1, 1)
+        self._scale = 1 / (255 * std)
+        self._shift = mean / std
+
+    @classmethod
+    def load(cls, model_id: str, device, batch_size: int = 8, precision: str = "fp32",
+             cache_dir: str = None) -> "DepthEngine":
+        """
+        Load model_id from the Hugging Face cache (downloading if needed) onto device.
+
+        Args:
+            model_id: Hugging Face repository of the model
+            device: Pipeline-style device (see torch_device)
+            batch_size: Images per forward pass
+            precision: Key of DEPTH_PRECISIONS
+            cache_dir: Where int8 models are kept after the first quantization (None disables)
+
+        Raises:
+            ValueError: If precision is unknown or not supported on device
+        """
+        if precision not in DEPTH_PRECISIONS:
+            raise ValueError(f"Precision must be one of {list(DEPTH_PRECISIONS)}")
+        device = torch_device(device)
+
+        if precision == "int8":
+            # Quantized kernels exist for CPU only
+            if device.type != "cpu":
+                raise ValueError("int8 precision is only supported on CPU")
+            model = cls._load_int8(model_id, cache_dir)
+        else:
+            model = load_pretrained(model_id)
+            model.to(device)
+        model.eval()
+        return cls(model, device, batch_size, precision)
+
+    @staticmethod
+    def _load_int8(model_id: str, cache_dir: str = None):
+        """The int8 model from cache_dir, quantizing the fp32 weights (and caching the result) on a miss."""
+        path = _int8_cache_path(model_id, cache_dir) if cache_dir else None
+        if path and os.path.exists(path):
+            logger.info(f"Loading quantized model from {path}")
+            # Written by _load_int8 below; packed quantized weights need full unpickling
+            return torch.load(path, weights_only=False, mmap=True)
+
+        logger.info(f"Quantizing {model_id} to int8...")
+        model = quantize_int8(load_pretrained(model_id))
+
+        if path:
+            tmp_path = None
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+                with os.fdopen(fd, 'wb') as f:
+                    torch.save(model, f)
+                os.replace(tmp_path, path)
+                logger.info(f"Cached quantized model at {path}")
+            except OSError as e:
+                logger.warning(f"Could not cache quantized model: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+        return model
+
+    def preprocess(self, image) -> torch.Tensor:
+        """
+        Turn an RGB image into a (1, 3, h, w) network input on the model's device.
+
+        Only the uint8 pixels are moved; conversion to float happens on the
+        device, and the antialiased resize runs before normalization.
+        """
+        with warnings.catch_warnings():
+            # Pillow hands out read-only arrays; the tensor is never written to
+            warnings.simplefilter("ignore", UserWarning)
+            pixels = torch.from_numpy(np.asarray(image))
+        pixels = pixels.to(self.device, non_blocking=True).permute(2, 0, 1)[None].float()
+
+        pixels = F.interpolate(pixels, size=input_shape(*pixels.shape[-2:]), mode="bicubic",
+                               align_corners=False, antialias=True)
+        return pixels.mul_(self._scale).sub_(self._shift)
+
+    def infer(self, images: list) -> list:
+        """
+        Raw predicted_depth for each image, batching images that share an input shape.
+
+        Args:
+            images: PIL Images or HxWx3 uint8 RGB arrays
+
+        Returns:
+            list: One (h, w) float tensor per image, on the model's device
+        """
+        buckets = {}
+        for index, image in enumerate(images):
+            pixel_values = self.preprocess(image)
+            buckets.setdefault(tuple(pixel_values.shape[-2:]), []).append((index, pixel_values))
+
+        if len(images) > 1:
+            logger.info(f"Batched depth: {len(images)} images in {len(buckets)} shape bucket(s)")
+
+        results = [None] * len(images)
+        for entries in buckets.values():
+            for start in range(0, len(entries), self.batch_size):
+                chunk = entries[start:start + self.batch_size]
+                predicted = self._forward(torch.cat([pixel_values for _, pixel_values in chunk]))
+
+                for (index, _), predicted_depth in zip(chunk, predicted):
+                    results[index] = predicted_depth
+        return results
+
+    def _forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """(n, h, w) predicted_depth for a (n, 3, h, w) batch of network inputs."""
+        with torch.inference_mode():
+            return self.model(pixel_values=batch.to(self.model.dtype)).predicted_depth
+
+    def predict(self, images: list, outputs: list = None) -> list:
+        """
+        Depth maps, at each image's own size unless its output options say otherwise.
+
+        Args:
+            images: PIL Images or HxWx3 uint8 RGB arrays
+            outputs: Optional output options per image: size (see output_shape)
+                     and 'dtype' (see postprocess_depth, default uint8)
+
+        Returns:
+            list: One postprocess_depth result per image
+        """
+        outputs = outputs or [None] * len(images)
+        results = []
+        for image, output, predicted_depth in zip(images, outputs, self.infer(images)):
+            size = output_shape(image_shape(image), tuple(predicted_depth.shape[-2:]), output)
+            results.append(postprocess_depth(predicted_depth, size, (output or {}).get("dtype", "uint8")))
+        return results
+
+
+class MockDepthEngine(DepthEngine):
+    """Stand-in for E2E tests: returns a gradient instead of running a network."""
+
+    def __init__(self, precision: str = "fp32", backend: str = "torch"):
+        self.device = torch.device("cpu")
+        self.batch_size = 1
+        self.precision = precision
+        self.backend = backend
+
+    def infer(self, images: list) -> list:
+        results = []
+        for image in images:
+            height, width = image_shape(image)
+            results.append(torch.linspace(0, 255, width * height).reshape(height, width))
+        return results
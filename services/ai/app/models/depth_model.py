@@ -2,9 +2,19 @@ import logging
 import torch
 import gc
 import os
-from transformers import pipeline
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager
 from huggingface_hub import scan_cache_dir
 from ..config import Config
+from ..utils.locks import ReadWriteLock
+from ..utils.memory import track_memory
+from .model_pool import ModelPool
+from .depth_engine import DepthEngine, MockDepthEngine, DEPTH_BACKENDS, DEPTH_PRECISIONS, PRECISION_MEMORY_FACTOR
+from .onnx_engine import OnnxDepthEngine
 
 logger = logging.getLogger(__name__)
 
@@ -12,18 +22,144 @@ logger = logging.getLogger(__name__)
 MOCK_DOWNLOADS = os.getenv('MOCK_DOWNLOADS', 'false').lower() == 'true'
 
 
+class RequestCoalescer:
+    """
+    Collects concurrent single-image requests and runs them as one batch,
+    fanning the results back out to the waiting callers.
+    
+    Each model key has its own queue and worker thread, so requests for one
+    model never wait behind another model's forward pass. A request that
+    finds its queue empty runs at once; only when others are already waiting
+    does the worker hold the batch open for up to window_ms to fill it.
+    """
+    
+    def __init__(self, run_batch, window_ms: float, max_batch_size: int):
+        self._run_batch = run_batch
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._queues = {}   # model key -> queue of (image, output, future)
+        self._workers = {}  # model key -> worker thread
+        self._worker_lock = threading.Lock()
+        
+        # Batch size histogram for tuning the window under real load
+        self._histogram = Counter()
+        self._stats_lock = threading.Lock()
+
+    def submit(self, image, model_key: str = None, output: dict = None):
+        """Queue an image and block until its batch has been processed."""
+        future = Future()
+        self._queue_for(model_key).put((image, output, future))
+        return future.result()
+
+    def _queue_for(self, model_key: str) -> queue.Queue:
+        """The queue of model_key, (re)starting its worker if needed."""
+        with self._worker_lock:
+            if model_key not in self._queues:
+                self._queues[model_key] = queue.Queue()
+            worker = self._workers.get(model_key)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(target=self._loop, args=(model_key, self._queues[model_key]), daemon=True)
+                self._workers[model_key] = worker
+                worker.start()
+            return self._queues[model_key]
+
+    def _collect(self, requests: queue.Queue) -> list:
+        """Next batch: what is already queued, topped up within the window only if the queue was busy."""
+        batch = [requests.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(requests.get_nowait())
+            except queue.Empty:
+                break
+        if len(batch) == 1:
+            # A lone request runs immediately
+            return batch
+        
+        deadline = time.monotonic() + self.window_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self, model_key: str, requests: queue.Queue):
+        logger.info(f"Request coalescer started for {model_key or 'current model'}. "
+                    f"Window: {self.window_ms}ms, max batch: {self.max_batch_size}")
+        while True:
+            batch = self._collect(requests)
+            with self._stats_lock:
+                self._histogram[len(batch)] += 1
+            try:
+                results = self._run_batch([image for image, _, _ in batch], model_key,
+                                          [output for _, output, _ in batch])
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            histogram = dict(sorted(self._histogram.items()))
+        batches = sum(histogram.values())
+        requests = sum(size * count for size, count in histogram.items())
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": round(requests / batches, 2) if batches else 0,
+            "batch_size_histogram": histogram,
+        }
+
+
+class ModelState:
+    """Lifecycle states of the depth model."""
+    UNLOADED = "unloaded"
+    LOADING = "loading"
+    READY = "ready"
+    UNLOADING = "unloading"
+
+
 class DepthModel:
-    """Multi-model depth estimation manager supporting model switching."""
+    """
+    Multi-model depth estimation manager supporting model switching.
+    
+    Several model variants stay resident in a ModelPool bounded by
+    Config.MODEL_MEMORY_BUDGET_MB; loading one that does not fit evicts the
+    least recently used. Inference runs under the shared side of a
+    reader/writer lock, so requests execute concurrently, while load, unload
+    and switch take the exclusive side and never pull an engine out from
+    under a running inference.
+    """
     
     def __init__(self):
-        self._pipeline = None
+        self._pool = ModelPool(Config.MODEL_MEMORY_BUDGET_MB)
         self.device = -1
         self.current_model_key = None
         self._model_status = {}
+        self._load_stats = {}  # model key -> time and memory of its last load
+        
+        # Lifecycle: state transitions only happen under the write lock
+        self.state = ModelState.UNLOADED
+        self._lock = ReadWriteLock()
         
         # Mock state for testing
         self._mock_downloaded = set()  # Models marked as downloaded in mock mode
         
+        # Coalesce concurrent single-image requests into micro-batches
+        self._coalescer = None
+        if Config.DEPTH_BATCH_WINDOW_MS > 0 and Config.DEPTH_MAX_BATCH_SIZE > 1:
+            self._coalescer = RequestCoalescer(
+                self._run_batch,
+                Config.DEPTH_BATCH_WINDOW_MS,
+                Config.DEPTH_MAX_BATCH_SIZE,
+            )
+        
         # Idle timeout management
         self.last_used = 0
         self.timeout_minutes = 30
@@ -33,23 +169,23 @@ class DepthModel:
 
     def _start_monitor(self):
         """Start background thread to monitor idle time."""
-        import threading
-        import time
-        
         def monitor_loop():
             logger.info(f"Idle monitor started. Timeout: {self.timeout_minutes} mins")
             while not self._stop_monitor:
-                if self._pipeline is not None:
-                    elapsed_mins = (time.time() - self.last_used) / 60
-                    if elapsed_mins > self.timeout_minutes:
-                        logger.info(f"Model idle for {elapsed_mins:.1f} mins. Unloading...")
-                        self._unload_current_model()
+                timeout_seconds = self.timeout_minutes * 60
+                if self._pool.idle_keys(timeout_seconds):
+                    with self._lock.write():
+                        # Re-check: a request may have used a model while we waited
+                        for key in self._pool.idle_keys(timeout_seconds):
+                            logger.info(f"Model {key} idle for over {self.timeout_minutes} mins. Unloading...")
+                            self._unload_locked(key)
                 time.sleep(60) # Check every minute
                 
         self._monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
         self._monitor_thread.start()
 
-    def initialize(self, model_key: str = None, device_type: str = 'auto'):
+    def initialize(self, model_key: str = None, device_type: str = 'auto', precision: str = None,
+                   backend: str = None):
         """
         Initialize a specific depth model.
         
@@ -57,11 +193,19 @@ class DepthModel:
             model_key: Which model to load (small, base, large). 
                       Defaults to Config.DEFAULT_MODEL.
             device_type: 'auto', 'cpu', or 'gpu'
+            precision: 'fp32' or 'int8' (CPU only); None keeps a resident model's
+                       precision, else uses the model's configured one
+            backend: 'torch' or 'onnx' (ONNX Runtime, CPU only); None as for precision
         
         Returns:
             bool: True if initialization succeeded
         """
-        import time
+        with self._lock.write():
+            return self._initialize_locked(model_key, device_type, precision, backend)
+
+    def _initialize_locked(self, model_key: str = None, device_type: str = 'auto', precision: str = None,
+                           backend: str = None) -> bool:
+        """Load a model. Caller must hold the write lock."""
         self.last_used = time.time()
         
         model_key = model_key or Config.DEFAULT_MODEL
@@ -70,88 +214,126 @@ class DepthModel:
             logger.error(f"Unknown model key: {model_key}")
             return False
         
-        # If already loaded with same key AND same device type, maybe skip?
-        # For simplicity, if they forcefully request a device, we might want to reload to be sure.
-        # But if it's strictly 'auto' and we are already loaded, we can likely skip.
-        if self._pipeline is not None and self.current_model_key == model_key:
-             # Basic check: if they want CPU and we are on GPU (device 0), reload.
-             # If they want GPU and we are on CPU (device -1), reload.
-             current_device_is_gpu = (self.device != -1 and self.device != "cpu")
-             requested_cpu = (device_type == 'cpu')
-             requested_gpu = (device_type == 'gpu')
-             
-             if requested_cpu and current_device_is_gpu:
-                 logger.info("Reloading to switch to CPU")
-             elif requested_gpu and not current_device_is_gpu:
-                 logger.info("Reloading to switch to GPU")
-             else:
-                 logger.info(f"Model {model_key} already loaded on compatible device")
-                 return True
+        if precision is not None and precision not in DEPTH_PRECISIONS:
+            logger.error(f"Unknown precision: {precision}")
+            return False
+        
+        if backend is not None and backend not in DEPTH_BACKENDS:
+            logger.error(f"Unknown backend: {backend}")
+            return False
+        
+        # 'auto' keeps whatever device the resident models are already on
+        if device_type == 'auto' and len(self._pool):
+            target_device = self.device
+        else:
+            target_device = self._resolve_device(device_type)
+        
+        # All resident models share one device; moving device means reloading them
+        if len(self._pool) and target_device != self.device:
+            logger.info(f"Device change requested ({self.device} -> {target_device}). Unloading resident models")
+            self._unload_locked()
+        
+        resident = self._pool.peek(model_key)
+        if resident is not None and (precision not in (None, resident.precision)
+                                     or backend not in (None, resident.backend)):
+            logger.info(f"Engine change requested for {model_key} ({resident.backend}/{resident.precision} -> "
+                        f"{backend or resident.backend}/{precision or resident.precision}). Reloading")
+            self._unload_locked(model_key)
+        elif resident is not None:
+            self._pool.get(model_key)
+            self.current_model_key = model_key
+            logger.info(f"Model {model_key} already loaded on compatible device")
+            return True
+        
+        model_config = Config.AVAILABLE_MODELS[model_key]
+        precision = precision or model_config.get("precision", "fp32")
+        backend = backend or model_config.get("backend", "torch")
         
         try:
-            logger.info(f"Initializing Depth Anything V2 model: {model_key} [Device: {device_type}]...")
+            logger.info(f"Initializing Depth Anything V2 model: {model_key} [Device: {device_type}, Backend: {backend}, Precision: {precision}]...")
             
-            # Unload current model if exists
-            if self._pipeline is not None:
-                self._unload_current_model()
+            # Make room in the memory budget, least recently used first
+            memory_mb = model_config["memory_mb"] * PRECISION_MEMORY_FACTOR[precision]
+            evicted = self._pool.evict_for(memory_mb)
+            if evicted:
+                logger.info(f"Evicting {[key for key, _ in evicted]} to fit {model_key} ({memory_mb}MB) "
+                            f"in {self._pool.budget_mb}MB budget")
+                del evicted
+                self._free_memory()
+                if self.current_model_key not in self._pool:
+                    self.current_model_key = None
+            
+            self.state = ModelState.LOADING
+            self.device = target_device
             
-            # Mock mode: create fake pipeline
+            # Mock mode: create fake engine
             if MOCK_DOWNLOADS:
-                logger.info("MOCK MODE: Creating fake pipeline")
-                self.device = -1
-                self._pipeline = self._create_mock_pipeline()
+                logger.info("MOCK MODE: Creating fake depth engine")
+                self._pool.add(model_key, MockDepthEngine(precision, backend), memory_mb)
                 self.current_model_key = model_key
                 self._mock_downloaded.add(model_key)
+                self.state = ModelState.READY
                 logger.info(f"Mock model {model_key} initialized")
                 return True
             
-            # Determine device
-            # Default to CPU (-1)
-            target_device = -1 
-            
-            if device_type == 'cpu':
-                target_device = -1
-                logger.info("Forcing usage of CPU")
-            else:
-                # 'auto' or 'gpu'
-                if torch.cuda.is_available():
-                    target_device = 0 # CUDA device 0
-                    logger.info("CUDA GPU is available. Using CUDA.")
-                elif torch.backends.mps.is_available():
-                     target_device = "mps" # Apple Silicon
-                     logger.info("Apple MPS is available. Using MPS.")
-                else:
-                    if device_type == 'gpu':
-                        logger.warning("GPU requested but neither CUDA nor MPS is available. Falling back to CPU.")
-                    target_device = -1
-            
-            self.device = target_device
-            device_name = "CPU"
-            if self.device == 0: device_name = "CUDA GPU"
-            elif self.device == "mps": device_name = "Apple MPS"
-            
+            device_name = self._device_name()
             logger.info(f"Using device: {device_name}")
             
             # Get model ID from registry
-            model_config = Config.AVAILABLE_MODELS[model_key]
             model_id = model_config["id"]
             
-            # Initialize depth estimation pipeline
-            self._pipeline = pipeline(
-                task="depth-estimation",
-                model=model_id,
-                device=self.device
-            )
+            # Load the network directly; pre/post-processing runs on tensors
+            with track_memory() as load_stats:
+                if backend == "onnx":
+                    engine = OnnxDepthEngine.load(
+                        model_id,
+                        self.device,
+                        batch_size=Config.BATCH_SIZE,
+                        precision=precision,
+                        cache_dir=os.path.join(Config.MODEL_CACHE_DIR, "onnx"),
+                    )
+                else:
+                    engine = DepthEngine.load(
+                        model_id,
+                        self.device,
+                        batch_size=Config.BATCH_SIZE,
+                        precision=precision,
+                        cache_dir=os.path.join(Config.MODEL_CACHE_DIR, "quantized"),
+                    )
+            self._load_stats[model_key] = load_stats
+            logger.info(f"Loaded {model_key} in {load_stats['seconds']}s, peak RSS {load_stats['peak_rss_mb']}MB")
             
+            self._pool.add(model_key, engine, memory_mb)
             self.current_model_key = model_key
-            logger.info(f"Model {model_key} initialized successfully on {device_name}")
+            self.state = ModelState.READY
+            logger.info(f"Model {model_key} initialized successfully on {device_name} "
+                        f"(resident: {self._pool.keys()}, {self._pool.used_mb}/{self._pool.budget_mb}MB)")
             return True
             
         except Exception as e:
             logger.error(f"Failed to initialize model {model_key}: {str(e)}")
-            self._pipeline = None
-            self.current_model_key = None
+            self.state = ModelState.READY if len(self._pool) else ModelState.UNLOADED
             return False
+
+    def _resolve_device(self, device_type: str = 'auto'):
+        """Map a requested device type to a pipeline device (-1 CPU, 0 CUDA, 'mps')."""
+        if MOCK_DOWNLOADS or device_type == 'cpu':
+            return -1
+        
+        # 'auto' or 'gpu'
+        if torch.cuda.is_available():
+            return 0 # CUDA device 0
+        if torch.backends.mps.is_available():
+            return "mps" # Apple Silicon
+        if device_type == 'gpu':
+            logger.warning("GPU requested but neither CUDA nor MPS is available. Falling back to CPU.")
+        return -1
+
+    def _device_name(self) -> str:
+        if self.device == 0: return "CUDA GPU"
+        if self.device == "mps": return "Apple MPS"
+        return "CPU"
+
     def download_model(self, model_key: str) -> bool:
         """
         Download a model's files without loading it into memory.
@@ -190,100 +372,183 @@ class DepthModel:
             logger.error(f"Failed to download model {model_key}: {str(e)}")
             return False
 
-    def _unload_current_model(self):
-        """Unload current model and free memory."""
-        if self._pipeline is not None:
-            logger.info(f"Unloading model: {self.current_model_key}")
-            del self._pipeline
-            self._pipeline = None
-            self.current_model_key = None
-            
-            # Force garbage collection (multiple passes)
-            gc.collect()
-            gc.collect()
-            
-            # Clear CUDA cache if using GPU
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-                torch.cuda.ipc_collect()
-                logger.info("Cleared CUDA cache")
+    def unload_model(self, model_key: str = None) -> bool:
+        """
+        Unload a resident model and free its memory.
+        
+        Args:
+            model_key: Model to unload; all resident models if None
             
-            # Clear MPS cache if using Apple Silicon
-            if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-                try:
-                    torch.mps.empty_cache()
-                    logger.info("Cleared MPS cache")
-                except Exception as e:
-                    logger.warning(f"Failed to clear MPS cache: {e}")
-
-    def switch_model(self, model_key: str, device_type: str = 'auto') -> bool:
+        Returns:
+            bool: True if anything was unloaded
         """
-        Switch to a different model variant or device.
+        with self._lock.write():
+            return self._unload_locked(model_key)
+
+    def _unload_locked(self, model_key: str = None) -> bool:
+        """Unload one or all resident models. Caller must hold the write lock."""
+        keys = [model_key] if model_key else self._pool.keys()
+        unloaded = False
+        
+        for key in keys:
+            engine = self._pool.remove(key)
+            if engine is None:
+                continue
+            logger.info(f"Unloading model: {key}")
+            self.state = ModelState.UNLOADING
+            del engine
+            unloaded = True
+        
+        if self.current_model_key not in self._pool:
+            resident = self._pool.keys()
+            self.current_model_key = resident[-1] if resident else None
+        
+        # UNLOADING stays visible until the memory has actually been released
+        if unloaded:
+            self._free_memory()
+        self.state = ModelState.READY if len(self._pool) else ModelState.UNLOADED
+        return unloaded
+
+    def _free_memory(self):
+        """Return memory of dropped engines to the system and device allocators."""
+        # Force garbage collection (multiple passes)
+        gc.collect()
+        gc.collect()
+        
+        # Clear CUDA cache if using GPU
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            torch.cuda.ipc_collect()
+            logger.info("Cleared CUDA cache")
+        
+        # Clear MPS cache if using Apple Silicon
+        if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+            try:
+                torch.mps.empty_cache()
+                logger.info("Cleared MPS cache")
+            except Exception as e:
+                logger.warning(f"Failed to clear MPS cache: {e}")
+
+    def switch_model(self, model_key: str, device_type: str = 'auto', precision: str = None,
+                     backend: str = None) -> bool:
+        """
+        Switch to a different model variant, device, precision or backend.
         
         Args:
             model_key: Target model (small, base, large)
             device_type: 'auto', 'cpu', 'gpu'
+            precision: 'fp32', 'int8' or None (see initialize)
+            backend: 'torch', 'onnx' or None (see initialize)
             
         Returns:
             bool: True if switch succeeded
         """
-        import time
         self.last_used = time.time()
         
         # We now check device compatibility inside initialize
-        logger.info(f"Switching to {model_key} (Device: {device_type})")
-        return self.initialize(model_key, device_type)
+        logger.info(f"Switching to {model_key} (Device: {device_type}, Backend: {backend or 'default'}, "
+                    f"Precision: {precision or 'default'})")
+        return self.initialize(model_key, device_type, precision, backend)
+
+    def resolve_model_key(self, model_key: str = None) -> str:
+        """The model a predict() call with model_key would use."""
+        return model_key or self.current_model_key or Config.DEFAULT_MODEL
+
+    def engine_variant(self, model_key: str) -> dict:
+        """
+        Engine settings predict() runs model_key with: the resident engine's,
+        else the model's configured ones. Results differ between variants, so
+        they belong in cache keys.
+        """
+        engine = self._pool.peek(model_key)
+        if engine is not None:
+            return {"precision": engine.precision, "backend": engine.backend}
+        model_config = Config.AVAILABLE_MODELS[model_key]
+        return {"precision": model_config.get("precision", "fp32"), "backend": model_config.get("backend", "torch")}
 
-    def predict(self, image, model_key: str = None):
+    def predict(self, image, model_key: str = None, output: dict = None):
         """
         Generate depth prediction for an image.
         
         Args:
-            image: PIL Image
+            image: PIL Image or HxWx3 uint8 RGB array
             model_key: Optional model to use (will switch if different)
+            output: Optional output options ('resolution', 'scale', 'max_size',
+                    'dtype'); by default the depth map is uint8 at the image's size
             
         Returns:
-            dict: Result containing 'depth' map (PIL Image)
+            dict: Result containing the 'depth' map (array, stretched to the full range
+                  unless dtype is float16), 'depth_min' / 'depth_max' of the
+                  prediction and the 'model' key used
         """
-        import time
-        self.last_used = time.time()
+        if self._coalescer is not None:
+            return self._coalescer.submit(image, model_key, output)
         
-        # Auto-initialize if unloaded OR if switching is requested
-        if self._pipeline is None:
-            logger.info("Model unloaded. Auto-initializing...")
-            if not self.initialize(model_key):
-                raise RuntimeError(f"Failed to auto-initialize model: {model_key or 'default'}")
-                
-        elif model_key and model_key != self.current_model_key:
-            if not self.switch_model(model_key):
-                raise RuntimeError(f"Failed to switch to model: {model_key}")
+        return self._run_batch([image], model_key, [output])[0]
+
+    def _run_batch(self, images: list, model_key: str = None, outputs: list = None) -> list:
+        """Run images, each with its own output options, through one batched prediction."""
+        with self._acquire(model_key) as (used_key, engine):
+            results = engine.predict(images, outputs)
+        return [{**result, "model": used_key} for result in results]
+
+    def predict_batch(self, images: list, model_key: str = None, outputs: list = None) -> list:
+        """
+        Generate depth predictions for several images with batched forward passes.
         
-        if self._pipeline is None:
-             raise RuntimeError("Model initialization failed unexpectedly")
+        Images are preprocessed individually and bucketed by the shape of their
+        input tensor, so photos sharing an aspect ratio are stacked and run
+        through the network up to Config.BATCH_SIZE at a time.
         
-        return self._pipeline(image)
+        Args:
+            images: List of PIL Images or RGB arrays
+            model_key: Optional model to use (will switch if different)
+            outputs: Optional output size options per image (see predict)
+            
+        Returns:
+            list: One result dict per input image, in input order
+        """
+        return self._run_batch(images, model_key, outputs)
 
+    @contextmanager
+    def _acquire(self, model_key: str = None):
+        """
+        Yield (model key, engine) for the requested (or current) model, loading it if needed.
+        
+        Inference only ever runs under the shared lock. If the model is not
+        resident, the exclusive lock is taken just for the load and residency
+        is checked again under the shared lock, since another thread may evict
+        the model in between. Threads queued behind an in-progress load find
+        the model resident and do not load it a second time.
+        """
+        while True:
+            with self._lock.read():
+                resolved_key = model_key or self.current_model_key
+                engine = self._pool.get(resolved_key) if resolved_key else None
+                if engine is not None:
+                    # current_model_key only changes under the write lock
+                    self.last_used = time.time()
+                    yield resolved_key, engine
+                    return
+            
+            with self._lock.write():
+                if not self._initialize_locked(model_key or self.current_model_key):
+                    raise RuntimeError(f"Failed to load model: {model_key or 'default'}")
 
     @property
     def is_loaded(self) -> bool:
         """Check if any model is currently loaded."""
-        return self._pipeline is not None
-
-    def _create_mock_pipeline(self):
-        """Create a mock pipeline for testing."""
-        from PIL import Image
-        import numpy as np
-        
-        class MockPipeline:
-            def __call__(self, image):
-                # Return a simple gradient as fake depth map
-                width, height = image.size
-                depth_array = np.linspace(0, 255, width * height).reshape(height, width)
-                depth_image = Image.fromarray(depth_array.astype(np.uint8))
-                return {"depth": depth_image}
-        
-        return MockPipeline()
-    
+        return len(self._pool) > 0
+
+    @property
+    def loaded_models(self) -> list:
+        """Resident model keys, least recently used first."""
+        return self._pool.keys()
+
+    def get_loaded_models(self) -> list:
+        """Method form of loaded_models, callable through the inference pool."""
+        return self.loaded_models
+
     def _get_downloaded_models(self) -> list:
         """
         Scan Hugging Face cache to see which models are actually downloaded.
@@ -291,10 +556,7 @@ class DepthModel:
         """
         # Mock mode: return mock downloaded list
         if MOCK_DOWNLOADS:
-            downloaded = list(self._mock_downloaded)
-            if self.current_model_key and self.current_model_key not in downloaded:
-                downloaded.append(self.current_model_key)
-            return sorted(downloaded)
+            return sorted(self._mock_downloaded | set(self.loaded_models))
         
         downloaded = []
         try:
@@ -329,24 +591,31 @@ class DepthModel:
                     if any(os.path.isdir(os.path.join(model_path, d)) for d in os.listdir(model_path)):
                         downloaded.append(key)
         
-        # Ensure current model is always reported as downloaded (it's in memory!)
-        if self.current_model_key and self.current_model_key not in downloaded:
-            downloaded.append(self.current_model_key)
+        # Ensure resident models are always reported as downloaded (they're in memory!)
+        downloaded.extend(self.loaded_models)
                 
         return sorted(list(set(downloaded)))
 
+    def _resident_engines(self) -> dict:
+        """Resident engines by model key."""
+        engines = {key: self._pool.peek(key) for key in self._pool.keys()}
+        return {key: engine for key, engine in engines.items() if engine is not None}
+
     def get_status(self) -> dict:
         """Get current model status."""
-        d_name = "CPU"
-        if self.device == 0: d_name = "CUDA GPU"
-        elif self.device == "mps": d_name = "Apple MPS"
-        
         return {
             "loaded": self.is_loaded,
+            "state": self.state,
             "current_model": self.current_model_key,
-            "device": d_name,
+            "loaded_models": self.loaded_models,
+            "precisions": {key: engine.precision for key, engine in self._resident_engines().items()},
+            "backends": {key: engine.backend for key, engine in self._resident_engines().items()},
+            "load_stats": dict(self._load_stats),
+            "memory": self._pool.get_stats(),
+            "device": self._device_name(),
             "available_models": list(Config.AVAILABLE_MODELS.keys()),
-            "downloaded_models": self._get_downloaded_models()
+            "downloaded_models": self._get_downloaded_models(),
+            "batching": self._coalescer.get_stats() if self._coalescer else None,
         }
         
     def delete_model(self, model_key: str) -> bool:
@@ -362,8 +631,7 @@ class DepthModel:
         logger.info(f"Deleting model: {model_key}")
         
         # 1. Unload if currently loaded
-        if self.current_model_key == model_key:
-            self._unload_current_model()
+        self.unload_model(model_key)
             
         # 2. Mock Logic
         if MOCK_DOWNLOADS:
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ModelPool:
+    """
+    Keeps several models resident, bounded by an estimated memory budget.
+
+    Entries are ordered from least to most recently used. Admitting a model
+    that does not fit evicts the least recently used entries first; a single
+    model larger than the whole budget is still admitted on its own.
+    """
+
+    def __init__(self, budget_mb: float):
+        self.budget_mb = budget_mb
+        self._entries = OrderedDict()  # key -> {"model", "memory_mb", "last_used"}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def keys(self) -> list:
+        """Resident keys, least recently used first."""
+        with self._lock:
+            return list(self._entries.keys())
+
+    @property
+    def used_mb(self) -> float:
+        with self._lock:
+            return sum(entry["memory_mb"] for entry in self._entries.values())
+
+    def get(self, key):
+        """Return the model for key and mark it most recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry["last_used"] = time.time()
+            self._entries.move_to_end(key)
+            return entry["model"]
+
+    def peek(self, key):
+        """Return the model for key without marking it used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["model"] if entry else None
+
+    def add(self, key, model, memory_mb: float):
+        with self._lock:
+            self._entries[key] = {"model": model, "memory_mb": memory_mb, "last_used": time.time()}
+            self._entries.move_to_end(key)
+
+    def remove(self, key):
+        """Remove key from the pool and return its model (None if not resident)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry["model"] if entry else None
+
+    def evict_for(self, memory_mb: float) -> list:
+        """
+        Evict least recently used entries until memory_mb more fits in the budget.
+
+        Returns:
+            list: (key, model) pairs that were evicted
+        """
+        evicted = []
+        with self._lock:
+            used = sum(entry["memory_mb"] for entry in self._entries.values())
+            while self._entries and used + memory_mb > self.budget_mb:
+                key, entry = self._entries.popitem(last=False)
+                used -= entry["memory_mb"]
+                evicted.append((key, entry["model"]))
+        return evicted
+
+    def idle_keys(self, timeout_seconds: float) -> list:
+        """Keys not used within timeout_seconds."""
+        now = time.time()
+        with self._lock:
+            return [key for key, entry in self._entries.items() if now - entry["last_used"] > timeout_seconds]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_mb": self.budget_mb,
+                "used_mb": sum(entry["memory_mb"] for entry in self._entries.values()),
+                "resident": {key: entry["memory_mb"] for key, entry in self._entries.items()},
+            }
@@ -0,0 +1,154 @@
+"""
+ONNX Runtime backend for Depth Anything V2.
+
+Each model variant is exported to ONNX once, with dynamic batch and image
+dimensions, and cached under Config.MODEL_CACHE_DIR/onnx; an int8 variant is
+produced from that file with ONNX Runtime's dynamic quantization. Inference
+runs on the CPU execution provider with all graph optimizations (operator
+fusion, constant folding, layout changes) enabled, which on CPU-only nodes is
+typically well ahead of eager PyTorch and keeps the torch model out of
+resident memory.
+
+Pre- and post-processing are shared with DepthEngine, so results have the
+same shape and meaning on both backends.
+"""
+import logging
+import os
+import tempfile
+import torch
+from .depth_engine import DepthEngine, DEPTH_PRECISIONS, INPUT_SIZE, PATCH_SIZE, load_pretrained, torch_device
+
+# Optional dependency: the backend is unavailable without onnxruntime
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError as e:
+    ONNX_AVAILABLE = False
+    ONNX_IMPORT_ERROR = str(e)
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 17
+
+
+def onnx_path(model_id: str, precision: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{model_id.replace('/', '--')}-{precision}-opset{ONNX_OPSET}.onnx")
+
+
+def _write_atomically(path: str, write):
+    """Call write(tmp_path) and move the result to path, so readers never see a partial model."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.onnx')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class _PredictedDepth(torch.nn.Module):
+    """Exposes only predicted_depth, so the graph has a single output."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).predicted_depth
+
+
+def export_onnx(model_id: str, path: str):
+    """Export a Depth Anything model to ONNX with dynamic batch, height and width."""
+    logger.info(f"Exporting {model_id} to ONNX...")
+    model = load_pretrained(model_id).eval()
+    # Non-square example input, so no dimension is specialized by the trace
+    example = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE + 10 * PATCH_SIZE)
+
+    def write(tmp_path):
+        with torch.inference_mode():
+            torch.onnx.export(
+                _PredictedDepth(model),
+                (example,),
+                tmp_path,
+                input_names=["pixel_values"],
+                output_names=["predicted_depth"],
+                dynamic_axes={
+                    "pixel_values": {0: "batch", 2: "height", 3: "width"},
+                    "predicted_depth": {0: "batch", 1: "height", 2: "width"},
+                },
+                opset_version=ONNX_OPSET,
+            )
+
+    _write_atomically(path, write)
+    logger.info(f"Exported ONNX model to {path}")
+
+
+def quantize_onnx(source_path: str, path: str):
+    """Dynamic int8 quantization of an exported model's MatMul weights."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info(f"Quantizing {source_path} to int8...")
+    _write_atomically(path, lambda tmp_path: quantize_dynamic(
+        source_path, tmp_path, op_types_to_quantize=["MatMul"], weight_type=QuantType.QInt8))
+
+
+class OnnxDepthEngine(DepthEngine):
+    """
+    DepthEngine running an exported model in an ONNX Runtime session.
+
+    Args:
+        session: onnxruntime.InferenceSession of an exported model
+        batch_size: Images per forward pass when predicting several at once
+        precision: Key of DEPTH_PRECISIONS the model was exported with
+    """
+
+    backend = "onnx"
+
+    def __init__(self, session, batch_size: int = 8, precision: str = "fp32"):
+        super().__init__(None, torch.device("cpu"), batch_size, precision)
+        self.session = session
+
+    @classmethod
+    def load(cls, model_id: str, device, batch_size: int = 8, precision: str = "fp32",
+             cache_dir: str = None) -> "OnnxDepthEngine":
+        """
+        Open the cached ONNX export of model_id, exporting (and quantizing) it first if needed.
+
+        Args:
+            model_id: Hugging Face repository of the model
+            device: Pipeline-style device; must be the CPU
+            batch_size: Images per forward pass
+            precision: Key of DEPTH_PRECISIONS
+            cache_dir: Directory of exported models
+
+        Raises:
+            RuntimeError: If onnxruntime is not installed
+            ValueError: If precision is unknown or device is not the CPU
+        """
+        if not ONNX_AVAILABLE:
+            raise RuntimeError(f"onnxruntime is not installed: {ONNX_IMPORT_ERROR}")
+        if precision not in DEPTH_PRECISIONS:
+            raise ValueError(f"Precision must be one of {list(DEPTH_PRECISIONS)}")
+        if torch_device(device).type != "cpu":
+            raise ValueError("The onnx backend runs on CPU only")
+
+        path = onnx_path(model_id, precision, cache_dir)
+        if not os.path.exists(path):
+            fp32_path = onnx_path(model_id, "fp32", cache_dir)
+            if not os.path.exists(fp32_path):
+                export_onnx(model_id, fp32_path)
+            if precision == "int8":
+                quantize_onnx(fp32_path, path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = torch.get_num_threads()
+        session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        logger.info(f"ONNX Runtime session ready for {path}")
+        return cls(session, batch_size, precision)
+
+    def _forward(self, batch: torch.Tensor) -> torch.Tensor:
+        predicted = self.session.run(["predicted_depth"], {"pixel_values": batch.numpy()})[0]
+        return torch.from_numpy(predicted)
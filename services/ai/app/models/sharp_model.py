@@ -1,19 +1,22 @@
 import os
 import logging
+import tempfile
 import time
 import threading
 import gc
 import torch
-import torch.nn.functional as F
 import numpy as np
 import subprocess
+from PIL import Image
 from pathlib import Path
 from ..config import Config
+from ..utils.splat_io import gaussians_to_arrays, splat_count, morton_order
+from ..utils.image_io import load_image
+from ..utils.memory import track_memory
 
 # Try to import the library components
 try:
     from sharp.models import create_predictor, PredictorParams
-    from sharp.utils import io as sharp_io
     from sharp.utils.gaussians import save_ply, unproject_gaussians, apply_transform
     SHARP_AVAILABLE = True
 except ImportError as e:
@@ -22,6 +25,12 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# fp32: weights as published; bf16: matmuls and convolutions autocast to bfloat16
+SHARP_PRECISIONS = ("fp32", "bf16")
+
+# Devices whose convolution kernels are faster on channels-last (NHWC) tensors
+CHANNELS_LAST_DEVICES = ("cpu", "cuda")
+
 class SharpModel:
     """
     Memory-managed wrapper for Apple ml-sharp Gaussian Splatting model.
@@ -32,10 +41,14 @@ class SharpModel:
     CHECKPOINT_DIR = Path.home() / ".cache/torch/hub/checkpoints"
     CHECKPOINT_FILENAME = "sharp_2572gikvuh.pt"
     INTERNAL_SHAPE = (1536, 1536) # Default 1536 is required for multi-scale patch alignment
+    # Per-Gaussian tensors of sharp's Gaussians3D
+    GAUSSIAN_FIELDS = ("mean_vectors", "singular_values", "quaternions", "colors", "opacities")
     
     def __init__(self):
         self._model = None
         self.device = "cpu" # Enforcing CPU as requested
+        self.precision = Config.SHARP_PRECISION
+        self.load_stats = None  # Time and memory of the last load
         self._is_downloaded = None
         
         # Idle timeout management
@@ -48,6 +61,11 @@ class SharpModel:
     @property
     def checkpoint_path(self) -> Path:
         return self.CHECKPOINT_DIR / self.CHECKPOINT_FILENAME
+
+    @property
+    def safetensors_path(self) -> Path:
+        """The checkpoint converted to safetensors, under MODEL_CACHE_DIR."""
+        return Path(Config.MODEL_CACHE_DIR) / "sharp" / (Path(self.CHECKPOINT_FILENAME).stem + ".safetensors")
     
     def _start_monitor(self):
         """Start background thread to monitor idle time."""
@@ -86,8 +104,63 @@ class SharpModel:
             if self.checkpoint_path.exists(): self.checkpoint_path.unlink()
             raise RuntimeError(f"Download failed: {e}")
 
-    def load_model(self, device_type: str = 'auto'):
-        """Load the model into memory."""
+    def _convert_checkpoint(self):
+        """Write the .pt checkpoint as safetensors once, so every later load can memory-map it."""
+        from safetensors.torch import save_file
+        
+        logger.info(f"[SharpModel] Converting checkpoint to {self.safetensors_path}...")
+        state_dict = torch.load(self.checkpoint_path, map_location="cpu", mmap=True, weights_only=True)
+        
+        # safetensors refuses tensors sharing memory: keep the first, copy the rest
+        tensors, storages = {}, set()
+        for name, tensor in state_dict.items():
+            storage = tensor.untyped_storage().data_ptr()
+            tensors[name] = tensor.clone() if storage in storages else tensor.contiguous()
+            storages.add(storage)
+        
+        path = self.safetensors_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix='.safetensors')
+        os.close(fd)
+        try:
+            save_file(tensors, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _load_state_dict(self) -> dict:
+        """
+        The checkpoint's weights as memory-mapped CPU tensors.
+        
+        Pages are read from the file (or the page cache, after an idle unload)
+        only as tensors are touched, instead of being read into a second buffer.
+        """
+        from safetensors.torch import load_file
+        
+        if not self.safetensors_path.exists():
+            try:
+                self._convert_checkpoint()
+            except OSError as e:
+                logger.warning(f"[SharpModel] Could not convert checkpoint ({e}); memory-mapping the .pt instead")
+                return torch.load(self.checkpoint_path, map_location="cpu", mmap=True, weights_only=True)
+        return load_file(self.safetensors_path, device="cpu")
+
+    def load_model(self, device_type: str = 'auto', precision: str = None):
+        """
+        Load the model into memory.
+        
+        Args:
+            device_type: 'auto', 'cpu' or 'gpu'
+            precision: Key of SHARP_PRECISIONS; None keeps the current one. Applied
+                       at inference time, so changing it never reloads the weights
+        
+        Raises:
+            ValueError: If precision is unknown or bf16 is explicitly requested on
+                        MPS; a SHARP_PRECISION default of bf16 falls back to fp32 there
+        """
+        if precision is not None and precision not in SHARP_PRECISIONS:
+            raise ValueError(f"Precision must be one of {list(SHARP_PRECISIONS)}")
         self.last_used = time.time()
         
         # Determine device first
@@ -110,6 +183,17 @@ class SharpModel:
                     logger.warning("[SharpModel] GPU requested but unavailable. Falling back to CPU in Auto mode.")
                 target_device = 'cpu'
         
+        if precision is None and self.precision == "bf16" and target_device not in ("cpu", "cuda"):
+            # Lazy loads from a request must not fail on the configured default
+            logger.warning(f"[SharpModel] bf16 is not supported on {target_device}. Falling back to fp32.")
+            precision = "fp32"
+        precision = precision or self.precision
+        if precision == "bf16" and target_device not in ("cpu", "cuda"):
+            raise ValueError(f"bf16 is supported on CPU and CUDA only, not {target_device}")
+        if precision != self.precision:
+            logger.info(f"[SharpModel] Precision set to {precision}")
+            self.precision = precision
+        
         # Check if we need to reload due to device change
         if self._model is not None:
              if self.device != target_device:
@@ -129,20 +213,31 @@ class SharpModel:
 
         logger.info(f"[SharpModel] Loading model into RAM ({self.device})...")
         try:
-            # 1. Create architecture
-            params = PredictorParams()
-            model = create_predictor(params)
+            from accelerate import init_empty_weights
             
-            # 2. Load weights
-            # 2. Load weights
-            # Optimization: Load to CPU first to avoid double-allocation on GPU during load
-            state_dict = torch.load(self.checkpoint_path, map_location="cpu")
-            model.load_state_dict(state_dict)
-            model.to(self.device)
-            model.eval()
+            with track_memory() as load_stats:
+                # 1. Memory-mapped weights (converted to safetensors on first load)
+                state_dict = self._load_state_dict()
+                
+                # 2. Create architecture with parameters on the meta device: no
+                # allocation and no random initialization
+                with init_empty_weights():
+                    model = create_predictor(PredictorParams())
+                
+                # 3. Adopt the mapped tensors as parameters instead of copying into them
+                model.load_state_dict(state_dict, assign=True)
+                del state_dict
+                if self.device in CHANNELS_LAST_DEVICES:
+                    # Only 4D conv weights change layout; the ViT's Linear layers are unaffected
+                    model.to(self.device, memory_format=torch.channels_last)
+                else:
+                    model.to(self.device)
+                model.eval()
             
             self._model = model
-            logger.info("[SharpModel] Model loaded successfully.")
+            self.load_stats = load_stats
+            logger.info(f"[SharpModel] Model loaded in {load_stats['seconds']}s, "
+                        f"peak RSS {load_stats['peak_rss_mb']}MB.")
             
         except Exception as e:
             logger.error(f"[SharpModel] Failed to load model: {e}")
@@ -171,45 +266,57 @@ class SharpModel:
                 except:
                     pass
 
-    def _predict_gaussians(self, image: np.ndarray, f_px: float):
+    def _predict_gaussians(self, image: Image.Image, f_px: float, image_size: tuple = None,
+                           progress_callback=None):
         """
         Internal method reusing logic from sharp.cli.predict.predict_image
         Re-implemented here because CLI function is not easily importable/usable.
+        
+        Unlike the CLI, the image is resized to INTERNAL_SHAPE while still
+        uint8, so the only float tensor is the 1536x1536 network input (~28MB)
+        whatever the size of the original.
+        
+        Args:
+            image: RGB PIL image, e.g. decoded at reduced size by utils.image_io
+            f_px: Focal length in pixels at image_size
+            image_size: (width, height) the focal length refers to, typically the
+                        original's; the image's own size if None
         """
+        report = progress_callback or (lambda progress, stage: None)
         t0 = time.time()
         device = torch.device(self.device)
+        width, height = image_size or image.size
         
-        # 1. Prepare Image Tensor
+        # 1. Resize in uint8 (antialiased when shrinking), then a single float conversion
         # sharp.cli.predict logic: float() / 255.0
-        # Copy numpy array to avoid "not writable" warning
-        image_copy = image.copy()
-        
-        image_pt = torch.from_numpy(image_copy).float().to(device) / 255.0
-        if len(image_pt.shape) == 3:
-            # HWC to CHW
-            image_pt = image_pt.permute(2, 0, 1)
-            
-        _, height, width = image_pt.shape
-            
-        # 2. Resize
-        image_resized_pt = F.interpolate(
-            image_pt[None], # Add batch dim
-            size=(self.INTERNAL_SHAPE[1], self.INTERNAL_SHAPE[0]),
-            mode="bilinear",
-            align_corners=True,
-        )
+        if image.size != self.INTERNAL_SHAPE:
+            image = image.resize(self.INTERNAL_SHAPE, Image.Resampling.BILINEAR)
+        pixels = torch.from_numpy(np.array(image))
+        image_resized_pt = pixels.to(device).permute(2, 0, 1)[None].float().div_(255.0)
+        del pixels
+        if self.device in CHANNELS_LAST_DEVICES:
+            image_resized_pt = image_resized_pt.contiguous(memory_format=torch.channels_last)
         
         t1 = time.time()
         logger.info(f"[SharpModel] Preprocessing: {t1 - t0:.3f}s")
+        report(0.2, "inference")
 
         # 3. Predict NDC
         disparity_factor = torch.tensor([f_px / width]).float().to(device)
         
-        with torch.no_grad():
+        with torch.inference_mode(), torch.autocast(device.type, dtype=torch.bfloat16,
+                                                    enabled=self.precision == "bf16"):
             gaussians_ndc = self._model(image_resized_pt, disparity_factor)
+        
+        if self.precision != "fp32":
+            # Unprojection, sorting and file writers expect fp32
+            gaussians_ndc = gaussians_ndc._replace(**{
+                field: getattr(gaussians_ndc, field).float() for field in self.GAUSSIAN_FIELDS
+            })
             
         t2 = time.time()
-        logger.info(f"[SharpModel] Inference: {t2 - t1:.3f}s")
+        logger.info(f"[SharpModel] Inference ({self.precision}): {t2 - t1:.3f}s")
+        report(0.8, "postprocessing")
             
         # 4. Construct Intrinsics and Unproject
         intrinsics = torch.tensor([
@@ -225,17 +332,17 @@ class SharpModel:
         
         view_matrix = torch.eye(4).to(device)
         
-        gaussians = unproject_gaussians(
-            gaussians_ndc, 
-            view_matrix,
-            intrinsics_resized, 
-            self.INTERNAL_SHAPE
-        )
+        with torch.inference_mode():
+            gaussians = unproject_gaussians(
+                gaussians_ndc, 
+                view_matrix,
+                intrinsics_resized, 
+                self.INTERNAL_SHAPE
+            )
         
         # Cleanup intermediate tensors
         del gaussians_ndc
         del image_resized_pt
-        del image_pt
         del intrinsics
         del intrinsics_resized
         del view_matrix
@@ -247,49 +354,20 @@ class SharpModel:
         return gaussians
 
     def _sort_gaussians_spatially(self, gaussians):
+        """Reorder the Gaussians along a 63-bit Morton curve so neighbours in the file are neighbours in space."""
         try:
             t0 = time.time()
             
-            if hasattr(gaussians, 'means'):
-                positions = gaussians.means
-            elif hasattr(gaussians, 'xyz'):
-                positions = gaussians.xyz
-            else:
-                logger.warning("[SharpModel] No position attribute found for sorting. Skipping sort.")
-                return gaussians
-
-            min_pos, _ = torch.min(positions, dim=0)
-            max_pos, _ = torch.max(positions, dim=0)
-            pos_norm = (positions - min_pos) / (max_pos - min_pos + 1e-6)
-
-            bits = 10
-            buckets = 1 << bits # 1024
-            discrete = (pos_norm * (buckets - 1)).long()
-
-            morton_indices = discrete[:, 0] + \
-                             (discrete[:, 1] << bits) + \
-                             (discrete[:, 2] << (2 * bits))
-            perm = torch.argsort(morton_indices)
-
-            num_points = positions.shape[0]
+            positions = gaussians.mean_vectors.detach().reshape(-1, 3).float().cpu().numpy()
+            order = torch.from_numpy(morton_order(positions)).to(gaussians.mean_vectors.device)
             
-            attrs_to_sort = ['means', 'xyz', 'colors', 'rgb', 'sh', 'opacities', 'opacity', 
-                             'scales', 'scaling', 'rotations', 'quats', 'features_dc', 'features_rest']
-
-            sorted_count = 0
-            for attr_name in dir(gaussians):
-                if attr_name.startswith('_'): continue
-                
-                try:
-                    val = getattr(gaussians, attr_name)
-                    if isinstance(val, torch.Tensor) and val.shape[0] == num_points:
-                        setattr(gaussians, attr_name, val[perm])
-                        sorted_count += 1
-                except Exception:
-                    pass
+            # Per-Gaussian tensors are shaped (batch, N, ...)
+            gaussians = gaussians._replace(**{
+                field: getattr(gaussians, field)[:, order] for field in self.GAUSSIAN_FIELDS
+            })
 
             t1 = time.time()
-            logger.info(f"[SharpModel] Spatially sorted {num_points} splats in {t1-t0:.3f}s")
+            logger.info(f"[SharpModel] Spatially sorted {len(order)} splats in {t1-t0:.3f}s")
             
             return gaussians
 
@@ -297,36 +375,79 @@ class SharpModel:
             logger.error(f"[SharpModel] Error during spatial sorting: {e}")
             return gaussians
 
-    def predict(self, input_image_path: str, output_dir: str) -> str:
+    def _infer_image(self, image, progress_callback=None):
+        """
+        Load an image and run SHARP on it, loading the model if needed.
+        
+        The image (a path or the encoded bytes) is decoded only as large as
+        INTERNAL_SHAPE requires; f_px and the size returned describe the
+        full-resolution original.
+        
+        Returns:
+            tuple: (gaussians, f_px, (height, width) of the image)
+        """
+        report = progress_callback or (lambda progress, stage: None)
+        
         self.last_used = time.time()
         if self._model is None:
+            report(0.0, "loading_model")
             self.load_model()
             
-        logger.info(f"[SharpModel] Processing {input_image_path}...")
+        source = f"{len(image)} bytes" if isinstance(image, bytes) else image
+        logger.info(f"[SharpModel] Processing {source}...")
         
-        try:
-            # 1. Load Image using library utility
-            limit_val = 2200 if self.device == 'cpu' else 1536 
-            image, _, f_px = sharp_io.load_rgb(Path(input_image_path))
-            
-            logger.info(f"[SharpModel] Loaded image: {image.shape}, f_px: {f_px:.2f} (Device: {self.device})")
+        # 1. Decode near the internal resolution, upright per EXIF
+        report(0.1, "preprocessing")
+        decoded, (width, height), f_px = load_image(image, min_size=self.INTERNAL_SHAPE)
+        
+        logger.info(f"[SharpModel] Loaded image: {width}x{height} decoded at {decoded.width}x{decoded.height}, "
+                    f"f_px: {f_px:.2f} (Device: {self.device})")
 
-            # 2. Run Inference
-            gaussians = self._predict_gaussians(image, f_px)
+        # 2. Run Inference; intrinsics refer to the original resolution
+        gaussians = self._predict_gaussians(decoded, f_px, (width, height), progress_callback=progress_callback)
+        del decoded
+        
+        # Spatial ordering before anything is written out
+        report(0.85, "sorting")
+        gaussians = self._sort_gaussians_spatially(gaussians)
+        
+        return gaussians, f_px, (height, width)
+
+    def _cleanup_after_failure(self, e: Exception):
+        logger.error(f"[SharpModel] Prediction failed: {e}")
+        
+        # Emergency cleanup to free VRAM from activations
+        # This is critical if we hit OOM, otherwise tensors stay referenced by traceback
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        
+        import traceback
+        logger.error(traceback.format_exc())
+
+    def predict(self, input_image_path: str, output_dir: str, progress_callback=None) -> str:
+        """
+        Generate a .ply Gaussian Splat from an image file.
+        
+        Args:
+            input_image_path: Path to the input image
+            output_dir: Directory to write the .ply into
+            progress_callback: Optional callable(progress: float 0-1, stage: str)
             
-            # --- DODANO TUTAJ: SORTOWANIE PRZESTRZENNE ---
-            # Sortujemy zanim zapiszemy do pliku
-            gaussians = self._sort_gaussians_spatially(gaussians)
-            # ---------------------------------------------
+        Returns:
+            str: Path of the written .ply file
+        """
+        report = progress_callback or (lambda progress, stage: None)
+        
+        try:
+            gaussians, f_px, (h, w) = self._infer_image(input_image_path, progress_callback)
 
             # 3. Save Output
             output_path = Path(output_dir) / (Path(input_image_path).stem + ".ply")
             output_dir_path = Path(output_dir)
             output_dir_path.mkdir(parents=True, exist_ok=True)
             
-            # Get dimensions for saving
-            h, w = image.shape[:2]
-            
+            report(0.9, "saving")
             t_start_save = time.time()
             save_ply(gaussians, f_px, (h, w), output_path)
             t_end_save = time.time()
@@ -334,35 +455,57 @@ class SharpModel:
             
             # Explicit cleanup
             del gaussians
-            del image
             gc.collect()
             
             logger.info(f"[SharpModel] Saved to {output_path}")
+            report(1.0, "done")
             return str(output_path)
             
         except Exception as e:
-            logger.error(f"[SharpModel] Prediction failed: {e}")
+            self._cleanup_after_failure(e)
+            raise RuntimeError(f"Splat generation failed: {e}")
+
+    def predict_splats(self, image, progress_callback=None) -> dict:
+        """
+        Generate Gaussian Splat arrays from an image, without touching the disk.
+        
+        Args:
+            image: Encoded image bytes (EXIF intact) or a path to the image
+            progress_callback: Optional callable(progress: float 0-1, stage: str)
             
-            # Emergency cleanup to free VRAM from activations
-            # This is critical if we hit OOM, otherwise tensors stay referenced by traceback
-            if 'image_pt' in locals(): del image_pt
-            if 'image_resized_pt' in locals(): del image_resized_pt
-            if 'gaussians' in locals(): del gaussians
+        Returns:
+            dict: "splats" (arrays, see utils.splat_io), "f_px" and "image_size" (width, height)
+        """
+        report = progress_callback or (lambda progress, stage: None)
+        
+        try:
+            gaussians, f_px, (h, w) = self._infer_image(image, progress_callback)
             
+            report(0.9, "converting")
+            splats = gaussians_to_arrays(gaussians)
+            del gaussians
             gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
             
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.info(f"[SharpModel] Generated {splat_count(splats)} splats")
+            report(1.0, "done")
+            return {"splats": splats, "f_px": float(f_px), "image_size": (w, h)}
+            
+        except Exception as e:
+            self._cleanup_after_failure(e)
             raise RuntimeError(f"Splat generation failed: {e}")
 
+    def get_precision(self) -> str:
+        """Precision the next prediction runs at (key of SHARP_PRECISIONS)."""
+        return self.precision
+
     def get_status(self) -> dict:
         return {
             "key": "sharp",
             "is_loaded": self._model is not None,
             "is_downloaded": self.is_downloaded(),
             "device": self.device,
+            "precision": self.precision,
+            "load_stats": self.load_stats,
             "memory_usage": "High (RAM)" if self._model else "0GB"
         }
 
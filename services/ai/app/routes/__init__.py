@@ -2,4 +2,6 @@ from .health import health_bp
 from .depth import depth_bp
 from .models import models_bp
 from .splat import splat_bp
+from .video import video_bp
+from .jobs import jobs_bp
 
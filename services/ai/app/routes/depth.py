@@ -1,12 +1,33 @@
 import io
+import zipfile
 from flask import Blueprint, request, jsonify, send_file
-from PIL import Image
-import numpy as np
-from ..models.depth_model import model
+from ..services.inference_pool import depth_model
+from ..services.depth_service import depth_cache, parse_depth_output, load_depth_image
+from ..services.cache import content_key
+from ..utils.depth_codecs import DEPTH_ENCODINGS, encode_depth
+from ..services.scheduler import scheduler, QueueFullError
 from ..config import Config
+from .responses import busy_response
 
 depth_bp = Blueprint('depth', __name__)
 
+DEPTH_LANES = {
+    "interactive": "interactive_depth",
+    "bulk": "bulk_depth",
+}
+
+
+def _depth_lane(default: str):
+    """Scheduler lane from the 'priority' query param, or None if invalid."""
+    return DEPTH_LANES.get(request.args.get('priority', default))
+
+
+def _depth_encoding():
+    """Encoding from the 'encoding' query param, or None if invalid."""
+    encoding = request.args.get('encoding', 'png')
+    return encoding if encoding in DEPTH_ENCODINGS else None
+
+
 @depth_bp.route('/api/depth', methods=['POST'])
 def process_depth():
     """
@@ -14,12 +35,18 @@ def process_depth():
     
     Query params:
         model: Optional model to use (small, base, large)
+        priority: 'interactive' (default) or 'bulk' for backfill work
+        resolution: 'input' (default, the image's size) or 'native' (the model's ~518 px)
+        scale: Optional fraction (0, 1] of that resolution
+        max_size: Optional bound on the longer side, in pixels
+        encoding: 'png' (default), 'png_fast', 'webp' (lossless), 'raw16' or 'rawf16'
         
     Form data:
         image: Image file to process
         
     Returns:
-        PNG depth map image
+        Depth map in the requested encoding (429 with Retry-After when the queue is full);
+        X-Cache is HIT when it was served from the result cache
     """
     # Removed immediate is_loaded check to allow lazy loading in model.predict()
 
@@ -38,46 +65,168 @@ def process_depth():
                 "error": "Invalid model",
                 "message": f"Unknown model '{requested_model}'. Available: {list(Config.AVAILABLE_MODELS.keys())}"
             }), 400
+    
+    lane = _depth_lane('interactive')
+    if lane is None:
+        return jsonify({"error": "Invalid priority", "message": f"Priority must be one of {list(DEPTH_LANES)}"}), 400
+    
+    try:
+        output = parse_depth_output(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+    
+    encoding = _depth_encoding()
+    if encoding is None:
+        return jsonify({"error": "Invalid encoding", "message": f"Encoding must be one of {list(DEPTH_ENCODINGS)}"}), 400
+    dtype, extension, mimetype = DEPTH_ENCODINGS[encoding]
         
     try:
         # Read image
         image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes))
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Generate depth map (will switch model if different from current)
-        result = model.predict(image, model_key=requested_model)
-        depth_map = result["depth"]
-        
-        # Normalize to 0-255 range
-        depth_array = np.array(depth_map)
-        depth_min = depth_array.min()
-        depth_max = depth_array.max()
-        
-        if depth_max - depth_min < 1e-10:
-            depth_normalized = np.full_like(depth_array, 128, dtype=np.uint8)
-        else:
-            depth_normalized = ((depth_array - depth_min) / (depth_max - depth_min) * 255).astype(np.uint8)
-            
-        depth_image = Image.fromarray(depth_normalized)
         
-        img_io = io.BytesIO()
-        depth_image.save(img_io, 'PNG')
-        img_io.seek(0)
+        # Identical bytes + model variant + output format are answered from the cache
+        model_key = depth_model.resolve_model_key(requested_model)
+        variant = depth_model.engine_variant(model_key)
+        cache_key = content_key(image_bytes, model=model_key, format=encoding, **variant, **output)
+        depth_bytes = depth_cache.get(cache_key)
+        cache_status = "HIT" if depth_bytes is not None else "MISS"
+        
+        if depth_bytes is None:
+            # Decoded near model resolution; the output size still refers to the original
+            image, source_shape = load_depth_image(image_bytes)
+            
+            # Generate depth map (will switch model if different from current)
+            with scheduler.slot(lane):
+                result = depth_model.predict(image, model_key=model_key,
+                                             output={**output, "source_shape": source_shape, "dtype": dtype})
+            model_key = result["model"]
+            
+            depth_bytes = encode_depth(result, encoding)
+            depth_cache.put(cache_key, depth_bytes)
         
         response = send_file(
-            img_io,
-            mimetype='image/png',
+            io.BytesIO(depth_bytes),
+            mimetype=mimetype,
             as_attachment=True,
-            download_name=f"depth_{file.filename.rsplit('.', 1)[0]}.png"
+            download_name=f"depth_{file.filename.rsplit('.', 1)[0]}.{extension}"
         )
         
         # Add model info to response headers
-        response.headers['X-Model-Used'] = model.current_model_key
+        response.headers['X-Model-Used'] = model_key
+        response.headers['X-Cache'] = cache_status
         
         return response
         
+    except QueueFullError as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": "Processing failed", "message": str(e)}), 500
 
+
+
+@depth_bp.route('/api/depth/batch', methods=['POST'])
+def process_depth_batch():
+    """
+    Process several images in one request and generate their depth maps.
+    
+    Images are run through the model in batched forward passes, which is
+    considerably faster than one /api/depth call per image for bulk work.
+    
+    Query params:
+        model: Optional model to use (small, base, large)
+        priority: 'bulk' (default) or 'interactive'
+        resolution, scale, max_size: Output size, as for /api/depth
+        encoding: File encoding, as for /api/depth
+        
+    Form data:
+        images: Image files to process (repeat the field for each image)
+        
+    Returns:
+        ZIP archive of depth maps, named depth_<index>_<name>.<ext> in upload order
+    """
+    files = request.files.getlist('images')
+    if not files:
+        return jsonify({"error": "No images provided", "message": "Please upload one or more 'images'"}), 400
+    
+    if len(files) > Config.MAX_BATCH_IMAGES:
+        return jsonify({
+            "error": "Too many images",
+            "message": f"At most {Config.MAX_BATCH_IMAGES} images per batch, got {len(files)}"
+        }), 400
+    
+    requested_model = request.args.get('model')
+    if requested_model:
+        if requested_model not in Config.AVAILABLE_MODELS:
+            return jsonify({
+                "error": "Invalid model",
+                "message": f"Unknown model '{requested_model}'. Available: {list(Config.AVAILABLE_MODELS.keys())}"
+            }), 400
+    
+    lane = _depth_lane('bulk')
+    if lane is None:
+        return jsonify({"error": "Invalid priority", "message": f"Priority must be one of {list(DEPTH_LANES)}"}), 400
+    
+    try:
+        output = parse_depth_output(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+    
+    encoding = _depth_encoding()
+    if encoding is None:
+        return jsonify({"error": "Invalid encoding", "message": f"Encoding must be one of {list(DEPTH_ENCODINGS)}"}), 400
+    dtype, extension, mimetype = DEPTH_ENCODINGS[encoding]
+    
+    try:
+        model_key = depth_model.resolve_model_key(requested_model)
+        variant = depth_model.engine_variant(model_key)
+        
+        # Only images missing from the cache go through the model
+        depth_results = []
+        misses = []
+        for index, file in enumerate(files):
+            image_bytes = file.read()
+            cache_key = content_key(image_bytes, model=model_key, format=encoding, **variant, **output)
+            depth_results.append(depth_cache.get(cache_key))
+            if depth_results[-1] is None:
+                misses.append((index, cache_key, image_bytes))
+        
+        if misses:
+            images = []
+            outputs = []
+            for _, _, image_bytes in misses:
+                image, source_shape = load_depth_image(image_bytes)
+                images.append(image)
+                outputs.append({**output, "source_shape": source_shape, "dtype": dtype})
+            
+            with scheduler.slot(lane):
+                results = depth_model.predict_batch(images, model_key=model_key, outputs=outputs)
+            model_key = results[0]["model"]
+            
+            for (index, cache_key, _), result in zip(misses, results):
+                depth_results[index] = encode_depth(result, encoding)
+                depth_cache.put(cache_key, depth_results[index])
+        
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+            for index, (file, depth_bytes) in enumerate(zip(files, depth_results)):
+                stem = (file.filename or "image").rsplit('.', 1)[0]
+                zip_file.writestr(f"depth_{index:04d}_{stem}.{extension}", depth_bytes)
+        zip_buffer.seek(0)
+        
+        response = send_file(
+            zip_buffer,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name="depth_batch.zip"
+        )
+        
+        response.headers['X-Model-Used'] = model_key
+        response.headers['X-Image-Count'] = str(len(files))
+        response.headers['X-Cache-Hits'] = str(len(files) - len(misses))
+        
+        return response
+        
+    except QueueFullError as e:
+        return busy_response(e)
+    except Exception as e:
+        return jsonify({"error": "Processing failed", "message": str(e)}), 500
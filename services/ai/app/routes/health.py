@@ -1,16 +1,24 @@
 from flask import Blueprint, jsonify
-from ..models.depth_model import model
+from ..services.inference_pool import depth_model, inference_pool
+from ..services.scheduler import scheduler
+from ..services.job_store import job_store
+from ..services.depth_service import depth_cache
+from ..services.splat_service import splat_cache
 
 health_bp = Blueprint('health', __name__)
 
 @health_bp.route('/health', methods=['GET'])
 def health():
-    model_status = "loaded" if model.is_loaded else "not_loaded"
+    model_status = "loaded" if depth_model.get_loaded_models() else "not_loaded"
     return jsonify({
         "status": "healthy",
         "service": "ai",
         "model": "Depth-Anything-V2",
-        "model_status": model_status
+        "model_status": model_status,
+        "inference_workers": inference_pool.get_stats(),
+        "scheduler": scheduler.get_stats(),
+        "jobs": job_store.get_stats(),
+        "cache": {"depth": depth_cache.get_stats(), "splat": splat_cache.get_stats()}
     })
 
 @health_bp.route('/', methods=['GET'])
@@ -22,8 +30,13 @@ def index():
         "endpoints": {
             "health": "/health",
             "process_depth": "/api/depth (POST)",
+            "process_depth_batch": "/api/depth/batch (POST)",
             "extract_video_frames": "/api/video/frames (POST) [EXPERIMENTAL]",
             "process_video_depth": "/api/video/depth (POST) [EXPERIMENTAL]",
-            "process_video_sbs": "/api/video/sbs (POST) [EXPERIMENTAL]"
+            "process_video_sbs": "/api/video/sbs (POST) [EXPERIMENTAL]",
+            "submit_splat_job": "/api/jobs/splat (POST)",
+            "submit_video_sbs_job": "/api/jobs/video/sbs (POST)",
+            "job_status": "/api/jobs/<job_id> (GET)",
+            "job_result": "/api/jobs/<job_id>/result (GET)"
         }
     })
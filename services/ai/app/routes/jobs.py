@@ -0,0 +1,175 @@
+"""
+Asynchronous job endpoints for long-running work.
+
+POST /api/jobs/splat - Queue Gaussian Splat generation from an image
+POST /api/jobs/video/sbs - Queue SBS 3D video conversion
+GET /api/jobs/<job_id> - Job status and progress
+GET /api/jobs/<job_id>/result - Download the finished artifact
+"""
+import os
+import shutil
+from pathlib import Path
+from flask import Blueprint, request, jsonify, send_file
+from ..services.inference_pool import depth_model
+from ..services.job_store import job_store, JobStatus
+from ..services.scheduler import QueueFullError
+from ..services.splat_service import (
+    SPLAT_LANES, parse_splat_options, splat_download, splat_cache, splat_cache_key, generate_splat
+)
+from ..services.video_service import video_service
+from ..services.depth_service import parse_depth_output
+from .responses import busy_response
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _accepted(job):
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+
+@jobs_bp.route('/api/jobs/splat', methods=['POST'])
+def submit_splat_job():
+    """
+    Queue Gaussian Splat (.ply / .splat) generation from an uploaded image.
+
+    Form data:
+        image: Image file to process
+    Query:
+        quality, format, chunk_size, max_splats, budget_mb, merge, lods: as for /api/splat
+
+    Returns:
+        202 with the job (poll Location for progress), or 429 when too many jobs are pending
+    """
+    if 'image' not in request.files:
+        return jsonify({
+            "error": "No image provided",
+            "message": "Please upload an 'image' file"
+        }), 400
+
+    file = request.files['image']
+    if file.filename == '':
+        return jsonify({
+            "error": "Empty filename",
+            "message": "No file selected"
+        }), 400
+
+    try:
+        options = parse_splat_options(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+
+    image_bytes = file.read()
+    cache_key = splat_cache_key(image_bytes, options)
+    cached_path = splat_cache.get_path(cache_key)
+    download_name, mimetype = splat_download(options, Path(file.filename).stem)
+
+    try:
+        # A cached splat needs no model time, so it skips the scheduler lane
+        job = job_store.create("splat", None if cached_path else SPLAT_LANES[options["quality"]])
+    except QueueFullError as e:
+        return busy_response(e)
+
+    def run(job):
+        if cached_path and os.path.exists(cached_path):
+            return cached_path, download_name, mimetype
+        splat_path = generate_splat(image_bytes, cache_key, options, progress_callback=job.report)
+        return splat_path, download_name, mimetype
+
+    job_store.start(job, run)
+    return _accepted(job)
+
+
+@jobs_bp.route('/api/jobs/video/sbs', methods=['POST'])
+def submit_sbs_job():
+    """
+    Queue SBS 3D conversion of an uploaded video.
+
+    Form data:
+        video: Video file to process
+    Query:
+        divergence, format, codec, batch_size, resolution, scale, max_size: as for /api/video/sbs
+
+    Returns:
+        202 with the job (poll Location for progress), or 429 when too many jobs are pending
+    """
+    if not depth_model.get_loaded_models(): return jsonify({"error": "Model not initialized"}), 503
+    if 'video' not in request.files: return jsonify({"error": "No video provided"}), 400
+    file = request.files['video']
+    if file.filename == '': return jsonify({"error": "Empty filename"}), 400
+
+    try:
+        output = parse_depth_output(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+
+    options = {
+        'divergence': float(request.args.get('divergence', 2.0)),
+        'format': request.args.get('format', 'SBS_FULL'),
+        'codec': request.args.get('codec', 'h264'),
+        'batch_size': int(request.args.get('batch_size', 10)),
+        'output': output
+    }
+
+    try:
+        job = job_store.create("video_sbs", "video")
+    except QueueFullError as e:
+        return busy_response(e)
+
+    input_path = os.path.join(job.work_dir, "input.mp4")
+    file.save(input_path)
+    download_name = f"sbs_{file.filename.rsplit('.', 1)[0]}.mp4"
+
+    def run(job):
+        output_path = video_service.process_sbs_video(input_path, options, progress_callback=job.report)
+        result_path = os.path.join(job.work_dir, "sbs.mp4")
+        shutil.move(output_path, result_path)
+        os.unlink(input_path)
+        return result_path, download_name, 'video/mp4'
+
+    job_store.start(job, run)
+    return _accepted(job)
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, stage and progress (0-1) of a job."""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Job not found",
+            "message": f"No job '{job_id}' (finished jobs expire)"
+        }), 404
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Download the artifact of a completed job; may be fetched repeatedly until the job expires."""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Job not found",
+            "message": f"No job '{job_id}' (finished jobs expire)"
+        }), 404
+    if job.status != JobStatus.COMPLETED:
+        return jsonify({
+            "error": "Job not completed",
+            "message": job.error or f"Job is {job.status}",
+            "status": job.status
+        }), 409
+
+    if not os.path.exists(job.result_path):
+        return jsonify({
+            "error": "Result expired",
+            "message": "The result was evicted from the cache; submit the job again"
+        }), 410
+
+    return send_file(
+        job.result_path,
+        mimetype=job.mimetype,
+        as_attachment=True,
+        download_name=job.download_name
+    )
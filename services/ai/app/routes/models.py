@@ -5,7 +5,10 @@ Handles listing models, download status, and model switching.
 import logging
 from flask import Blueprint, jsonify, request
 from ..config import Config
-from ..models.depth_model import model
+from ..models.depth_engine import DEPTH_BACKENDS, DEPTH_PRECISIONS
+from ..models.sharp_model import SHARP_PRECISIONS
+from ..services.inference_pool import depth_model, splat_model
+from ..services.splat_service import set_sharp_precision
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +24,9 @@ def list_models():
         JSON array of model information
     """
     models_list = []
-    downloaded_models = model._get_downloaded_models()
+    depth_status = depth_model.get_status()
+    downloaded_models = depth_status["downloaded_models"]
+    loaded_models = depth_status["loaded_models"]
     
     # Add depth models
     for key, config in Config.AVAILABLE_MODELS.items():
@@ -33,17 +38,16 @@ def list_models():
             "memory": config["memory"],
             "description": config["description"],
             "huggingface_id": config["id"],
-            "is_loaded": model.current_model_key == key,
+            "is_loaded": key in loaded_models,
             "is_downloaded": key in downloaded_models,
         }
         models_list.append(model_info)
     
     # Add SHARP model (splat generation)
+    sharp_status = None
     try:
-        from ..models.sharp_model import sharp_model
-        
         # NEW LOGIC: Get real status from the class
-        status = sharp_model.get_status()
+        sharp_status = splat_model.get_status()
         
         models_list.append({
             "key": "sharp",
@@ -53,44 +57,36 @@ def list_models():
             "memory": "~4GB RAM",
             "description": "Apple ml-sharp: Photorealistic 3D Gaussian Splat.",
             "huggingface_id": "apple/ml-sharp",
-            "is_loaded": status["is_loaded"], # Now dynamic!
-            "is_downloaded": status["is_downloaded"],
+            "is_loaded": sharp_status["is_loaded"], # Now dynamic!
+            "is_downloaded": sharp_status["is_downloaded"],
+            "precision": sharp_status["precision"],
         })
     except Exception as e:
         logger.warning(f"Could not include SHARP model status: {e}")
     
     # Determine current device type for frontend
     current_device_type = None
-    if model.is_loaded:
-        if model.device == 0: current_device_type = 'gpu' # Generic GPU (CUDA)
-        elif model.device == 'mps': current_device_type = 'gpu' # Generic GPU (MPS)
-        else: current_device_type = 'cpu'
+    if depth_status["loaded"]:
+        current_device_type = 'cpu' if depth_status["device"] == "CPU" else 'gpu' # Generic GPU (CUDA/MPS)
     
     # Check SHARP status
-    try:
-        from ..models.sharp_model import sharp_model
-        sharp_status = sharp_model.get_status()
-        if sharp_status['is_loaded']:
-             # If SHARP is loaded, it overrides or co-exists. 
-             # For UI purposes, if SHARP is active, report its device.
-             s_dev = sharp_status['device']
-             if s_dev == 'cuda' or s_dev == 'mps': current_device_type = 'gpu'
-             elif s_dev == 'cpu': current_device_type = 'cpu'
-             # If s_dev is 'auto', we don't know, but likely resolved in load.
-             
-             # Also update current_model if depth model is not loaded
-             if model.current_model_key is None:
-                 # We don't have a mutable current_model_key variable here easily accessible to override the json response key...
-                 # But the frontend looks at the top-level `current_model`.
-                 pass
-    except:
-        pass
+    if sharp_status and sharp_status['is_loaded']:
+         # If SHARP is loaded, it overrides or co-exists. 
+         # For UI purposes, if SHARP is active, report its device.
+         s_dev = sharp_status['device']
+         if s_dev == 'cuda' or s_dev == 'mps': current_device_type = 'gpu'
+         elif s_dev == 'cpu': current_device_type = 'cpu'
+         # If s_dev is 'auto', we don't know, but likely resolved in load.
+
+    current_model = None
+    if depth_status["loaded"]:
+        current_model = depth_status["current_model"]
+    elif sharp_status and sharp_status['is_loaded']:
+        current_model = "sharp"
 
     return jsonify({
         "models": models_list,
-        "current_model": model.current_model_key if model.is_loaded else ("sharp" if (
-            'sharp_model' in locals() and sharp_model.get_status()['is_loaded']
-        ) else None),
+        "current_model": current_model,
         "current_device": current_device_type,
         "default_model": Config.DEFAULT_MODEL,
     })
@@ -104,7 +100,7 @@ def get_current_model():
     Returns:
         JSON with current model status
     """
-    return jsonify(model.get_status())
+    return jsonify(depth_model.get_status())
 
 
 @models_bp.route('/api/models/<model_key>/load', methods=['POST'])
@@ -115,22 +111,37 @@ def load_model(model_key: str):
     Args:
         model_key: Model to load (small, base, large)
         
+    JSON body (optional):
+        device: 'auto', 'cpu' or 'gpu'
+        precision: 'fp32' or 'int8' (depth models on CPU only); 'fp32' or 'bf16' for sharp
+        backend: 'torch' or 'onnx' (depth models; ONNX Runtime on CPU)
+        
     Returns:
-        JSON with success status
+        JSON with success status, the model's precision and, under 'load', the
+        time and memory its last load took (seconds, rss_before_mb, rss_after_mb,
+        peak_rss_mb, peak_is_lifetime)
     """
     if model_key == "sharp":
         try:
-            from ..models.sharp_model import sharp_model
-            
             # Extract optional device parameter (same as below)
             data = request.get_json() or {}
             device_type = data.get('device', 'auto')
+            precision = data.get('precision')
+            if precision is not None and precision not in SHARP_PRECISIONS:
+                return jsonify({
+                    "error": "Invalid precision",
+                    "message": f"Precision must be one of {list(SHARP_PRECISIONS)}"
+                }), 400
             
-            sharp_model.load_model(device_type=device_type) 
+            splat_model.load_model(device_type=device_type, precision=precision) 
+            status = splat_model.get_status()
+            set_sharp_precision(status["precision"])
             return jsonify({
                 "success": True, 
-                "message": f"SHARP model loaded on {sharp_model.device}",
-                "current_model": "sharp"
+                "message": f"SHARP model loaded on {status['device']}",
+                "current_model": "sharp",
+                "precision": status["precision"],
+                "load": status["load_stats"],
             })
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
@@ -142,18 +153,34 @@ def load_model(model_key: str):
         }), 400
     
     
-    # Extract optional device parameter
+    # Extract optional device and precision parameters
     data = request.get_json() or {}
     device_type = data.get('device', 'auto')
+    precision = data.get('precision')
+    if precision is not None and precision not in DEPTH_PRECISIONS:
+        return jsonify({
+            "error": "Invalid precision",
+            "message": f"Precision must be one of {list(DEPTH_PRECISIONS)}"
+        }), 400
+    backend = data.get('backend')
+    if backend is not None and backend not in DEPTH_BACKENDS:
+        return jsonify({
+            "error": "Invalid backend",
+            "message": f"Backend must be one of {list(DEPTH_BACKENDS)}"
+        }), 400
     
     try:
-        success = model.switch_model(model_key, device_type=device_type)
+        success = depth_model.switch_model(model_key, device_type=device_type, precision=precision, backend=backend)
         
         if success:
+            status = depth_model.get_status()
             return jsonify({
                 "success": True,
                 "message": f"Model '{model_key}' loaded successfully",
-                "current_model": model.current_model_key,
+                "current_model": model_key,
+                "precision": status["precisions"].get(model_key),
+                "backend": status["backends"].get(model_key),
+                "load": status["load_stats"].get(model_key),
             })
         else:
             return jsonify({
@@ -184,8 +211,7 @@ def download_model(model_key: str):
     """
     if model_key == "sharp":
         try:
-            from ..models.sharp_model import sharp_model
-            success = sharp_model.download()
+            success = splat_model.download()
             if success:
                 return jsonify({
                     "success": True,
@@ -206,7 +232,7 @@ def download_model(model_key: str):
         }), 400
     
     try:
-        success = model.download_model(model_key)
+        success = depth_model.download_model(model_key)
         
         if success:
             return jsonify({
@@ -242,8 +268,7 @@ def unload_model(model_key: str):
     # Handler for SHARP model
     if model_key == "sharp":
         try:
-            from ..models.sharp_model import sharp_model
-            sharp_model.unload_model()
+            splat_model.unload_model()
             return jsonify({
                 "success": True,
                 "message": "Model 'sharp' unloaded successfully"
@@ -251,14 +276,14 @@ def unload_model(model_key: str):
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
 
-    if model.current_model_key != model_key:
+    if model_key not in depth_model.get_loaded_models():
         return jsonify({
             "success": True,
             "message": f"Model '{model_key}' is not currently loaded"
         })
     
     try:
-        model._unload_current_model()
+        depth_model.unload_model(model_key)
         return jsonify({
             "success": True,
             "message": f"Model '{model_key}' unloaded successfully"
@@ -290,7 +315,7 @@ def delete_model(model_key: str):
         }), 400
     
     try:
-        success = model.delete_model(model_key)
+        success = depth_model.delete_model(model_key)
         
         if success:
             return jsonify({
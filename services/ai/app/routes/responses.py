@@ -0,0 +1,13 @@
+from flask import jsonify
+
+
+def busy_response(error):
+    """429 response for a request refused by the scheduler (QueueFullError)."""
+    response = jsonify({
+        "error": "Service busy",
+        "message": str(error),
+        "retry_after": error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
@@ -1,16 +1,20 @@
 """
 Splat generation endpoint for Apple ml-sharp.
 
-POST /api/splat - Generate .ply Gaussian Splat from image
+POST /api/splat - Generate a .ply (or .splat) Gaussian Splat from image
 GET /api/splat/status - Check if SHARP model is downloaded
 """
-import io
 import os
-import tempfile
 from pathlib import Path
-from flask import Blueprint, request, jsonify, send_file
-from PIL import Image
-from ..models.sharp_model import sharp_model
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+from ..models.sharp_model import SharpModel
+from ..services.inference_pool import splat_model
+from ..services.scheduler import scheduler, QueueFullError
+from ..services.splat_service import (
+    SPLAT_LANES, parse_splat_options, splat_download, splat_cache, splat_cache_key, splat_model_used,
+    open_cached_splat, infer_splats, encode_splats
+)
+from .responses import busy_response
 
 splat_bp = Blueprint('splat', __name__)
 
@@ -18,13 +22,26 @@ splat_bp = Blueprint('splat', __name__)
 @splat_bp.route('/api/splat', methods=['POST'])
 def generate_splat():
     """
-    Generate Gaussian Splat (.ply) from uploaded image.
+    Generate Gaussian Splat (.ply or .splat) from uploaded image.
     
+    Query params:
+        quality: 'full' (default, SHARP) or 'preview' (relief lifted from a depth map in
+            seconds, to show while the full splat is generated)
+        format: 'ply' (default), 'splat' (32-byte records for web viewers, ~4x smaller)
+            or 'compressed_ply' (16-byte quantized records, ~3.5x smaller)
+        chunk_size: Optional splats per spatial chunk; returns a ZIP of the file plus chunks.json
+        max_splats: Optional maximum number of Gaussians (least important are pruned)
+        budget_mb: Optional maximum file size in MB
+        merge: 'true' to merge neighbouring Gaussians before pruning
+        lods: Optional comma-separated fractions (e.g. 1,0.25,0.05); returns a ZIP with
+            manifest.json and one file per level of detail, coarsest first
+        
     Form data:
         image: Image file to process
         
     Returns:
-        PLY file (3D Gaussian Splat binary)
+        PLY/.splat file (3D Gaussian Splat binary), or 429 with Retry-After when the queue is full;
+        X-Cache is HIT when it was served from the splat cache
     """
     if 'image' not in request.files:
         return jsonify({
@@ -40,75 +57,54 @@ def generate_splat():
         }), 400
     
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Save input image
-            input_path = os.path.join(tmpdir, "input.jpg")
-            output_dir = os.path.join(tmpdir, "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Read image bytes
-            image_bytes = file.read()
-            
-            # INSPECT: Check if we can just write bytes directly to preserve EXIF/Metadata
-            # This is critical for Orientation and Focal Length detection in sharp_model.
-            try:
-                # Peek at format
-                img_peek = Image.open(io.BytesIO(image_bytes))
-                is_jpeg = img_peek.format == 'JPEG' or img_peek.format == 'MPO'
-                
-                if is_jpeg:
-                    # Write RAW bytes to preserve exact metadata
-                    with open(input_path, 'wb') as f:
-                        f.write(image_bytes)
-                    print(f"[Splat] Saved RAW input image to {input_path} (Format: {img_peek.format})")
-                else:
-                    # For non-JPEGs, we must convert/save
-                    # Try to preserve EXIF if possible
-                    exif_data = img_peek.info.get('exif')
-                    
-                    if img_peek.mode != 'RGB':
-                        img_peek = img_peek.convert('RGB')
-                        
-                    save_kwargs = {'quality': 95}
-                    if exif_data:
-                        save_kwargs['exif'] = exif_data
-                        
-                    img_peek.save(input_path, 'JPEG', **save_kwargs)
-                    print(f"[Splat] Converted and saved input image to {input_path}")
-                    
-            except Exception as e:
-                print(f"[Splat] Error inspecting image, falling back to standard convert: {e}")
-                image = Image.open(io.BytesIO(image_bytes))
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                image.save(input_path, 'JPEG', quality=95)
-            
-            # Generate splat
-            ply_path = sharp_model.predict(input_path, output_dir)
-            
-            print(f"[Splat] Generated PLY at {ply_path}")
-            
-            # Get file stats
-            ply_size = os.path.getsize(ply_path)
-            
-            # Read PLY into memory (since tmpdir will be deleted)
-            with open(ply_path, 'rb') as f:
-                ply_data = io.BytesIO(f.read())
-            
-            # Create response with PLY file
+        options = parse_splat_options(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+    
+    try:
+        # Read image bytes
+        image_bytes = file.read()
+        download_name, mimetype = splat_download(options, Path(file.filename).stem)
+        
+        # A cached splat is served without loading the model at all
+        cache_key = splat_cache_key(image_bytes, options)
+        cached_file = open_cached_splat(cache_key)
+        
+        if cached_file is not None:
             response = send_file(
-                ply_data,
-                mimetype='application/octet-stream',
+                cached_file,
+                mimetype=mimetype,
                 as_attachment=True,
-                download_name=f"splat_{Path(file.filename).stem}.ply"
+                download_name=download_name
             )
+            response.headers['X-File-Size'] = str(os.fstat(cached_file.fileno()).st_size)
+            response.headers['X-Cache'] = "HIT"
+        else:
+            # Generate splat
+            with scheduler.slot(SPLAT_LANES[options["quality"]]):
+                result = infer_splats(image_bytes, quality=options["quality"])
             
-            # Add metadata headers
-            response.headers['X-Model-Used'] = 'sharp'
-            response.headers['X-File-Size'] = str(ply_size)
-            
-            return response
+            # Encode while sending, keeping a copy in the cache
+            chunks, size = encode_splats(result, options)
+            response = Response(
+                stream_with_context(splat_cache.tee(cache_key, chunks)),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+            )
+            if size is not None:
+                response.headers['Content-Length'] = str(size)
+                response.headers['X-File-Size'] = str(size)
+            response.headers['X-Cache'] = "MISS"
+        
+        # Add metadata headers
+        response.headers['X-Model-Used'] = splat_model_used(options)
+        response.headers['X-Splat-Format'] = options["format"]
+        response.headers['X-Splat-Quality'] = options["quality"]
+        
+        return response
     
+    except QueueFullError as e:
+        return busy_response(e)
     except RuntimeError as e:
         return jsonify({
             "error": "Splat generation failed",
@@ -131,14 +127,14 @@ def splat_status():
     Returns:
         JSON with model status information
     """
-    is_downloaded = sharp_model.check_downloaded()
+    is_downloaded = splat_model.is_downloaded()
     
     return jsonify({
         "model_key": "sharp",
         "model_name": "SHARP",
         "is_downloaded": is_downloaded,
-        "checkpoint_path": str(sharp_model.checkpoint_path),
-        "checkpoint_url": sharp_model.CHECKPOINT_URL
+        "checkpoint_path": str(SharpModel.CHECKPOINT_DIR / SharpModel.CHECKPOINT_FILENAME),
+        "checkpoint_url": SharpModel.CHECKPOINT_URL
     })
 
 
@@ -150,14 +146,14 @@ def download_model():
     Returns:
         JSON with download status
     """
-    if sharp_model.is_downloaded():
+    if splat_model.is_downloaded():
         return jsonify({
             "status": "already_downloaded",
             "message": "SHARP model is already downloaded"
         })
     
     try:
-        sharp_model.download()
+        splat_model.download()
         return jsonify({
             "status": "success",
             "message": "SHARP model downloaded successfully"
@@ -2,14 +2,17 @@ import os
 import tempfile
 import shutil
 from flask import Blueprint, request, jsonify, send_file
-from ..models.depth_model import model
+from ..services.inference_pool import depth_model
 from ..services.video_service import video_service
+from ..services.depth_service import parse_depth_output
+from ..services.scheduler import scheduler, QueueFullError
+from .responses import busy_response
 
 video_bp = Blueprint('video', __name__)
 
 @video_bp.route('/api/video/frames', methods=['POST'])
 def extract_video_frames():
-    if not model.is_loaded: return jsonify({"error": "Model not initialized"}), 503
+    if not depth_model.get_loaded_models(): return jsonify({"error": "Model not initialized"}), 503
     if 'video' not in request.files: return jsonify({"error": "No video provided"}), 400
     file = request.files['video']
     if file.filename == '': return jsonify({"error": "Empty filename"}), 400
@@ -48,11 +51,16 @@ def extract_video_frames():
 
 @video_bp.route('/api/video/depth', methods=['POST'])
 def process_video_depth():
-    if not model.is_loaded: return jsonify({"error": "Model not initialized"}), 503
+    if not depth_model.get_loaded_models(): return jsonify({"error": "Model not initialized"}), 503
     if 'video' not in request.files: return jsonify({"error": "No video provided"}), 400
     file = request.files['video']
     if file.filename == '': return jsonify({"error": "Empty filename"}), 400
 
+    try:
+        output = parse_depth_output(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+
     temp_path = None
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_video:
@@ -63,10 +71,12 @@ def process_video_depth():
             'fps': float(request.args.get('fps', 1)),
             'max_frames': int(request.args.get('max_frames', 30)),
             'method': request.args.get('method', 'interval'),
-            'output_format': request.args.get('output_format', 'zip')
+            'output_format': request.args.get('output_format', 'zip'),
+            'output': output
         }
         
-        zip_buffer = video_service.process_depth_video(temp_path, options)
+        with scheduler.slot("video"):
+            zip_buffer = video_service.process_depth_video(temp_path, options)
         
         return send_file(
             zip_buffer,
@@ -74,6 +84,8 @@ def process_video_depth():
             as_attachment=True,
             download_name=f"depth_frames_{file.filename.rsplit('.', 1)[0]}.zip"
         )
+    except QueueFullError as e:
+        return busy_response(e)
     except Exception as e:
          return jsonify({"error": "Video depth processing failed", "message": str(e)}), 500
     finally:
@@ -81,11 +93,16 @@ def process_video_depth():
 
 @video_bp.route('/api/video/sbs', methods=['POST'])
 def process_video_sbs():
-    if not model.is_loaded: return jsonify({"error": "Model not initialized"}), 503
+    if not depth_model.get_loaded_models(): return jsonify({"error": "Model not initialized"}), 503
     if 'video' not in request.files: return jsonify({"error": "No video provided"}), 400
     file = request.files['video']
     if file.filename == '': return jsonify({"error": "Empty filename"}), 400
 
+    try:
+        output = parse_depth_output(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameters", "message": str(e)}), 400
+
     temp_path = None
     output_path = None
     try:
@@ -97,10 +114,12 @@ def process_video_sbs():
             'divergence': float(request.args.get('divergence', 2.0)),
             'format': request.args.get('format', 'SBS_FULL'),
             'codec': request.args.get('codec', 'h264'),
-            'batch_size': int(request.args.get('batch_size', 10))
+            'batch_size': int(request.args.get('batch_size', 10)),
+            'output': output
         }
         
-        output_path = video_service.process_sbs_video(temp_path, options)
+        with scheduler.slot("video"):
+            output_path = video_service.process_sbs_video(temp_path, options)
         
         # We need a way to clean up output_path after sending
         # Flask send_file doesn't auto-delete.
@@ -129,6 +148,8 @@ def process_video_sbs():
             as_attachment=True,
             download_name=f"sbs_{file.filename.rsplit('.', 1)[0]}.mp4"
         )
+    except QueueFullError as e:
+        return busy_response(e)
     except Exception as e:
          return jsonify({"error": "Video SBS processing failed", "message": str(e)}), 500
     finally:
@@ -0,0 +1,238 @@
+"""
+Content-addressed result caches.
+
+Results are keyed by a hash of the input bytes plus everything else that
+affects the output (model, parameters), so a re-requested asset, a retry
+after a client timeout or a regenerated thumbnail with identical bytes is
+answered without running the model.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(data: bytes, **params) -> str:
+    """Cache key for data plus output-affecting parameters (None values are kept distinct)."""
+    digest = hashlib.sha256(data).hexdigest()
+    suffix = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return hashlib.sha256(f"{digest}?{suffix}".encode()).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU of bytes values, bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "size_mb": round(self._size / 2**20, 1),
+                    "max_mb": round(self.max_bytes / 2**20, 1)}
+
+
+class DiskCache:
+    """
+    Size-bounded cache of files in a directory, evicting least recently used.
+
+    Writes go to a temporary file in the same directory followed by os.replace,
+    so readers (and other gunicorn workers sharing the directory) never see a
+    partial file. Recency is the file's mtime, refreshed on every hit.
+
+    Args:
+        directory: Cache directory (created if missing)
+        max_bytes: Total size above which the oldest files are removed
+        suffix: File extension of cached entries
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._scan())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _scan(self) -> list:
+        """(mtime, path, size) of every cached file."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.suffix) and not entry.name.startswith('.'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get_path(self, key: str):
+        """Path of the cached file for key (marking it recently used), or None."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get(self, key: str):
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another worker in between
+            return None
+
+    def put(self, key: str, value: bytes):
+        self.put_chunks(key, [value])
+
+    def put_file(self, key: str, source_path: str) -> str:
+        """Copy source_path into the cache and return the cached path."""
+        with open(source_path, 'rb') as src:
+            return self.put_chunks(key, iter(lambda: src.read(1 << 20), b''))
+
+    def put_chunks(self, key: str, chunks) -> str:
+        """Write an iterable of bytes into the cache and return the cached path."""
+        for _ in self.tee(key, chunks):
+            pass
+        return self._path(key)
+
+    def tee(self, key: str, chunks):
+        """
+        Yield chunks while writing them into the cache.
+
+        The entry is committed only once every chunk has been consumed; if the
+        consumer stops early (e.g. a client disconnects) nothing is stored.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            self._commit(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _commit(self, key: str, tmp_path: str) -> str:
+        path = self._path(key)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _evict(self):
+        # Rescan: other processes may share the directory
+        entries = sorted(self._scan())
+        self._size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"directory": self.directory, "size_mb": round(self._size / 2**20, 1),
+                    "max_mb": round(self.max_bytes / 2**20, 1), "hits": self.hits, "misses": self.misses}
+
+
+class ResultCache:
+    """
+    Two-tier cache: memory LRU in front of an optional DiskCache, with hit/miss counters.
+
+    Args:
+        memory_bytes: Size of the in-memory tier (0 disables it)
+        disk: Optional DiskCache tier
+    """
+
+    def __init__(self, memory_bytes: int, disk: DiskCache = None):
+        self.memory = MemoryCache(memory_bytes) if memory_bytes > 0 else None
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory is not None or self.disk is not None
+
+    def get(self, key: str):
+        value = self.memory.get(key) if self.memory else None
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None and self.memory is not None:
+                self.memory.put(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes):
+        if self.memory is not None:
+            self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except OSError as e:
+                logger.warning(f"Could not write cache entry {key}: {e}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+        stats["memory"] = self.memory.get_stats() if self.memory else None
+        stats["disk"] = self.disk.get_stats() if self.disk else None
+        return stats
@@ -1,32 +1,77 @@
+import os
 import numpy as np
 import cv2
-from PIL import Image
-from ..models.depth_model import model
+from .inference_pool import depth_model
+from .cache import ResultCache, DiskCache
+from ..config import Config
+from ..models.depth_engine import INPUT_SIZE
+from ..utils.image_io import load_image
 
-def process_frame_depth(frame: np.ndarray) -> np.ndarray:
+# Encoded depth maps keyed by image hash, model and output parameters
+depth_cache = ResultCache(
+    int(Config.DEPTH_CACHE_MEMORY_MB * 2**20),
+    DiskCache(os.path.join(Config.TEMP_DIR, "depth-cache"), int(Config.DEPTH_CACHE_DISK_MB * 2**20))
+    if Config.DEPTH_CACHE_DISK_MB > 0 else None,
+)
+
+# 'input' returns depth at the image's size, 'native' at the model's (~518 px short side)
+DEPTH_RESOLUTIONS = ("input", "native")
+
+def parse_depth_output(args) -> dict:
+    """
+    Output size options of a depth request from its query parameters.
+    
+    Upsampling a ~518 px prediction to a 48 MP original costs interpolation,
+    PNG encoding and transfer time; clients that upsample on their GPU can
+    ask for the native resolution or a bounded size instead.
+    
+    Args:
+        args: Request query parameters
+        
+    Returns:
+        dict: "resolution" ('input' or 'native'), "scale" (fraction in (0, 1], or None)
+            and "max_size" (longest side in pixels, or None)
+        
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    resolution = args.get('resolution', 'input')
+    if resolution not in DEPTH_RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {list(DEPTH_RESOLUTIONS)}")
+    
+    scale = args.get('scale', type=float)
+    if scale is not None and not 0 < scale <= 1:
+        raise ValueError("scale must be in (0, 1]")
+    
+    max_size = args.get('max_size', type=int)
+    if max_size is not None and max_size <= 0:
+        raise ValueError("max_size must be a positive number of pixels")
+    
+    return {"resolution": resolution, "scale": scale, "max_size": max_size}
+
+def load_depth_image(image_bytes: bytes) -> tuple:
+    """
+    Decode an uploaded image just large enough for the depth model, upright per EXIF.
+    Args:
+        image_bytes: Uploaded image
+    Returns:
+        tuple: (RGB PIL image, (height, width) of the full-resolution image)
+    """
+    image, (width, height), _ = load_image(image_bytes, min_size=(INPUT_SIZE, INPUT_SIZE))
+    return image, (height, width)
+
+def process_frame_depth(frame: np.ndarray, output: dict = None) -> np.ndarray:
     """
     Process a single frame through the depth estimation model.
     Args:
         frame: Frame as numpy array (BGR format from cv2)
+        output: Optional output size options (see parse_depth_output)
     Returns:
-        Depth map as numpy array (0-255 grayscale)
+        Depth map as numpy array (0-255 grayscale), at the frame's size by default
     """
-    # Convert BGR to RGB for PIL
+    # The model takes RGB arrays directly, no PIL round trip needed
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    image = Image.fromarray(frame_rgb)
     
     # Generate depth map
-    result = model.predict(image)
-    depth_map = result["depth"]
-    
-    # Convert to numpy and normalize to 0-255
-    depth_array = np.array(depth_map)
-    depth_min = depth_array.min()
-    depth_max = depth_array.max()
-    
-    # Handle uniform depth
-    if depth_max - depth_min < 1e-10:
-        return np.full_like(depth_array, 128, dtype=np.uint8)
-    
-    depth_normalized = ((depth_array - depth_min) / (depth_max - depth_min) * 255).astype(np.uint8)
-    return depth_normalized
+    result = depth_model.predict(frame_rgb, output=output)
+    return result["depth"]
@@ -0,0 +1,282 @@
+"""
+Out-of-process model serving.
+
+HTTP request threads hand inference calls over a queue to long-lived worker
+processes and wait for the result. Each lane ("depth", "splat") has its own
+workers, so a minute-long splat job never occupies the process that serves
+depth requests, and CPU inference can be spread over several processes.
+
+A lane configured with 0 workers runs calls in-process on the model
+singleton, exactly as before.
+
+A callable progress_callback argument is replaced in the worker by one
+that reports back over the result queue. Status queries (METADATA_METHODS)
+run on their own thread in the worker, so /health and cache lookups are
+answered while inference is running.
+
+Each worker process holds its own copy of the weights, so
+Config.MODEL_MEMORY_BUDGET_MB applies per depth worker.
+"""
+import functools
+import importlib
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Lane -> (module relative to the app package, singleton attribute)
+LANE_TARGETS = {
+    "depth": (".models.depth_model", "model"),
+    "splat": (".models.sharp_model", "sharp_model"),
+}
+
+# Lifecycle methods must reach every worker's copy of the model
+BROADCAST_METHODS = {"initialize", "switch_model", "unload_model", "delete_model", "load_model"}
+
+# Cheap status queries, answered on a separate thread instead of queueing behind inference
+METADATA_METHODS = {
+    "get_status", "get_loaded_models", "resolve_model_key", "engine_variant", "get_precision", "is_downloaded",
+}
+
+_APP_PACKAGE = __name__.rsplit('.', 2)[0]
+
+
+def _load_target(lane: str):
+    module_name, attribute = LANE_TARGETS[lane]
+    return getattr(importlib.import_module(module_name, package=_APP_PACKAGE), attribute)
+
+
+def _picklable_error(error: Exception) -> Exception:
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _worker_threads(lane: str) -> int:
+    """Inference threads per worker process of a lane."""
+    if Config.INFERENCE_WORKER_THREADS > 0:
+        return Config.INFERENCE_WORKER_THREADS
+    if lane == "depth":
+        # Every inference call holds a scheduler slot, so this admits all of
+        # them and a full coalesced batch can form in one worker
+        return max(Config.SCHEDULER_MAX_CONCURRENT, Config.DEPTH_MAX_BATCH_SIZE)
+    # SHARP runs one image at a time; more threads would only contend
+    return 1
+
+
+def _worker_main(lane: str, torch_threads: int, threads: int, jobs, results):
+    """Entry point of an inference worker process."""
+    logging.basicConfig(level=logging.INFO)
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    target = _load_target(lane)
+    logger.info(f"[{lane} worker {os.getpid()}] Ready ({threads} threads, torch threads: {torch_threads or 'default'})")
+
+    def run(job_id, method, args, kwargs, with_progress):
+        if with_progress:
+            kwargs["progress_callback"] = lambda progress, stage: results.put((job_id, "progress", (progress, stage)))
+        try:
+            results.put((job_id, "result", getattr(target, method)(*args, **kwargs)))
+        except Exception as e:
+            logger.error(f"[{lane} worker {os.getpid()}] {method} failed: {e}")
+            results.put((job_id, "error", _picklable_error(e)))
+
+    # Several threads per process let concurrent requests coalesce into batches
+    with ThreadPoolExecutor(max_workers=threads) as executor, \
+            ThreadPoolExecutor(max_workers=1) as metadata_executor:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            (metadata_executor if job[1] in METADATA_METHODS else executor).submit(run, *job)
+
+
+class _Worker:
+    def __init__(self, lane: str, index: int):
+        self.lane = lane
+        self.index = index
+        self.process = None
+        self.jobs = None
+        self.pending = set()
+
+    def start(self, context, torch_threads: int, results):
+        self.jobs = context.Queue()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(self.lane, torch_threads, _worker_threads(self.lane), self.jobs, results),
+            name=f"inference-{self.lane}-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        logger.info(f"Started inference worker {self.process.name} (pid {self.process.pid})")
+
+
+class InferencePool:
+    """Dispatches model method calls to per-lane worker processes."""
+
+    def __init__(self, workers_per_lane: dict):
+        self._sizes = {lane: count for lane, count in workers_per_lane.items() if count > 0}
+        self._workers = {}
+        self._futures = {}  # job id -> (future, worker)
+        self._progress = {}  # job id -> progress callback
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._context = None
+        self._results = None
+
+    def enabled(self, lane: str) -> bool:
+        return lane in self._sizes
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._context is not None:
+                return
+            # spawn: forking a process that already holds torch/CUDA state is unsafe
+            self._context = multiprocessing.get_context("spawn")
+            self._results = self._context.Queue()
+
+            # Split the cores between workers instead of oversubscribing them
+            total_workers = sum(self._sizes.values())
+            self._torch_threads = max(1, (os.cpu_count() or 1) // total_workers)
+            for lane, count in self._sizes.items():
+                self._workers[lane] = [_Worker(lane, index) for index in range(count)]
+                for worker in self._workers[lane]:
+                    worker.start(self._context, self._torch_threads, self._results)
+
+            threading.Thread(target=self._dispatch_results, daemon=True).start()
+
+    def _submit_to(self, worker: _Worker, method: str, args, kwargs) -> Future:
+        future = Future()
+        progress_callback = kwargs.pop("progress_callback", None)
+        with self._lock:
+            job_id = next(self._ids)
+            self._futures[job_id] = (future, worker)
+            if progress_callback is not None:
+                self._progress[job_id] = progress_callback
+            worker.pending.add(job_id)
+        worker.jobs.put((job_id, method, args, kwargs, progress_callback is not None))
+        return future
+
+    def submit(self, lane: str, method: str, *args, **kwargs) -> Future:
+        """Run a model method on the least busy worker of the lane."""
+        self._ensure_started()
+        with self._lock:
+            worker = min(self._workers[lane], key=lambda w: len(w.pending))
+        return self._submit_to(worker, method, args, kwargs)
+
+    def call(self, lane: str, method: str, *args, **kwargs):
+        """Run a model method and wait for its result."""
+        if not self.enabled(lane):
+            return getattr(_load_target(lane), method)(*args, **kwargs)
+        return self.submit(lane, method, *args, **kwargs).result()
+
+    def broadcast(self, lane: str, method: str, *args, **kwargs) -> list:
+        """Run a model method on every worker of the lane and wait for all results."""
+        if not self.enabled(lane):
+            return [self.call(lane, method, *args, **kwargs)]
+        self._ensure_started()
+        futures = [self._submit_to(worker, method, args, kwargs) for worker in self._workers[lane]]
+        return [future.result() for future in futures]
+
+    def _dispatch_results(self):
+        last_check = time.monotonic()
+        while True:
+            if time.monotonic() - last_check > 1:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                job_id, kind, payload = self._results.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if kind == "progress":
+                progress_callback = self._progress.get(job_id)
+                if progress_callback is not None:
+                    try:
+                        progress_callback(*payload)
+                    except Exception as e:
+                        logger.warning(f"Progress callback failed: {e}")
+                continue
+
+            with self._lock:
+                future, worker = self._futures.pop(job_id, (None, None))
+                self._progress.pop(job_id, None)
+                if worker is not None:
+                    worker.pending.discard(job_id)
+            if future is None:
+                continue
+            if kind == "result":
+                future.set_result(payload)
+            else:
+                future.set_exception(payload)
+
+    def _check_workers(self):
+        """Fail the jobs of crashed workers (e.g. OOM-killed) and restart them."""
+        for workers in self._workers.values():
+            for worker in workers:
+                if worker.process.is_alive():
+                    continue
+                logger.error(f"Inference worker {worker.process.name} died "
+                             f"(exit code {worker.process.exitcode}). Restarting...")
+                with self._lock:
+                    lost = [self._futures.pop(job_id)[0] for job_id in worker.pending if job_id in self._futures]
+                    for job_id in worker.pending:
+                        self._progress.pop(job_id, None)
+                    worker.pending.clear()
+                for future in lost:
+                    future.set_exception(RuntimeError(f"Inference worker {worker.process.name} died"))
+                worker.start(self._context, self._torch_threads, self._results)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                lane: [
+                    {"pid": worker.process.pid if worker.process else None, "pending": len(worker.pending)}
+                    for worker in self._workers.get(lane, [])
+                ]
+                for lane in self._sizes
+            }
+
+
+class ModelProxy:
+    """
+    Stand-in for a model singleton: method calls are forwarded to its lane.
+
+    Only method calls are supported, and arguments and results must be picklable
+    when the lane runs out of process.
+    """
+
+    def __init__(self, pool: InferencePool, lane: str):
+        self._pool = pool
+        self._lane = lane
+
+    def __getattr__(self, method: str):
+        if method in BROADCAST_METHODS:
+            return functools.partial(self._broadcast, method)
+        return functools.partial(self._pool.call, self._lane, method)
+
+    def _broadcast(self, method: str, *args, **kwargs):
+        results = self._pool.broadcast(self._lane, method, *args, **kwargs)
+        if all(isinstance(result, bool) for result in results):
+            return all(results)
+        return results[0]
+
+
+inference_pool = InferencePool({
+    "depth": Config.DEPTH_INFERENCE_WORKERS,
+    "splat": Config.SPLAT_INFERENCE_WORKERS,
+})
+depth_model = ModelProxy(inference_pool, "depth")
+splat_model = ModelProxy(inference_pool, "splat")
@@ -0,0 +1,182 @@
+"""
+In-process store for long-running jobs (splat generation, SBS video).
+
+A job is submitted with a function that produces a file; the HTTP request
+returns the job id straight away and the work runs on a small thread pool,
+inside a scheduler slot of the job's lane. Clients poll the job for status
+and progress, then download the artifact, so no HTTP thread is held open for
+minutes and a dropped connection does not lose the result.
+
+Jobs live in memory and their files under Config.TEMP_DIR/jobs/<id>; finished
+jobs are removed after Config.JOB_TTL_SECONDS.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from ..config import Config
+from .scheduler import scheduler, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class Job:
+    def __init__(self, job_id: str, kind: str, lane: str, work_dir: str):
+        self.id = job_id
+        self.kind = kind
+        self.lane = lane
+        self.work_dir = work_dir
+        self.status = JobStatus.QUEUED
+        self.progress = 0.0
+        self.stage = "queued"
+        self.error = None
+        self.result_path = None
+        self.download_name = None
+        self.mimetype = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def report(self, progress: float, stage: str):
+        """Progress callback handed to the model/service."""
+        self.progress = round(max(self.progress, min(float(progress), 1.0)), 3)
+        self.stage = stage
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result_url": f"/api/jobs/{self.id}/result" if self.status == JobStatus.COMPLETED else None,
+        }
+
+
+class JobStore:
+    """
+    Runs jobs on a thread pool and keeps their state until they expire.
+
+    Args:
+        root_dir: Directory holding one working directory per job
+        workers: Jobs running at once (the scheduler lane may admit fewer)
+        ttl_seconds: How long finished jobs and their files are kept
+        max_pending: Unfinished jobs accepted before submit raises QueueFullError
+    """
+
+    def __init__(self, root_dir: str, workers: int, ttl_seconds: float, max_pending: int):
+        self.root_dir = root_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def create(self, kind: str, lane: str) -> Job:
+        """
+        Reserve a job and its working directory; the caller saves inputs there, then calls start().
+
+        Args:
+            kind: Job type reported to clients
+            lane: Scheduler lane the job runs in, or None for work that needs no model
+
+        Raises:
+            QueueFullError: Too many unfinished jobs
+        """
+        self._purge_expired()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise QueueFullError("jobs", self._retry_after(lane or "interactive_splat"))
+            job_id = uuid.uuid4().hex
+            job = Job(job_id, kind, lane, os.path.join(self.root_dir, job_id))
+            os.makedirs(job.work_dir, exist_ok=True)
+            self._jobs[job.id] = job
+        return job
+
+    def start(self, job: Job, fn):
+        """
+        Run fn(job) in the background.
+
+        fn returns (result_path, download_name, mimetype) and should pass
+        job.report as its progress callback.
+        """
+        self._executor.submit(self._run, job, fn)
+        logger.info(f"[Jobs] Queued {job.kind} job {job.id}")
+
+    def get(self, job_id: str):
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn):
+        try:
+            # Wait our turn in the lane instead of failing the job on a full queue
+            while True:
+                try:
+                    with scheduler.slot(job.lane) if job.lane else nullcontext():
+                        job.status = JobStatus.RUNNING
+                        job.stage = "starting"
+                        started = time.time()
+                        job.result_path, job.download_name, job.mimetype = fn(job)
+                    break
+                except QueueFullError as e:
+                    time.sleep(e.retry_after)
+
+            logger.info(f"[Jobs] {job.kind} job {job.id} completed in {time.time() - started:.1f}s")
+            job.finished_at = time.time()
+            job.progress = 1.0
+            job.stage = "done"
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            logger.error(f"[Jobs] {job.kind} job {job.id} failed: {e}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.status = JobStatus.FAILED
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished and now - job.finished_at > self.ttl_seconds]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            logger.info(f"[Jobs] Expired job {job.id}")
+
+    def _retry_after(self, lane: str) -> int:
+        service_time = scheduler.get_stats()[lane]["mean_service_time_s"] or 60
+        return max(1, int(service_time))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            counts = {status: 0 for status in (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.COMPLETED, JobStatus.FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+
+job_store = JobStore(
+    os.path.join(Config.TEMP_DIR, "jobs"),
+    Config.JOB_WORKERS,
+    Config.JOB_TTL_SECONDS,
+    Config.MAX_PENDING_JOBS,
+)
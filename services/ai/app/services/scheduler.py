@@ -0,0 +1,116 @@
+"""
+Priority admission control for inference work.
+
+Every model call runs inside a slot of a lane. When a slot frees up it goes
+to the highest-priority waiting request whose lane is below its own
+concurrency limit, so a user browsing in VR is served before a bulk backfill
+or a video job. Each lane's queue is bounded; once full, further requests are
+refused with QueueFullError, which the API turns into 429 + Retry-After.
+"""
+import itertools
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a lane's queue is full; retry_after is a hint in seconds."""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Too many queued '{lane}' requests, retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Scheduler:
+    """
+    Grants execution slots by lane priority.
+
+    Args:
+        lanes: lane name -> {"priority": int (lower runs first), "concurrency": int, "max_queue": int}
+        max_concurrent: Slots shared by all lanes
+    """
+
+    def __init__(self, lanes: dict, max_concurrent: int):
+        self.lanes = lanes
+        self.max_concurrent = max_concurrent
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []  # (priority, seq, lane), kept sorted
+        self._running = {lane: 0 for lane in lanes}
+        self._completed = {lane: 0 for lane in lanes}
+        self._rejected = {lane: 0 for lane in lanes}
+        # Exponentially weighted mean service time per lane, for Retry-After
+        self._service_time = {lane: None for lane in lanes}
+
+    @contextmanager
+    def slot(self, lane: str):
+        """Block until the request may run in lane; raise QueueFullError if its queue is full."""
+        self._enter(lane)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._leave(lane, time.monotonic() - started)
+
+    def _enter(self, lane: str):
+        config = self.lanes[lane]
+        with self._cond:
+            queued = sum(1 for _, _, waiting_lane in self._waiting if waiting_lane == lane)
+            if queued >= config["max_queue"]:
+                self._rejected[lane] += 1
+                raise QueueFullError(lane, self._retry_after(lane, queued))
+
+            entry = (config["priority"], next(self._seq), lane)
+            self._waiting.append(entry)
+            self._waiting.sort()
+            while self._next_runnable() != entry:
+                self._cond.wait()
+
+            self._waiting.remove(entry)
+            self._running[lane] += 1
+            # Another waiter in a different lane may be runnable too
+            self._cond.notify_all()
+
+    def _leave(self, lane: str, elapsed: float):
+        with self._cond:
+            self._running[lane] -= 1
+            self._completed[lane] += 1
+            previous = self._service_time[lane]
+            self._service_time[lane] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+            self._cond.notify_all()
+
+    def _next_runnable(self):
+        """The highest-priority waiting entry whose lane has capacity, if a global slot is free."""
+        if sum(self._running.values()) >= self.max_concurrent:
+            return None
+        for entry in self._waiting:
+            lane = entry[2]
+            if self._running[lane] < self.lanes[lane]["concurrency"]:
+                return entry
+        return None
+
+    def _retry_after(self, lane: str, queued: int) -> int:
+        service_time = self._service_time[lane] or 1.0
+        return max(1, math.ceil((queued + 1) * service_time / self.lanes[lane]["concurrency"]))
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                lane: {
+                    "running": self._running[lane],
+                    "queued": sum(1 for _, _, waiting_lane in self._waiting if waiting_lane == lane),
+                    "completed": self._completed[lane],
+                    "rejected": self._rejected[lane],
+                    "mean_service_time_s": round(self._service_time[lane], 3) if self._service_time[lane] else None,
+                }
+                for lane in self.lanes
+            }
+
+
+scheduler = Scheduler(Config.SCHEDULER_LANES, Config.SCHEDULER_MAX_CONCURRENT)
@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import numpy as np
+from PIL import Image
+from .cache import DiskCache, content_key
+from .inference_pool import depth_model, splat_model
+from ..models.depth_engine import INPUT_SIZE
+from ..models.sharp_model import SharpModel
+from ..utils.splat_io import (
+    COMPRESSED_CHUNK_PROPERTIES, COMPRESSED_CHUNK_SPLATS, COMPRESSED_RECORD_BYTES, PLY_RECORD_BYTES, SPLAT_RECORD, chunk_index,
+    compressed_ply_data_offset, compressed_ply_size, iter_compressed_ply, iter_ply, iter_splat,
+    ply_header_size, ply_size, splat_count, splat_file_size,
+)
+from ..utils.splat_decimation import decimate
+from ..utils.image_io import load_image
+from ..utils.preview_splats import depth_to_splats
+from ..utils.zip_stream import iter_zip
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Generated splat files (any format), shared by all workers and kept across restarts
+splat_cache = DiskCache(
+    os.path.join(Config.TEMP_DIR, "splat-cache"),
+    int(Config.SPLAT_CACHE_DISK_MB * 2**20),
+)
+
+# Output formats of /api/splat -> file extension
+SPLAT_FORMATS = {
+    "ply": "ply",
+    "splat": "splat",
+    "compressed_ply": "compressed.ply",
+}
+
+# preview: depth-lifted relief in seconds (see utils.preview_splats); full: SHARP
+SPLAT_QUALITIES = ("preview", "full")
+
+# Scheduler lane of each quality; previews must not queue behind a SHARP run
+SPLAT_LANES = {"preview": "interactive_depth", "full": "interactive_splat"}
+
+# SHARP precision of this process's splat lane, kept here so cache lookups do
+# not wait on a busy splat worker (see sharp_precision)
+_sharp_precision = None
+
+
+def parse_splat_options(args) -> dict:
+    """
+    Output options of a splat request from its query parameters.
+    
+    Args:
+        args: Request query parameters
+        
+    Returns:
+        dict: "quality", "format", "chunk_size" (None for a single file), "max_splats"
+            and "budget_mb" (None for no limit), "merge" and "lods" (fractions, or None)
+        
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    quality = args.get('quality', 'full')
+    if quality not in SPLAT_QUALITIES:
+        raise ValueError(f"Quality must be one of {list(SPLAT_QUALITIES)}")
+    
+    output_format = args.get('format', 'ply')
+    if output_format not in SPLAT_FORMATS:
+        raise ValueError(f"Format must be one of {list(SPLAT_FORMATS)}")
+    
+    chunk_size = args.get('chunk_size', type=int)
+    if chunk_size is not None and chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive number of splats")
+    
+    max_splats = args.get('max_splats', type=int)
+    if max_splats is not None and max_splats <= 0:
+        raise ValueError("max_splats must be positive")
+    
+    budget_mb = args.get('budget_mb', type=float)
+    if budget_mb is not None and budget_mb <= 0:
+        raise ValueError("budget_mb must be positive")
+    
+    merge = args.get('merge', 'false').lower() in ('1', 'true', 'yes')
+    
+    lods = None
+    if args.get('lods'):
+        try:
+            lods = tuple(sorted({float(value) for value in args['lods'].split(',')}))
+        except ValueError:
+            raise ValueError("lods must be a comma-separated list of fractions, e.g. 1,0.25,0.05")
+        if not all(0 < fraction <= 1 for fraction in lods):
+            raise ValueError("lods fractions must be in (0, 1]")
+    
+    return {
+        "quality": quality,
+        "format": output_format,
+        "chunk_size": chunk_size,
+        "max_splats": max_splats,
+        "budget_mb": budget_mb,
+        "merge": merge,
+        "lods": lods,
+    }
+
+
+def _record_bytes(output_format: str) -> int:
+    return {
+        "ply": PLY_RECORD_BYTES,
+        "splat": SPLAT_RECORD.itemsize,
+        "compressed_ply": COMPRESSED_RECORD_BYTES,
+    }[output_format]
+
+
+def splat_budget(options: dict):
+    """Maximum number of Gaussians allowed by max_splats / budget_mb, or None for no limit."""
+    limits = []
+    if options["max_splats"]:
+        limits.append(options["max_splats"])
+    if options["budget_mb"]:
+        bytes_per_splat = _record_bytes(options["format"])
+        if options["format"] == "compressed_ply":
+            bytes_per_splat += len(COMPRESSED_CHUNK_PROPERTIES) * 4 / COMPRESSED_CHUNK_SPLATS
+        # Leave room for the PLY header / chunk manifest
+        limits.append(max(1, int((options["budget_mb"] * 2**20 - 64 * 1024) // bytes_per_splat)))
+    return min(limits) if limits else None
+
+
+def splat_download(options: dict, stem: str) -> tuple:
+    """(download name, mimetype) of a splat response."""
+    if options["chunk_size"] or options["lods"]:
+        return f"splat_{stem}.zip", 'application/zip'
+    return f"splat_{stem}.{SPLAT_FORMATS[options['format']]}", 'application/octet-stream'
+
+
+def splat_cache_key(image_bytes: bytes, options: dict) -> str:
+    """
+    Cache key of the splat generated from image_bytes with the given output options.
+    
+    The focal length is derived from the EXIF inside the bytes, so the image
+    hash already covers it; the checkpoint and engine settings identify the model.
+    """
+    if options["quality"] == "preview":
+        return content_key(image_bytes, checkpoint=Config.AVAILABLE_MODELS[Config.SPLAT_PREVIEW_MODEL]["id"],
+                           **depth_model.engine_variant(Config.SPLAT_PREVIEW_MODEL), **options)
+    return content_key(image_bytes, checkpoint=SharpModel.CHECKPOINT_FILENAME,
+                       precision=sharp_precision(), **options)
+
+
+def sharp_precision() -> str:
+    """
+    Precision SHARP runs at, asked of the splat lane only on the first call.
+    
+    It only changes through /api/models/sharp/load, which reports the new
+    value with set_sharp_precision.
+    """
+    global _sharp_precision
+    if _sharp_precision is None:
+        _sharp_precision = splat_model.get_precision()
+    return _sharp_precision
+
+
+def set_sharp_precision(precision: str):
+    """Record the precision the splat lane now runs at."""
+    global _sharp_precision
+    _sharp_precision = precision
+
+
+def splat_model_used(options: dict) -> str:
+    """Model key reported in X-Model-Used for a splat of the given quality."""
+    return Config.SPLAT_PREVIEW_MODEL if options["quality"] == "preview" else "sharp"
+
+
+def open_cached_splat(cache_key: str):
+    """Open the cached splat file for cache_key for reading, or return None on a miss."""
+    path = splat_cache.get_path(cache_key)
+    if path is None:
+        return None
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        # Evicted by another worker in between
+        return None
+
+
+def infer_splats(image_bytes: bytes, progress_callback=None, quality: str = "full") -> dict:
+    """
+    Run SHARP, or the depth model for a preview, on an uploaded image.
+    
+    Args:
+        image_bytes: Uploaded image
+        progress_callback: Optional callable(progress: float 0-1, stage: str)
+        quality: Key of SPLAT_QUALITIES
+        
+    Returns:
+        dict: SharpModel.predict_splats result ("splats", "f_px", "image_size")
+    """
+    if quality == "preview":
+        return preview_splats(image_bytes, progress_callback)
+    
+    # Original bytes, so EXIF (orientation, focal length) reaches sharp_model
+    return splat_model.predict_splats(image_bytes, progress_callback=progress_callback)
+
+
+def preview_splats(image_bytes: bytes, progress_callback=None) -> dict:
+    """
+    Preview splats lifted from a depth map of the image, at the depth model's resolution.
+    
+    Returns:
+        dict: As infer_splats; f_px and image_size describe the original image
+    """
+    report = progress_callback or (lambda progress, stage: None)
+    
+    report(0.1, "depth")
+    image, (width, height), f_px = load_image(image_bytes, min_size=(INPUT_SIZE, INPUT_SIZE))
+    result = depth_model.predict(image, Config.SPLAT_PREVIEW_MODEL, {"resolution": "native", "dtype": "uint16"})
+    disparity = result["depth"].astype(np.float32) / np.iinfo(np.uint16).max
+    
+    report(0.7, "converting")
+    grid_height, grid_width = disparity.shape
+    pixels = np.asarray(image.resize((grid_width, grid_height), Image.Resampling.BILINEAR))
+    splats = depth_to_splats(pixels, disparity, f_px * grid_width / width)
+    
+    logger.info(f"[Splat] Preview of {width}x{height} image: {splat_count(splats)} splats "
+                f"from {result['model']} depth")
+    report(1.0, "done")
+    return {"splats": splats, "f_px": float(f_px), "image_size": (width, height)}
+
+
+def _encode_file(splats: dict, result: dict, options: dict) -> dict:
+    """Encoder and layout of one splat file in the requested format."""
+    f_px, image_size = result["f_px"], result["image_size"]
+    if options["format"] == "splat":
+        body, size, data_offset = iter_splat(splats), splat_file_size(splats), 0
+    elif options["format"] == "compressed_ply":
+        body = iter_compressed_ply(splats, f_px, image_size)
+        size = compressed_ply_size(splats, f_px, image_size)
+        data_offset = compressed_ply_data_offset(splats, f_px, image_size)
+    else:
+        body, size = iter_ply(splats, f_px, image_size), ply_size(splats, f_px, image_size)
+        data_offset = ply_header_size(splats, f_px, image_size)
+    return {"body": body, "size": size, "data_offset": data_offset,
+            "record_bytes": _record_bytes(options["format"])}
+
+
+def _chunk_manifest(splats: dict, encoded: dict, options: dict) -> dict:
+    return {
+        "splat_count": splat_count(splats),
+        "record_bytes": encoded["record_bytes"],
+        "chunk_size": options["chunk_size"],
+        "chunks": chunk_index(splats, options["chunk_size"], encoded["record_bytes"], encoded["data_offset"]),
+    }
+
+
+def encode_splats(result: dict, options: dict):
+    """
+    Chunked encoding of an infer_splats result.
+    
+    Splats are first decimated to the max_splats / budget_mb budget, if
+    any, and are stored in Morton order. With options["chunk_size"] the file is
+    wrapped in a ZIP next to chunks.json, which lists every run of chunk_size
+    splats with its byte range in the file and its bounding box, so a viewer
+    can fetch and cull spatial chunks independently.
+    
+    With options["lods"] the ZIP instead holds one file per level of detail,
+    each decimated from the same inference, preceded by manifest.json and
+    ordered coarsest first so a client can show a preview before the rest
+    has arrived.
+    
+    Args:
+        result: infer_splats result
+        options: parse_splat_options result
+        
+    Returns:
+        tuple: (iterator of bytes, total size in bytes or None if not known up front)
+    """
+    splats = result["splats"]
+    
+    target = splat_budget(options)
+    if target is not None and splat_count(splats) > target:
+        original_count = splat_count(splats)
+        splats = decimate(splats, target, merge=options["merge"])
+        logger.info(f"[Splat] Decimated {original_count} -> {splat_count(splats)} splats")
+    
+    if options["lods"]:
+        return _encode_lods(splats, result, options), None
+    
+    encoded = _encode_file(splats, result, options)
+    if not options["chunk_size"]:
+        return encoded["body"], encoded["size"]
+    
+    manifest = {
+        "file": f"splats.{SPLAT_FORMATS[options['format']]}",
+        "format": options["format"],
+        **_chunk_manifest(splats, encoded, options),
+    }
+    return iter_zip([
+        (manifest["file"], encoded["body"]),
+        ("chunks.json", [json.dumps(manifest).encode()]),
+    ]), None
+
+
+def _encode_lods(splats: dict, result: dict, options: dict):
+    count = splat_count(splats)
+    levels = []
+    for fraction in sorted(options["lods"]):
+        level_splats = decimate(splats, max(1, int(count * fraction)), merge=options["merge"])
+        encoded = _encode_file(level_splats, result, options)
+        level = {
+            "file": f"lod{len(levels)}_{round(fraction * 100)}.{SPLAT_FORMATS[options['format']]}",
+            "fraction": fraction,
+            "splat_count": splat_count(level_splats),
+            "bytes": encoded["size"],
+        }
+        if options["chunk_size"]:
+            level.update(_chunk_manifest(level_splats, encoded, options))
+        levels.append((level, encoded["body"]))
+    
+    logger.info(f"[Splat] Levels of detail: {[level['splat_count'] for level, _ in levels]}")
+    manifest = {
+        "format": options["format"],
+        "levels": [level for level, _ in levels],
+    }
+    return iter_zip(
+        [("manifest.json", [json.dumps(manifest).encode()])] +
+        [(level["file"], body) for level, body in levels]
+    )
+
+
+def generate_splat(image_bytes: bytes, cache_key: str, options: dict, progress_callback=None) -> str:
+    """
+    Generate the splat of an uploaded image and store it encoded in the splat cache.
+    
+    Returns:
+        str: Path of the cached file
+    """
+    result = infer_splats(image_bytes, progress_callback, options["quality"])
+    chunks, _ = encode_splats(result, options)
+    return splat_cache.put_chunks(cache_key, chunks)
+
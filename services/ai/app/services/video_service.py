@@ -48,8 +48,9 @@ class VideoService:
                 shutil.rmtree(frames_dir)
             raise
 
-    def process_depth_video(self, video_path, options):
+    def process_depth_video(self, video_path, options, progress_callback=None):
         """Generate depth maps for video frames and return ZIP buffer."""
+        report = progress_callback or (lambda progress, stage: None)
         frames_dir = None
         depth_maps_dir = None
         
@@ -58,6 +59,7 @@ class VideoService:
             depth_maps_dir = tempfile.mkdtemp()
             
             # Extract frames
+            report(0.0, "extracting_frames")
             frame_files, frames_dir = self.extract_frames(
                 video_path, 
                 options.get('method'), 
@@ -68,10 +70,11 @@ class VideoService:
             logger.info(f"Processing {len(frame_files)} frames")
             
             for i, frame_path in enumerate(frame_files):
+                report(0.05 + 0.9 * i / max(len(frame_files), 1), "depth")
                 frame = cv2.imread(str(frame_path))
                 if frame is None: continue
                 
-                depth_norm = process_frame_depth(frame)
+                depth_norm = process_frame_depth(frame, options.get('output'))
                 
                 # Save
                 depth_path = Path(depth_maps_dir) / f"depth_{frame_path.stem}.png"
@@ -84,14 +87,16 @@ class VideoService:
                     zip_file.write(depth_file, depth_file.name)
             zip_buffer.seek(0)
             
+            report(1.0, "done")
             return zip_buffer
             
         finally:
             if frames_dir: shutil.rmtree(frames_dir, ignore_errors=True)
             if depth_maps_dir: shutil.rmtree(depth_maps_dir, ignore_errors=True)
 
-    def process_sbs_video(self, video_path, options):
+    def process_sbs_video(self, video_path, options, progress_callback=None):
         """Generate SBS video."""
+        report = progress_callback or (lambda progress, stage: None)
         work_dir = None
         
         try:
@@ -105,8 +110,10 @@ class VideoService:
             sbs_format = options.get('format', 'SBS_FULL')
             batch_size = options.get('batch_size', 10)
             codec = options.get('codec', 'h264')
+            output = options.get('output')
             
             # Extract ALL frames
+            report(0.0, "extracting_frames")
             cmd = [
                 'ffmpeg', '-i', video_path,
                 '-qscale:v', '2',
@@ -122,11 +129,14 @@ class VideoService:
                 batch_end = min(batch_start + batch_size, total_frames)
                 batch_frames = frame_files[batch_start:batch_end]
                 
+                report(0.05 + 0.85 * batch_start / max(total_frames, 1), "depth_and_stereo")
+                
                 for frame_path in batch_frames:
                     frame = cv2.imread(str(frame_path))
                     if frame is None: continue
                     
-                    depth_map = process_frame_depth(frame)
+                    # A reduced depth map is brought to frame size with a cheap bilinear resize
+                    depth_map = process_frame_depth(frame, output)
                     
                     if depth_map.shape[:2] != frame.shape[:2]:
                          depth_map = cv2.resize(depth_map, (frame.shape[1], frame.shape[0]))
@@ -140,6 +150,7 @@ class VideoService:
                     torch.cuda.empty_cache()
             
             # Encode
+            report(0.9, "encoding")
             original_fps = get_video_fps(video_path)
             output_filename = f"sbs_output.mp4"
             output_path = os.path.join(work_dir, output_filename)
@@ -164,6 +175,7 @@ class VideoService:
             # Create a persistent temp file to return, allowing work_dir cleanup
             final_output = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
             shutil.move(output_path, final_output)
+            report(1.0, "done")
             return final_output
             
         finally:
@@ -0,0 +1,98 @@
+"""
+Encoders for depth map responses.
+
+An 8-bit PNG at Pillow's default compression is slow to write for large maps
+and throws away precision. The encodings here trade size, speed and
+precision:
+
+- png: 8-bit PNG, default compression (the historical output)
+- png_fast: 8-bit PNG at zlib level 1, several times faster to write
+- webp: lossless WebP at the fastest effort, faster and smaller than PNG.
+  WebP has no grayscale mode, so the 8-bit depth is replicated into R, G
+  and B and decodes as an RGB image; clients read one channel
+- raw16 / rawf16: header + uint16 or float16 samples, which clients copy
+  straight into a texture without decoding an image
+
+Raw layout (little-endian): the 24-byte header RAW_HEADER (magic b"DPTH",
+version, sample type, reserved, width, height, min, max) followed by
+height x width samples in row order. raw16 stores the depth stretched to
+0-65535 and min/max of the original prediction, so the model's values are
+min + sample / 65535 * (max - min); rawf16 stores the model's values directly.
+"""
+import io
+import struct
+import numpy as np
+from PIL import Image
+
+RAW_MAGIC = b"DPTH"
+RAW_VERSION = 1
+RAW_HEADER = struct.Struct("<4sBBHIIff")
+
+# Raw sample type codes in the header
+RAW_SAMPLE_TYPES = {1: np.dtype("<u2"), 2: np.dtype("<f2")}
+
+# encoding -> (depth dtype the engine produces, file extension, mimetype)
+DEPTH_ENCODINGS = {
+    "png": ("uint8", "png", "image/png"),
+    "png_fast": ("uint8", "png", "image/png"),
+    "webp": ("uint8", "webp", "image/webp"),
+    "raw16": ("uint16", "depth", "application/octet-stream"),
+    "rawf16": ("float16", "depth", "application/octet-stream"),
+}
+
+
+def encode_raw(depth: np.ndarray, depth_min: float, depth_max: float) -> bytes:
+    """Header + samples of a uint16 or float16 depth map."""
+    sample_dtype = np.dtype(depth.dtype).newbyteorder("<")
+    sample_type = next(code for code, dtype in RAW_SAMPLE_TYPES.items() if dtype == sample_dtype)
+    height, width = depth.shape
+    header = RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, sample_type, 0, width, height, depth_min, depth_max)
+    return header + np.ascontiguousarray(depth, dtype=sample_dtype).tobytes()
+
+
+def decode_raw(data: bytes) -> tuple:
+    """
+    Parse a raw depth file.
+
+    Returns:
+        tuple: ((height, width) array of samples, min, max)
+
+    Raises:
+        ValueError: If data is not a raw depth file
+    """
+    if len(data) < RAW_HEADER.size:
+        raise ValueError("Truncated raw depth header")
+    magic, version, sample_type, _, width, height, depth_min, depth_max = RAW_HEADER.unpack_from(data)
+    if magic != RAW_MAGIC or version != RAW_VERSION or sample_type not in RAW_SAMPLE_TYPES:
+        raise ValueError("Not a raw depth file")
+    depth = np.frombuffer(data, dtype=RAW_SAMPLE_TYPES[sample_type], count=width * height, offset=RAW_HEADER.size)
+    return depth.reshape(height, width), depth_min, depth_max
+
+
+def encode_depth(result: dict, encoding: str) -> bytes:
+    """
+    Encode a depth prediction.
+
+    Args:
+        result: Depth result with 'depth' in the dtype DEPTH_ENCODINGS lists for
+                encoding, plus 'depth_min' / 'depth_max'
+        encoding: Key of DEPTH_ENCODINGS
+
+    Returns:
+        bytes: The encoded file
+    """
+    depth = result["depth"]
+    if encoding in ("raw16", "rawf16"):
+        return encode_raw(depth, result["depth_min"], result["depth_max"])
+
+    buffer = io.BytesIO()
+    image = Image.fromarray(depth)
+    if encoding == "png_fast":
+        image.save(buffer, 'PNG', compress_level=1)
+    elif encoding == "webp":
+        # quality is the compression effort in lossless mode; the L image is
+        # stored as RGB with equal channels, which lossless mode compresses away
+        image.save(buffer, 'WEBP', lossless=True, quality=0, method=0)
+    else:
+        image.save(buffer, 'PNG')
+    return buffer.getvalue()
@@ -0,0 +1,118 @@
+"""
+Image ingestion: decode uploads close to the resolution a model consumes.
+
+Immich originals are 24-48 MP, while depth models see ~518 px and SHARP
+1536 px. Decoding the full image only to shrink it costs most of the
+request's decode time and hundreds of MB of transient memory, so:
+
+- JPEGs are decoded in the DCT domain at 1/2, 1/4 or 1/8 scale (PIL draft mode)
+- other formats are reduced by an integer box filter right after decoding,
+  before any float conversion
+- EXIF orientation is applied after the reduction, on the small image
+
+The decoded image always covers the requested size, so the model's own
+resize still does the final (antialiased) step. The original size and the
+focal length from EXIF are reported for the full-resolution image.
+"""
+import io
+import logging
+import math
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# HEIC/HEIF support when pillow-heif is installed (it comes with ml-sharp)
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_AVAILABLE = True
+except ImportError:
+    HEIF_AVAILABLE = False
+
+# EXIF tags
+ORIENTATION = 0x0112
+EXIF_IFD = 0x8769
+FOCAL_LENGTH = 0x920A
+FOCAL_LENGTH_35MM = 0xA405
+
+# Orientation -> transposition to display orientation; 5-8 swap width and height
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# Focal length assumed without EXIF, in 35 mm equivalent (as ml-sharp)
+DEFAULT_FOCAL_35MM = 30.0
+
+
+def focal_length_px(exif, width: int, height: int) -> float:
+    """
+    Focal length in pixels of a width x height image from its EXIF.
+
+    Mirrors ml-sharp's load_rgb: the 35 mm equivalent focal length if present,
+    else the physical focal length (multiplied by a crude 8.4 crop factor when
+    below 10 mm), else 30 mm; converted via the 35 mm film diagonal.
+    """
+    exif_ifd = exif.get_ifd(EXIF_IFD) if exif else {}
+    f_35mm = exif_ifd.get(FOCAL_LENGTH_35MM)
+    if f_35mm is None or f_35mm < 1:
+        f_35mm = exif_ifd.get(FOCAL_LENGTH)
+        if f_35mm is None:
+            f_35mm = DEFAULT_FOCAL_35MM
+        elif f_35mm < 10.0:
+            f_35mm *= 8.4
+    return float(f_35mm) * math.hypot(width, height) / math.hypot(36, 24)
+
+
+def _reduce(image: Image.Image, min_size: tuple) -> Image.Image:
+    """Shrink by the largest integer factor that keeps image covering min_size (width, height)."""
+    factor = min(image.width // min_size[0], image.height // min_size[1])
+    return image.reduce(factor) if factor >= 2 else image
+
+
+def load_image(source, min_size: tuple = None) -> tuple:
+    """
+    Decode an image in display orientation, no larger than needed.
+
+    Args:
+        source: Image bytes, path or file object
+        min_size: (width, height) in display orientation the decoded image must
+                  cover; None decodes at full resolution
+
+    Returns:
+        tuple: (RGB PIL image, (width, height) of the full-resolution image in
+               display orientation, focal length in pixels at that resolution)
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    exif = image.getexif()
+    orientation = exif.get(ORIENTATION, 1)
+    transpose = ORIENTATION_TRANSPOSE.get(orientation)
+    swaps_axes = orientation in (5, 6, 7, 8)
+
+    stored_size = image.size
+    original_size = stored_size[::-1] if swaps_axes else stored_size
+
+    if min_size is not None:
+        # Reduction happens before rotation, so work in stored orientation
+        stored_min = tuple(min_size[::-1] if swaps_axes else min_size)
+        if image.format in ('JPEG', 'MPO'):
+            image.draft('RGB', stored_min)
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            # Palette and exotic modes cannot be box-reduced
+            image = image.convert('RGB')
+        image = _reduce(image, stored_min)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if transpose is not None:
+        image = image.transpose(transpose)
+
+    if image.size != original_size:
+        logger.debug(f"Decoded {original_size[0]}x{original_size[1]} image at {image.width}x{image.height}")
+
+    return image, original_size, focal_length_px(exif, *original_size)
@@ -0,0 +1,75 @@
+"""
+Resident memory of this process, for reporting what a model load costs.
+
+Peak RSS comes from the kernel's high-water mark (VmHWM in
+/proc/self/status). On Linux it is reset before a measurement by writing
+"5" to /proc/self/clear_refs, so a load reports its own peak rather than
+the process's lifetime peak. Where that is unavailable the lifetime peak
+from getrusage is reported instead, flagged with "peak_is_lifetime".
+"""
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+def _status_kb(field: str):
+    """A kB value from /proc/self/status, or None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb():
+    """Current resident set size in MB, or None if unknown."""
+    kb = _status_kb("VmRSS")
+    return round(kb / 1024, 1) if kb is not None else None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark; False if not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """RSS high-water mark in MB since the last reset (or process start)."""
+    kb = _status_kb("VmHWM")
+    if kb is None:
+        # ru_maxrss is in bytes on macOS, kB elsewhere
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        kb = maxrss / 1024 if sys.platform == "darwin" else maxrss
+    return round(kb / 1024, 1)
+
+
+@contextmanager
+def track_memory():
+    """
+    Measure the wall time and memory of a block.
+
+    Yields a dict that is filled in when the block exits, with 'seconds',
+    'rss_before_mb', 'rss_after_mb', 'peak_rss_mb' and 'peak_is_lifetime'.
+    """
+    stats = {}
+    reset = reset_peak_rss()
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.update({
+            "seconds": round(time.perf_counter() - start, 3),
+            "rss_before_mb": rss_before,
+            "rss_after_mb": current_rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_is_lifetime": not reset,
+        })
@@ -0,0 +1,58 @@
+"""
+Preview splats lifted from a depth map.
+
+SHARP's encoder only runs on its full 1536 x 1536 image pyramid, so a
+faster SHARP pass is not possible. A preview instead unprojects every pixel
+of a Depth Anything depth map to one small isotropic Gaussian, which takes
+seconds: a 2.5D relief of the photo that a viewer can show while the full
+splat is generated.
+
+Depth Anything predicts relative inverse depth (disparity) only, so the
+normalized disparity is mapped to PREVIEW_DEPTH_RANGE; the result is in the
+same camera frame as SHARP's (x right, y down, z forward), but its scale is
+only approximate.
+"""
+import numpy as np
+from .splat_io import sort_splats, srgb_to_linear
+
+# Scene depth the nearest and farthest disparity are mapped to
+PREVIEW_DEPTH_RANGE = (1.0, 10.0)
+
+# Gaussian standard deviation in pixel footprints; above 0.5 neighbours overlap without gaps
+FOOTPRINT_SCALE = 0.6
+
+
+def depth_to_splats(image: np.ndarray, disparity: np.ndarray, f_px: float) -> dict:
+    """
+    One Gaussian per pixel of a relative depth map, in Morton order.
+
+    Args:
+        image: (h, w, 3) uint8 sRGB image at the depth map's resolution
+        disparity: (h, w) relative inverse depth normalized to 0-1, 1 nearest
+        f_px: Focal length in pixels at that resolution
+
+    Returns:
+        dict: Splat arrays (see utils.splat_io)
+    """
+    height, width = disparity.shape
+    near, far = PREVIEW_DEPTH_RANGE
+    depth = 1.0 / (disparity.astype(np.float32) * (1 / near - 1 / far) + 1 / far)
+
+    # Pixel centres relative to the principal point, as SHARP's intrinsics
+    rows, cols = np.mgrid[0:height, 0:width].astype(np.float32)
+    means = np.stack([
+        (cols + 0.5 - width / 2) * depth / f_px,
+        (rows + 0.5 - height / 2) * depth / f_px,
+        depth,
+    ], axis=-1).reshape(-1, 3)
+
+    count = height * width
+    quaternions = np.zeros((count, 4), dtype=np.float32)
+    quaternions[:, 0] = 1.0
+    return sort_splats({
+        "means": means,
+        "scales": np.repeat((depth * (FOOTPRINT_SCALE / f_px)).reshape(-1, 1), 3, axis=1),
+        "quaternions": quaternions,
+        "colors": srgb_to_linear(image.reshape(-1, 3).astype(np.float32) / 255).astype(np.float32),
+        "opacities": np.ones(count, dtype=np.float32),
+    })
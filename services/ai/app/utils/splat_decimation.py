@@ -0,0 +1,113 @@
+"""
+Reduce a splat to a Gaussian budget after inference.
+
+SHARP emits a Gaussian per output pixel and layer, far more than a headset
+browser can render at frame rate. Pruning keeps the Gaussians that cover the
+most of the image: importance is opacity times projected footprint (area of
+the two largest axes divided by squared depth, the camera being at the
+origin looking down +z). Merging first collapses Morton-contiguous Gaussians
+that share an octree cell into one, so detail is averaged rather than
+dropped.
+
+All functions take and return splat arrays in Morton order (see splat_io).
+"""
+import numpy as np
+from .splat_io import SPLAT_FIELDS, morton_codes, splat_count
+
+
+def importance(splats: dict) -> np.ndarray:
+    """Opacity x projected area of each Gaussian (up to a constant factor)."""
+    scales = np.sort(splats["scales"], axis=1)
+    footprint = scales[:, 1] * scales[:, 2]
+    depth = np.maximum(np.abs(splats["means"][:, 2]), 1e-3)
+    return splats["opacities"] * footprint / depth ** 2
+
+
+def prune(splats: dict, target: int) -> dict:
+    """Keep the target most important Gaussians, preserving their order."""
+    if splat_count(splats) <= target:
+        return splats
+    keep = np.sort(np.argpartition(-importance(splats), target - 1)[:target])
+    return {field: splats[field][keep] for field in SPLAT_FIELDS}
+
+
+def _cell_starts(codes: np.ndarray, target: int) -> np.ndarray:
+    """
+    Start indices of the octree cells at the coarsest level that still has at least target cells.
+
+    Codes are sorted, so every octree cell is a contiguous run.
+    """
+    starts = np.arange(len(codes))
+    for level in range(1, 21):
+        cells = codes >> (3 * level)
+        coarser = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        if len(coarser) < target:
+            break
+        starts = coarser
+    return starts
+
+
+def merge_cells(splats: dict, target: int) -> dict:
+    """
+    Merge Gaussians sharing an octree cell, leaving at least target Gaussians.
+
+    Each cell becomes one Gaussian: importance-weighted mean position and
+    color, combined opacity 1 - prod(1 - a), per-axis scale grown by the
+    spread of the merged centres, and the rotation of the most important
+    member. This is an approximation of the mixture, good enough for the
+    far-away and low-opacity Gaussians that dominate large cells.
+    """
+    count = splat_count(splats)
+    if count <= target:
+        return splats
+
+    # Codes depend on the current bounding box, so the input order (e.g. after
+    # a prune, or from another box) need not match them: sort so cells are contiguous
+    codes = morton_codes(splats["means"])
+    order = np.argsort(codes, kind="stable")
+    splats = {field: splats[field][order] for field in SPLAT_FIELDS}
+    starts = _cell_starts(codes[order], target)
+    if len(starts) == count:
+        return splats
+
+    weights = importance(splats) + 1e-12
+    cell_weight = np.add.reduceat(weights, starts)
+
+    def weighted_mean(values):
+        return np.add.reduceat(values * weights[:, None], starts) / cell_weight[:, None]
+
+    means = weighted_mean(splats["means"])
+    spread = weighted_mean(splats["means"] ** 2) - means ** 2
+    cell_of = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, count]))
+    scales = np.sqrt(weighted_mean(splats["scales"] ** 2) + np.maximum(spread, 0.0))
+
+    transparency = np.exp(np.add.reduceat(np.log(np.clip(1.0 - splats["opacities"], 1e-6, 1.0)), starts))
+
+    # Most important member of each cell
+    order = np.lexsort((-weights, cell_of))
+    leaders = order[starts]
+
+    return {
+        "means": means.astype(np.float32),
+        "scales": scales.astype(np.float32),
+        "quaternions": splats["quaternions"][leaders],
+        "colors": weighted_mean(splats["colors"]).astype(np.float32),
+        "opacities": (1.0 - transparency).astype(np.float32),
+    }
+
+
+def decimate(splats: dict, target: int, merge: bool = False) -> dict:
+    """
+    Reduce splats to at most target Gaussians.
+
+    Args:
+        splats: Splat arrays in Morton order
+        target: Maximum number of Gaussians to keep
+        merge: Merge neighbours in the same spatial cell before pruning
+
+    Returns:
+        dict: Splat arrays in Morton order
+    """
+    if merge:
+        splats = merge_cells(splats, target)
+    return prune(splats, target)
@@ -0,0 +1,370 @@
+"""
+Gaussian splat serialization straight from the model output.
+
+SHARP's save_ply needs a file path, so serving a splat used to mean writing
+it to disk and reading it back. Here the Gaussians are converted once to
+plain float32 arrays and encoded chunk by chunk, so a response can stream
+while the rest is still being encoded.
+
+Splats are passed around as a dict of CPU numpy arrays (SPLAT_FIELDS):
+    means:       (N, 3) positions
+    scales:      (N, 3) per-axis standard deviations
+    quaternions: (N, 4) rotations, (w, x, y, z); the .splat record keeps this
+                 order, the compressed PLY packs them as (x, y, z, w)
+    colors:      (N, 3) linear RGB in 0-1
+    opacities:   (N,)   opacity in 0-1
+"""
+import numpy as np
+
+# Zeroth-order spherical harmonic basis constant
+SH_C0 = 0.28209479177387814
+
+SPLAT_FIELDS = ("means", "scales", "quaternions", "colors", "opacities")
+
+# Vertex layout written by ml-sharp's save_ply (all little-endian float32)
+PLY_PROPERTIES = (
+    "x", "y", "z",
+    "f_dc_0", "f_dc_1", "f_dc_2",
+    "opacity",
+    "scale_0", "scale_1", "scale_2",
+    "rot_0", "rot_1", "rot_2", "rot_3",
+)
+
+# Record of the .splat format read by web viewers (antimatter15/splat,
+# gaussian-splats-3d): 32 bytes per Gaussian, no header
+SPLAT_RECORD = np.dtype([
+    ("position", "<f4", 3),  # x, y, z
+    ("scale", "<f4", 3),     # linear (not log) scales
+    ("color", "u1", 4),      # sRGB + opacity, 0-255
+    ("rotation", "u1", 4),   # normalized (w, x, y, z) mapped to q * 128 + 128
+])
+
+# Compressed PLY (the PlayCanvas / SuperSplat layout): splats are grouped in
+# chunks of 256; each chunk stores float bounds and each splat four packed
+# uint32 values quantized within its chunk's bounds
+COMPRESSED_CHUNK_SPLATS = 256
+COMPRESSED_CHUNK_PROPERTIES = (
+    "min_x", "min_y", "min_z", "max_x", "max_y", "max_z",
+    "min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z",
+)
+COMPRESSED_VERTEX_PROPERTIES = ("packed_position", "packed_rotation", "packed_scale", "packed_color")
+COMPRESSED_RECORD_BYTES = len(COMPRESSED_VERTEX_PROPERTIES) * 4
+
+DEFAULT_CHUNK_SPLATS = 65536
+
+
+def gaussians_to_arrays(gaussians) -> dict:
+    """
+    Convert ml-sharp Gaussians3D (batch of one) to splat arrays.
+
+    Args:
+        gaussians: Gaussians3D with mean_vectors, singular_values, quaternions,
+            colors and opacities tensors of shape (1, N, ...)
+
+    Returns:
+        dict: SPLAT_FIELDS -> float32 numpy arrays
+    """
+    def flat(tensor, width):
+        return tensor.detach().reshape(-1, width).float().cpu().numpy()
+
+    return {
+        "means": flat(gaussians.mean_vectors, 3),
+        "scales": flat(gaussians.singular_values, 3),
+        "quaternions": flat(gaussians.quaternions, 4),
+        "colors": flat(gaussians.colors, 3),
+        "opacities": flat(gaussians.opacities, 1)[:, 0],
+    }
+
+
+def splat_count(splats: dict) -> int:
+    return len(splats["opacities"])
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Spread the low 21 bits of each value so they occupy every third bit."""
+    values = values & 0x1FFFFF
+    values = (values | values << 32) & 0x1F00000000FFFF
+    values = (values | values << 16) & 0x1F0000FF0000FF
+    values = (values | values << 8) & 0x100F00F00F00F00F
+    values = (values | values << 4) & 0x10C30C30C30C30C3
+    values = (values | values << 2) & 0x1249249249249249
+    return values
+
+
+def morton_codes(positions: np.ndarray) -> np.ndarray:
+    """
+    63-bit Morton (Z-order) codes of positions.
+
+    Each axis is quantized to 21 bits over the bounding box of all positions
+    and the bits of x, y and z are interleaved, so nearby codes are nearby in
+    space along a Z-order curve.
+
+    Args:
+        positions: (N, 3) array
+
+    Returns:
+        np.ndarray: (N,) int64 codes
+    """
+    positions = np.nan_to_num(positions.astype(np.float64))
+    low = positions.min(axis=0)
+    extent = np.maximum(positions.max(axis=0) - low, 1e-12)
+    cells = np.clip((positions - low) / extent * 0x1FFFFF, 0, 0x1FFFFF).astype(np.int64)
+    return _spread_bits(cells[:, 0]) | (_spread_bits(cells[:, 1]) << 1) | (_spread_bits(cells[:, 2]) << 2)
+
+
+def morton_order(positions: np.ndarray) -> np.ndarray:
+    """Permutation that sorts positions along the Morton curve."""
+    return np.argsort(morton_codes(positions), kind="stable")
+
+
+def sort_splats(splats: dict) -> dict:
+    """Splats reordered along the Morton curve, so consecutive splats are spatial neighbours."""
+    order = morton_order(splats["means"])
+    return {field: splats[field][order] for field in SPLAT_FIELDS}
+
+
+def chunk_index(splats: dict, chunk_splats: int, record_bytes: int, data_offset: int = 0) -> list:
+    """
+    Describe fixed-size runs of (spatially ordered) splats in an encoded file.
+
+    Args:
+        splats: Splat arrays, in file order
+        chunk_splats: Splats per chunk
+        record_bytes: Encoded size of one splat
+        data_offset: Byte offset of the first splat (e.g. the PLY header size)
+
+    Returns:
+        list: One dict per chunk with first/count, byte_offset/byte_length and
+            the min/max corners of its bounding box
+    """
+    chunks = []
+    count = splat_count(splats)
+    for index, start in enumerate(range(0, count, chunk_splats)):
+        end = min(start + chunk_splats, count)
+        positions = splats["means"][start:end]
+        chunks.append({
+            "index": index,
+            "first": start,
+            "count": end - start,
+            "byte_offset": data_offset + start * record_bytes,
+            "byte_length": (end - start) * record_bytes,
+            "min": positions.min(axis=0).tolist(),
+            "max": positions.max(axis=0).tolist(),
+        })
+    return chunks
+
+
+def linear_to_srgb(values: np.ndarray) -> np.ndarray:
+    values = np.clip(values, 0.0, None)
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * np.power(values, 1 / 2.4) - 0.055)
+
+
+def srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    values = np.clip(values, 0.0, 1.0)
+    return np.where(values <= 0.04045, values / 12.92, np.power((values + 0.055) / 1.055, 2.4))
+
+
+def _ply_header(count: int, f_px: float = None, image_size: tuple = None) -> bytes:
+    lines = ["ply", "format binary_little_endian 1.0", "comment generated by ImmichVR AI service (ml-sharp)"]
+    # save_ply stores the camera as extra elements; consumers only read the
+    # vertices, so it is kept as comments here
+    if f_px is not None:
+        lines.append(f"comment focal_px {f_px:.4f}")
+    if image_size is not None:
+        lines.append(f"comment image_size {image_size[0]} {image_size[1]}")
+    lines.append(f"element vertex {count}")
+    lines.extend(f"property float {name}" for name in PLY_PROPERTIES)
+    lines.append("end_header")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+PLY_RECORD_BYTES = len(PLY_PROPERTIES) * 4
+
+
+def ply_header_size(splats: dict, f_px: float = None, image_size: tuple = None) -> int:
+    return len(_ply_header(splat_count(splats), f_px, image_size))
+
+
+def ply_size(splats: dict, f_px: float = None, image_size: tuple = None) -> int:
+    """Size in bytes of iter_ply's output, for a Content-Length header."""
+    return ply_header_size(splats, f_px, image_size) + splat_count(splats) * PLY_RECORD_BYTES
+
+
+def iter_ply(splats: dict, f_px: float = None, image_size: tuple = None,
+             chunk_splats: int = DEFAULT_CHUNK_SPLATS):
+    """
+    Encode splats as a binary PLY, yielding the header and then one chunk of vertices at a time.
+
+    Attributes are encoded as save_ply does: colors as sRGB DC spherical
+    harmonics, opacity as a logit and scales as logs.
+
+    Args:
+        splats: Splat arrays (see module docstring)
+        f_px: Focal length in pixels, recorded as a header comment
+        image_size: (width, height) of the source image, recorded as a header comment
+        chunk_splats: Vertices per yielded chunk
+
+    Yields:
+        bytes
+    """
+    count = splat_count(splats)
+    yield _ply_header(count, f_px, image_size)
+
+    for start in range(0, count, chunk_splats):
+        end = min(start + chunk_splats, count)
+        rows = np.empty((end - start, len(PLY_PROPERTIES)), dtype="<f4")
+        rows[:, 0:3] = splats["means"][start:end]
+        rows[:, 3:6] = (linear_to_srgb(splats["colors"][start:end]) - 0.5) / SH_C0
+        opacities = np.clip(splats["opacities"][start:end], 1e-6, 1 - 1e-6)
+        rows[:, 6] = np.log(opacities / (1 - opacities))
+        rows[:, 7:10] = np.log(np.maximum(splats["scales"][start:end], 1e-12))
+        rows[:, 10:14] = splats["quaternions"][start:end]
+        yield rows.tobytes()
+
+
+def splat_file_size(splats: dict) -> int:
+    """Size in bytes of iter_splat's output."""
+    return splat_count(splats) * SPLAT_RECORD.itemsize
+
+
+def iter_splat(splats: dict, chunk_splats: int = DEFAULT_CHUNK_SPLATS):
+    """
+    Encode splats in the headerless 32-byte-per-Gaussian .splat format, one chunk at a time.
+
+    Args:
+        splats: Splat arrays (see module docstring)
+        chunk_splats: Gaussians per yielded chunk
+
+    Yields:
+        bytes
+    """
+    count = splat_count(splats)
+    for start in range(0, count, chunk_splats):
+        end = min(start + chunk_splats, count)
+        records = np.empty(end - start, dtype=SPLAT_RECORD)
+        records["position"] = splats["means"][start:end]
+        records["scale"] = splats["scales"][start:end]
+
+        colors = np.clip(linear_to_srgb(splats["colors"][start:end]), 0.0, 1.0)
+        records["color"][:, :3] = np.round(colors * 255)
+        records["color"][:, 3] = np.round(np.clip(splats["opacities"][start:end], 0.0, 1.0) * 255)
+
+        quaternions = splats["quaternions"][start:end]
+        quaternions = quaternions / np.maximum(np.linalg.norm(quaternions, axis=1, keepdims=True), 1e-12)
+        records["rotation"] = np.clip(np.round(quaternions * 128 + 128), 0, 255)
+        yield records.tobytes()
+
+
+def _compressed_ply_header(count: int, f_px: float = None, image_size: tuple = None) -> bytes:
+    chunks = -(-count // COMPRESSED_CHUNK_SPLATS)
+    lines = [
+        "ply",
+        "format binary_little_endian 1.0",
+        "comment generated by ImmichVR AI service (ml-sharp)",
+        # Layout, so the file can be decoded without knowing the convention
+        "comment compressed splats: vertex i belongs to chunk i / 256",
+        "comment packed_position: x 11 bits << 21 | y 10 bits << 11 | z 11 bits, unorm within chunk min/max",
+        "comment packed_scale: same bit layout, unorm of log scale within chunk min_scale/max_scale",
+        "comment packed_color: r << 24 | g << 16 | b << 8 | opacity, 8 bits each, sRGB",
+        "comment packed_rotation: index of largest component (x, y, z, w order) << 30 | other three,"
+        " 10 bits each, unorm of value * sqrt(2) / 2 + 0.5",
+    ]
+    if f_px is not None:
+        lines.append(f"comment focal_px {f_px:.4f}")
+    if image_size is not None:
+        lines.append(f"comment image_size {image_size[0]} {image_size[1]}")
+    lines.append(f"element chunk {chunks}")
+    lines.extend(f"property float {name}" for name in COMPRESSED_CHUNK_PROPERTIES)
+    lines.append(f"element vertex {count}")
+    lines.extend(f"property uint {name}" for name in COMPRESSED_VERTEX_PROPERTIES)
+    lines.append("end_header")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def compressed_ply_data_offset(splats: dict, f_px: float = None, image_size: tuple = None) -> int:
+    """Byte offset of the first packed vertex in iter_compressed_ply's output."""
+    count = splat_count(splats)
+    chunks = -(-count // COMPRESSED_CHUNK_SPLATS)
+    return len(_compressed_ply_header(count, f_px, image_size)) + chunks * len(COMPRESSED_CHUNK_PROPERTIES) * 4
+
+
+def compressed_ply_size(splats: dict, f_px: float = None, image_size: tuple = None) -> int:
+    """Size in bytes of iter_compressed_ply's output."""
+    return compressed_ply_data_offset(splats, f_px, image_size) + splat_count(splats) * COMPRESSED_RECORD_BYTES
+
+
+def _pack_unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    return np.floor(np.clip(values, 0.0, 1.0) * ((1 << bits) - 1) + 0.5).astype(np.uint32)
+
+
+def _pack_111011(values: np.ndarray) -> np.ndarray:
+    return (_pack_unorm(values[:, 0], 11) << 21) | (_pack_unorm(values[:, 1], 10) << 11) | _pack_unorm(values[:, 2], 11)
+
+
+def _pack_rotations(quaternions: np.ndarray) -> np.ndarray:
+    """
+    Smallest-three encoding: the largest component is dropped and rebuilt from the unit norm.
+
+    Components are packed in PlayCanvas's (x, y, z, w) order, i.e.
+    packRot(rot_1, rot_2, rot_3, rot_0), which is what its unpackRot expects.
+    """
+    quaternions = quaternions[:, [1, 2, 3, 0]]
+    quaternions = quaternions / np.maximum(np.linalg.norm(quaternions, axis=1, keepdims=True), 1e-12)
+    largest = np.argmax(np.abs(quaternions), axis=1)
+    rows = np.arange(len(quaternions))
+    quaternions = quaternions * np.sign(quaternions[rows, largest])[:, None]
+
+    packed = largest.astype(np.uint32)
+    others = np.ones_like(quaternions, dtype=bool)
+    others[rows, largest] = False
+    for component in quaternions[others].reshape(-1, 3).T:
+        packed = (packed << 10) | _pack_unorm(component * (np.sqrt(2) * 0.5) + 0.5, 10)
+    return packed
+
+
+def iter_compressed_ply(splats: dict, f_px: float = None, image_size: tuple = None,
+                        chunk_splats: int = DEFAULT_CHUNK_SPLATS):
+    """
+    Encode splats as a compressed PLY (16 bytes per Gaussian plus 48 per 256), yielding it in pieces.
+
+    Positions and log scales are quantized to 11/10/11 bits relative to the
+    bounds of their 256-splat chunk, so spatially ordered input keeps the
+    most precision; colors and opacity take 8 bits and rotations 32 bits.
+
+    Args:
+        splats: Splat arrays (see module docstring), ideally in Morton order
+        f_px: Focal length in pixels, recorded as a header comment
+        image_size: (width, height) of the source image, recorded as a header comment
+        chunk_splats: Vertices per yielded piece (a multiple of 256)
+
+    Yields:
+        bytes
+    """
+    count = splat_count(splats)
+    yield _compressed_ply_header(count, f_px, image_size)
+    if count == 0:
+        return
+
+    starts = np.arange(0, count, COMPRESSED_CHUNK_SPLATS)
+    log_scales = np.log(np.maximum(splats["scales"], 1e-12))
+    bounds = np.empty((len(starts), len(COMPRESSED_CHUNK_PROPERTIES)), dtype="<f4")
+    bounds[:, 0:3] = np.minimum.reduceat(splats["means"], starts)
+    bounds[:, 3:6] = np.maximum.reduceat(splats["means"], starts)
+    bounds[:, 6:9] = np.minimum.reduceat(log_scales, starts)
+    bounds[:, 9:12] = np.maximum.reduceat(log_scales, starts)
+    yield bounds.tobytes()
+
+    for start in range(0, count, chunk_splats):
+        end = min(start + chunk_splats, count)
+        chunk_of = np.arange(start, end) // COMPRESSED_CHUNK_SPLATS
+        low, high = bounds[chunk_of, 0:3], bounds[chunk_of, 3:6]
+        scale_low, scale_high = bounds[chunk_of, 6:9], bounds[chunk_of, 9:12]
+
+        rows = np.empty((end - start, len(COMPRESSED_VERTEX_PROPERTIES)), dtype="<u4")
+        rows[:, 0] = _pack_111011((splats["means"][start:end] - low) / np.maximum(high - low, 1e-12))
+        rows[:, 1] = _pack_rotations(splats["quaternions"][start:end])
+        rows[:, 2] = _pack_111011((log_scales[start:end] - scale_low) / np.maximum(scale_high - scale_low, 1e-12))
+        colors = linear_to_srgb(splats["colors"][start:end])
+        rows[:, 3] = ((_pack_unorm(colors[:, 0], 8) << 24) | (_pack_unorm(colors[:, 1], 8) << 16) |
+                      (_pack_unorm(colors[:, 2], 8) << 8) | _pack_unorm(splats["opacities"][start:end], 8))
+        yield rows.tobytes()
@@ -0,0 +1,47 @@
+import io
+import zipfile
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable file object that collects written bytes until drained."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_zip(members):
+    """
+    Build an uncompressed ZIP archive incrementally.
+
+    Members are written one after another and archive bytes are yielded as
+    soon as they are produced, so large members never sit in memory whole.
+
+    Args:
+        members: Iterable of (name, iterable of bytes)
+
+    Yields:
+        bytes
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zip_file:
+        for name, chunks in members:
+            # Sizes are unknown up front, so always allow zip64 entries
+            with zip_file.open(name, 'w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    yield sink.drain()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Compare reduced-precision depth inference against fp32 on a fixed image set.
+
+Every image is run through each model at fp32 and at int8 on CPU, on each
+requested backend. The script reports throughput of every variant and how far
+its depth maps are from the PyTorch fp32 ones:
+
+- mae_pct / p99_pct: mean and 99th percentile absolute difference of the
+  min/max-normalized maps, in percent of the depth range
+- uint8_changed_pct: share of pixels whose 8-bit /api/depth output changes
+  by more than one level
+
+With --sharp, SHARP is run at fp32 and bf16 as well, and the bf16 Gaussians
+are compared one to one with the fp32 ones:
+
+- position_pct / position_p99_pct: median and 99th percentile distance
+  between matching Gaussian centres, in percent of the centre's distance
+  from the camera
+- scale_log_mae: mean absolute log ratio of the Gaussian scales
+- color_mae / opacity_mae: mean absolute difference of colors and opacities
+
+The SHARP comparison is also a pass/fail check: the script exits with status
+1 when position_pct exceeds --max-position-pct or opacity_mae exceeds
+--max-opacity-mae, so it can gate a deployment or run in CI.
+
+Usage:
+    python benchmark_precision.py [--models small base large] [--backends torch onnx] [--sharp]
+                                  [--max-position-pct 1.0] [--max-opacity-mae 0.02]
+                                  [--images DIR] [--runs 3]
+
+Without --images a fixed set of synthetic scenes is used, so numbers are
+comparable between machines; pass a directory of real photos for decisions.
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.config import Config
+from app.models.depth_engine import DepthEngine, postprocess_depth
+from app.models.onnx_engine import OnnxDepthEngine
+from app.models.sharp_model import SharpModel, sharp_model
+from app.utils.image_io import load_image
+
+
+def create_test_images(count=6, size=(1024, 768)):
+    """Deterministic synthetic scenes: shapes over a vertical gradient."""
+    rng = np.random.default_rng(0)
+    width, height = size
+    images = []
+    for _ in range(count):
+        gradient = np.linspace(40, 220, height, dtype=np.float32)[:, None, None]
+        background = np.broadcast_to(gradient * rng.uniform(0.6, 1.0, 3), (height, width, 3))
+        image = Image.fromarray(background.astype(np.uint8))
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x0, y0 = rng.integers(0, width - 100), rng.integers(0, height - 100)
+            x1, y1 = x0 + rng.integers(50, 400), y0 + rng.integers(50, 300)
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            if rng.random() < 0.5:
+                draw.rectangle([x0, y0, x1, y1], fill=color, outline='black', width=3)
+            else:
+                draw.ellipse([x0, y0, x1, y1], fill=color, outline='black', width=3)
+        images.append(image)
+    return images
+
+
+def load_images(directory, min_size=(518, 518)):
+    """Images of a directory in name order, decoded near min_size."""
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.heic', '.tif', '.tiff')):
+            image, _, _ = load_image(os.path.join(directory, name), min_size=min_size)
+            images.append(image)
+    return images
+
+
+def time_inference(engine, images, runs):
+    """Images per second over runs passes, after one warm-up pass; also returns the predictions."""
+    predictions = [engine.infer([image])[0] for image in images]
+    start = time.perf_counter()
+    for _ in range(runs):
+        for image in images:
+            engine.infer([image])
+    return runs * len(images) / (time.perf_counter() - start), predictions
+
+
+def normalized(depth):
+    depth = depth.float().cpu().numpy()
+    return (depth - depth.min()) / max(float(depth.max() - depth.min()), 1e-10)
+
+
+def compare_depth(reference, candidate):
+    """Accuracy delta of one candidate prediction against the fp32 reference."""
+    difference = np.abs(normalized(candidate) - normalized(reference))
+    reference_8bit = postprocess_depth(reference)["depth"].astype(np.int16)
+    candidate_8bit = postprocess_depth(candidate)["depth"].astype(np.int16)
+    return {
+        "mae_pct": 100 * float(difference.mean()),
+        "p99_pct": 100 * float(np.percentile(difference, 99)),
+        "uint8_changed_pct": 100 * float((np.abs(candidate_8bit - reference_8bit) > 1).mean()),
+    }
+
+
+# Default bf16 tolerances of the SHARP check
+MAX_POSITION_PCT = 1.0
+MAX_OPACITY_MAE = 0.02
+
+# backend -> (engine class, MODEL_CACHE_DIR subdirectory), as DepthModel loads them
+ENGINES = {
+    "torch": (DepthEngine, "quantized"),
+    "onnx": (OnnxDepthEngine, "onnx"),
+}
+
+
+def benchmark_depth(model_keys, images, runs, backends=("torch",)):
+    """Print throughput and accuracy of each backend and precision against PyTorch fp32; returns the rows."""
+    rows = []
+    for model_key in model_keys:
+        model_id = Config.AVAILABLE_MODELS[model_key]["id"]
+        print(f"\n{model_key} ({model_id})")
+
+        reference = None
+        for backend in backends:
+            engine_class, cache_subdir = ENGINES[backend]
+            cache_dir = os.path.join(Config.MODEL_CACHE_DIR, cache_subdir)
+            for precision in ("fp32", "int8"):
+                load_start = time.perf_counter()
+                engine = engine_class.load(model_id, -1, batch_size=1, precision=precision, cache_dir=cache_dir)
+                load_time = time.perf_counter() - load_start
+                throughput, predictions = time_inference(engine, images, runs)
+                del engine
+                print(f"  {backend}/{precision}: {throughput:.2f} images/s (load {load_time:.1f}s)")
+                row = {"model": model_key, "backend": backend, "precision": precision, "images_per_s": throughput}
+                rows.append(row)
+
+                if reference is None:
+                    reference = (row, predictions)
+                    continue
+                deltas = [compare_depth(expected, candidate)
+                          for expected, candidate in zip(reference[1], predictions)]
+                summary = {name: float(np.mean([delta[name] for delta in deltas])) for name in deltas[0]}
+                speedup = throughput / reference[0]["images_per_s"]
+                row.update(summary, speedup=speedup)
+                print(f"    vs {reference[0]['backend']}/fp32: {speedup:.2f}x, mean abs error {summary['mae_pct']:.2f}%, "
+                      f"p99 {summary['p99_pct']:.2f}%, 8-bit pixels changed {summary['uint8_changed_pct']:.2f}%")
+    return rows
+
+
+def compare_gaussians(reference, candidate):
+    """Accuracy delta of candidate Gaussians against the fp32 reference, matched by index."""
+    def field(gaussians, name):
+        # Per-Gaussian tensors are shaped (batch, N, ...)
+        values = getattr(gaussians, name).detach().float().cpu().numpy()
+        return values.reshape(-1, *values.shape[2:])
+
+    positions = field(reference, "mean_vectors")
+    distance = np.linalg.norm(field(candidate, "mean_vectors") - positions, axis=-1)
+    relative = distance / np.maximum(np.linalg.norm(positions, axis=-1), 1e-6)
+    scale_ratio = np.log(np.maximum(field(candidate, "singular_values"), 1e-10)
+                         / np.maximum(field(reference, "singular_values"), 1e-10))
+    return {
+        "position_pct": 100 * float(np.median(relative)),
+        "position_p99_pct": 100 * float(np.percentile(relative, 99)),
+        "scale_log_mae": float(np.abs(scale_ratio).mean()),
+        "color_mae": float(np.abs(field(candidate, "colors") - field(reference, "colors")).mean()),
+        "opacity_mae": float(np.abs(field(candidate, "opacities") - field(reference, "opacities")).mean()),
+    }
+
+
+def benchmark_sharp(images, runs):
+    """Print SHARP fp32 vs bf16 time per image and Gaussian accuracy on CPU; returns the rows."""
+    # Focal length as load_image assumes without EXIF: 30 mm equivalent
+    focal_lengths = [30 * np.hypot(image.width, image.height) / np.hypot(36, 24) for image in images]
+    print(f"\nsharp ({SharpModel.CHECKPOINT_FILENAME})")
+
+    rows, results = [], {}
+    for precision in ("fp32", "bf16"):
+        sharp_model.load_model('cpu', precision=precision)
+        results[precision] = [sharp_model._predict_gaussians(image, f_px)
+                              for image, f_px in zip(images, focal_lengths)]
+        start = time.perf_counter()
+        for _ in range(runs):
+            for image, f_px in zip(images, focal_lengths):
+                sharp_model._predict_gaussians(image, f_px)
+        seconds = (time.perf_counter() - start) / (runs * len(images))
+        print(f"  {precision}: {seconds:.1f}s per image")
+        rows.append({"model": "sharp", "precision": precision, "seconds_per_image": seconds})
+
+    deltas = [compare_gaussians(reference, candidate)
+              for reference, candidate in zip(results["fp32"], results["bf16"])]
+    summary = {name: float(np.mean([delta[name] for delta in deltas])) for name in deltas[0]}
+    speedup = rows[0]["seconds_per_image"] / rows[1]["seconds_per_image"]
+    rows[1].update(summary, speedup=speedup)
+    print(f"  bf16 vs fp32: {speedup:.2f}x, position error {summary['position_pct']:.2f}% "
+          f"(p99 {summary['position_p99_pct']:.2f}%), scale log error {summary['scale_log_mae']:.3f}, "
+          f"color {summary['color_mae']:.4f}, opacity {summary['opacity_mae']:.4f}")
+    sharp_model.unload_model()
+    return rows
+
+
+def check_sharp(rows, max_position_pct, max_opacity_mae) -> bool:
+    """Print whether the bf16 row of benchmark_sharp is within tolerance; returns the verdict."""
+    bf16 = next(row for row in rows if row["precision"] == "bf16")
+    failures = []
+    if bf16["position_pct"] > max_position_pct:
+        failures.append(f"position error {bf16['position_pct']:.2f}% > {max_position_pct}%")
+    if bf16["opacity_mae"] > max_opacity_mae:
+        failures.append(f"opacity error {bf16['opacity_mae']:.4f} > {max_opacity_mae}")
+    if failures:
+        print(f"✗ bf16 outside tolerance: {', '.join(failures)}")
+        return False
+    print("✓ bf16 within tolerance")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--models', nargs='*', default=['small', 'base'], choices=list(Config.AVAILABLE_MODELS))
+    parser.add_argument('--backends', nargs='+', default=['torch'], choices=list(ENGINES))
+    parser.add_argument('--sharp', action='store_true', help="Also compare SHARP fp32 against bf16")
+    parser.add_argument('--max-position-pct', type=float, default=MAX_POSITION_PCT,
+                        help="SHARP check: maximum median bf16 position error, in percent of depth")
+    parser.add_argument('--max-opacity-mae', type=float, default=MAX_OPACITY_MAE,
+                        help="SHARP check: maximum mean absolute bf16 opacity error")
+    parser.add_argument('--images', help="Directory of images (default: built-in synthetic set)")
+    parser.add_argument('--runs', type=int, default=3, help="Timed passes over the image set")
+    args = parser.parse_args()
+
+    min_size = SharpModel.INTERNAL_SHAPE if args.sharp else (518, 518)
+    images = load_images(args.images, min_size) if args.images else create_test_images()
+    if not images:
+        print("✗ No images found")
+        sys.exit(1)
+    print(f"Benchmarking on {len(images)} images, {args.runs} timed runs each")
+
+    benchmark_depth(args.models, images, args.runs, args.backends)
+    if args.sharp:
+        rows = benchmark_sharp(images, args.runs)
+        if not check_sharp(rows, args.max_position_pct, args.max_opacity_mae):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
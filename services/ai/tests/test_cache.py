@@ -0,0 +1,99 @@
+"""Tests for the result caches in app.services.cache."""
+import os
+
+from app.services.cache import DiskCache, MemoryCache, ResultCache, content_key
+
+
+def age(cache, key, seconds):
+    """Make key look last used the given number of seconds ago."""
+    path = cache._path(key)
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_content_key_covers_data_and_params():
+    key = content_key(b"image", model="small", precision="fp32")
+    assert key == content_key(b"image", precision="fp32", model="small")
+    assert key != content_key(b"image!", model="small", precision="fp32")
+    assert key != content_key(b"image", model="small", precision="int8")
+    assert content_key(b"image") != content_key(b"image", model="small")
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(30)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.put("c", b"x" * 10)
+    assert cache.get("a") is not None  # a is now the most recent
+    cache.put("d", b"x" * 10)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache.get_stats()["entries"] == 3
+
+
+def test_memory_cache_replaces_and_skips_oversized_values():
+    cache = MemoryCache(30)
+    cache.put("a", b"x" * 20)
+    cache.put("a", b"y" * 5)
+    assert cache.get("a") == b"y" * 5
+    cache.put("big", b"x" * 31)
+    assert cache.get("big") is None
+    assert cache.get("a") is not None
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), 30, suffix=".bin")
+    for index, key in enumerate(("a", "b", "c")):
+        cache.put(key, b"x" * 10)
+        age(cache, key, 100 - index * 10)
+    assert cache.get_path("a") is not None  # refreshes a's mtime
+    cache.put("d", b"x" * 10)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == b"x" * 10 for key in ("a", "c", "d"))
+    assert cache.get_stats()["size_mb"] == round(30 / 2**20, 1)
+
+
+def test_disk_cache_counts_existing_files_and_rewrites(tmp_path):
+    DiskCache(str(tmp_path), 100).put("a", b"x" * 40)
+    cache = DiskCache(str(tmp_path), 100)
+    assert cache._size == 40
+    cache.put("a", b"x" * 10)
+    assert cache._size == 10
+    assert cache.hits == 0 and cache.misses == 0
+    cache.get("a")
+    cache.get("missing")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_cache_tee_commits_only_when_fully_consumed(tmp_path):
+    cache = DiskCache(str(tmp_path), 1000)
+    assert b"".join(cache.tee("full", [b"ab", b"cd"])) == b"abcd"
+    assert cache.get("full") == b"abcd"
+
+    stream = cache.tee("partial", [b"ab", b"cd"])
+    next(stream)
+    stream.close()  # the consumer went away
+    assert cache.get("partial") is None
+    assert [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")] == []
+
+
+def test_result_cache_promotes_disk_hits_to_memory(tmp_path):
+    disk = DiskCache(str(tmp_path), 1000)
+    disk.put("key", b"value")
+    cache = ResultCache(1000, disk)
+    assert cache.memory.get("key") is None
+    assert cache.get("key") == b"value"
+    assert cache.memory.get("key") == b"value"
+    assert cache.get("other") is None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_result_cache_tiers_are_optional():
+    assert not ResultCache(0).enabled
+    cache = ResultCache(100)
+    cache.put("key", b"value")
+    assert cache.get("key") == b"value"
+    assert cache.get_stats()["disk"] is None
@@ -0,0 +1,117 @@
+"""Concurrency tests for RequestCoalescer; every wait is bounded so a regression fails instead of hanging."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models.depth_model import RequestCoalescer
+
+TIMEOUT = 5
+
+
+class BlockingBatches:
+    """run_batch stand-in that records each batch and can hold the first one open."""
+
+    def __init__(self, block_first=False):
+        self.batches = []
+        self.first_started = threading.Event()
+        self.release = threading.Event()
+        if not block_first:
+            self.release.set()
+        self.fail_on = None
+
+    def __call__(self, images, model_key, outputs):
+        self.batches.append((model_key, list(images)))
+        self.first_started.set()
+        assert self.release.wait(TIMEOUT)
+        if self.fail_on in images:
+            raise RuntimeError("forward pass failed")
+        return [{"depth": image * 10, "output": output} for image, output in zip(images, outputs)]
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queued(coalescer, model_key):
+    return coalescer._queues[model_key].qsize()
+
+
+def test_lone_request_runs_without_waiting_for_the_window():
+    run_batch = BlockingBatches()
+    coalescer = RequestCoalescer(run_batch, window_ms=2000, max_batch_size=8)
+    started = time.monotonic()
+    assert coalescer.submit(1, "small", {"dtype": "uint8"}) == {"depth": 10, "output": {"dtype": "uint8"}}
+    assert time.monotonic() - started < 1
+    assert coalescer.get_stats()["batch_size_histogram"] == {1: 1}
+
+
+def test_queued_requests_share_a_batch_and_get_their_own_results():
+    run_batch = BlockingBatches(block_first=True)
+    coalescer = RequestCoalescer(run_batch, window_ms=10, max_batch_size=8)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        first = pool.submit(coalescer.submit, 0, "small")
+        assert run_batch.first_started.wait(TIMEOUT)
+        rest = [pool.submit(coalescer.submit, image, "small", {"n": image}) for image in range(1, 6)]
+        wait_until(lambda: queued(coalescer, "small") == 5)
+        run_batch.release.set()
+
+        assert first.result(TIMEOUT)["depth"] == 0
+        for image, future in enumerate(rest, start=1):
+            assert future.result(TIMEOUT) == {"depth": image * 10, "output": {"n": image}}
+
+    assert [len(images) for _, images in run_batch.batches] == [1, 5]
+    assert coalescer.get_stats()["mean_batch_size"] == 3
+
+
+def test_batches_never_exceed_max_batch_size():
+    run_batch = BlockingBatches(block_first=True)
+    coalescer = RequestCoalescer(run_batch, window_ms=10, max_batch_size=2)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = [pool.submit(coalescer.submit, 0, "small")]
+        assert run_batch.first_started.wait(TIMEOUT)
+        futures += [pool.submit(coalescer.submit, image, "small") for image in range(1, 6)]
+        wait_until(lambda: queued(coalescer, "small") == 5)
+        run_batch.release.set()
+        assert sorted(future.result(TIMEOUT)["depth"] for future in futures) == [0, 10, 20, 30, 40, 50]
+
+    assert [len(images) for _, images in run_batch.batches] == [1, 2, 2, 1]
+
+
+def test_model_keys_do_not_wait_for_each_other():
+    run_batch = BlockingBatches(block_first=True)
+    coalescer = RequestCoalescer(run_batch, window_ms=10, max_batch_size=8)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        blocked = pool.submit(coalescer.submit, 1, "large")
+        assert run_batch.first_started.wait(TIMEOUT)
+        # The "large" batch is still running; "small" gets its own worker
+        other = pool.submit(coalescer.submit, 2, "small")
+        wait_until(lambda: len(run_batch.batches) == 2)
+        assert run_batch.batches[1] == ("small", [2])
+        run_batch.release.set()
+        assert blocked.result(TIMEOUT)["depth"] == 10
+        assert other.result(TIMEOUT)["depth"] == 20
+
+
+def test_a_failed_batch_fails_its_callers_only():
+    run_batch = BlockingBatches(block_first=True)
+    run_batch.fail_on = 3
+    coalescer = RequestCoalescer(run_batch, window_ms=10, max_batch_size=8)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(coalescer.submit, 1, "small")
+        assert run_batch.first_started.wait(TIMEOUT)
+        failing = [pool.submit(coalescer.submit, image, "small") for image in (2, 3)]
+        wait_until(lambda: queued(coalescer, "small") == 2)
+        run_batch.release.set()
+
+        assert first.result(TIMEOUT)["depth"] == 10
+        for future in failing:
+            with pytest.raises(RuntimeError, match="forward pass failed"):
+                future.result(TIMEOUT)
+
+    # The worker survives and serves the next request
+    assert coalescer.submit(4, "small")["depth"] == 40
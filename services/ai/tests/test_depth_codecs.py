@@ -0,0 +1,58 @@
+"""Tests for the depth map encodings in app.utils.depth_codecs."""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.utils.depth_codecs import RAW_HEADER, decode_raw, encode_depth, encode_raw
+
+
+def depth_map(dtype, shape=(48, 64)):
+    ramp = np.linspace(0, 1, shape[0] * shape[1]).reshape(shape)
+    if dtype == "float16":
+        return (ramp * 10 + 0.5).astype(np.float16)
+    return np.round(ramp * np.iinfo(dtype).max).astype(dtype)
+
+
+@pytest.mark.parametrize("encoding,dtype", [("raw16", "uint16"), ("rawf16", "float16")])
+def test_raw_round_trip(encoding, dtype):
+    depth = depth_map(dtype)
+    data = encode_depth({"depth": depth, "depth_min": 0.25, "depth_max": 7.5}, encoding)
+    assert len(data) == RAW_HEADER.size + depth.size * 2
+
+    decoded, depth_min, depth_max = decode_raw(data)
+    assert decoded.dtype == depth.dtype
+    np.testing.assert_array_equal(decoded, depth)
+    assert (depth_min, depth_max) == (0.25, 7.5)
+
+
+def test_raw_rejects_other_data():
+    with pytest.raises(ValueError):
+        decode_raw(b"DPTH")
+    with pytest.raises(ValueError):
+        decode_raw(b"\x89PNG" + bytes(RAW_HEADER.size))
+
+
+def test_raw_header_is_little_endian():
+    data = encode_raw(np.zeros((2, 3), dtype=">u2"), 0.0, 1.0)
+    assert data[:4] == b"DPTH"
+    assert int.from_bytes(data[8:12], "little") == 3
+    assert int.from_bytes(data[12:16], "little") == 2
+
+
+@pytest.mark.parametrize("encoding", ["png", "png_fast"])
+def test_png_round_trip(encoding):
+    depth = depth_map("uint8")
+    image = Image.open(io.BytesIO(encode_depth({"depth": depth}, encoding)))
+    assert image.format == "PNG" and image.mode == "L"
+    np.testing.assert_array_equal(np.asarray(image), depth)
+
+
+def test_webp_is_lossless_rgb_replicated():
+    depth = depth_map("uint8")
+    image = Image.open(io.BytesIO(encode_depth({"depth": depth}, "webp")))
+    assert image.format == "WEBP" and image.mode == "RGB"
+    pixels = np.asarray(image)
+    for channel in range(3):
+        np.testing.assert_array_equal(pixels[:, :, channel], depth)
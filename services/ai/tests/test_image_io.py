@@ -0,0 +1,118 @@
+"""Tests for app.utils.image_io."""
+import io
+import math
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.utils.image_io import (
+    EXIF_IFD,
+    FOCAL_LENGTH,
+    FOCAL_LENGTH_35MM,
+    ORIENTATION,
+    ORIENTATION_TRANSPOSE,
+    focal_length_px,
+    load_image,
+)
+
+# Transposition that undoes each orientation's, to build the stored image
+INVERSE_TRANSPOSE = {
+    orientation: Image.Transpose.ROTATE_90 if transpose == Image.Transpose.ROTATE_270
+    else Image.Transpose.ROTATE_270 if transpose == Image.Transpose.ROTATE_90
+    else transpose
+    for orientation, transpose in ORIENTATION_TRANSPOSE.items()
+}
+
+
+def display_image(width, height):
+    """An RGB image whose every quadrant has a different color."""
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:height // 2, :width // 2] = (255, 0, 0)
+    pixels[:height // 2, width // 2:] = (0, 255, 0)
+    pixels[height // 2:, :width // 2] = (0, 0, 255)
+    pixels[height // 2:, width // 2:] = (255, 255, 0)
+    return Image.fromarray(pixels)
+
+
+def encode(image, fmt, orientation=None, focal_35mm=None, focal=None):
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+    if focal_35mm is not None:
+        exif.get_ifd(EXIF_IFD)[FOCAL_LENGTH_35MM] = focal_35mm
+    if focal is not None:
+        exif.get_ifd(EXIF_IFD)[FOCAL_LENGTH] = focal
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def diagonal_px(width, height):
+    return math.hypot(width, height) / math.hypot(36, 24)
+
+
+@pytest.mark.parametrize("orientation", sorted(ORIENTATION_TRANSPOSE))
+def test_exif_orientation_is_applied(orientation):
+    display = display_image(64, 32)
+    data = encode(display.transpose(INVERSE_TRANSPOSE[orientation]), "PNG", orientation=orientation)
+    image, size, _ = load_image(data)
+    assert size == (64, 32)
+    np.testing.assert_array_equal(np.asarray(image), np.asarray(display))
+
+
+def test_jpeg_is_drafted_to_cover_min_size():
+    data = encode(display_image(4000, 3000), "JPEG", focal_35mm=50)
+    image, size, f_px = load_image(data, min_size=(500, 500))
+    assert size == (4000, 3000)
+    assert image.mode == "RGB"
+    # 1/4 scale is the smallest DCT scale still covering 500 px of height
+    assert image.size == (1000, 750)
+    assert f_px == pytest.approx(50 * diagonal_px(4000, 3000))
+
+
+def test_rotated_jpeg_covers_min_size_in_display_orientation():
+    stored = display_image(3000, 4000).transpose(INVERSE_TRANSPOSE[6])
+    data = encode(stored, "JPEG", orientation=6)
+    image, size, _ = load_image(data, min_size=(700, 400))
+    assert size == (3000, 4000)
+    assert image.width >= 700 and image.height >= 400
+    assert image.width < 3000
+    assert image.width / image.height == pytest.approx(3000 / 4000, rel=0.01)
+
+
+def test_other_formats_are_box_reduced():
+    image, size, _ = load_image(encode(display_image(1800, 900), "PNG"), min_size=(300, 300))
+    assert size == (1800, 900)
+    # Largest integer factor whose result still covers 300 px of height
+    assert image.size == (600, 300)
+
+
+def test_palette_images_are_converted_before_reducing():
+    palette = display_image(1200, 800).convert("P")
+    image, size, _ = load_image(encode(palette, "PNG"), min_size=(300, 200))
+    assert image.mode == "RGB"
+    assert image.size == (300, 200)
+
+
+def test_no_min_size_decodes_full_resolution():
+    image, size, _ = load_image(encode(display_image(640, 480), "JPEG"))
+    assert image.size == size == (640, 480)
+
+
+def test_focal_length_defaults_and_crop_factor():
+    assert focal_length_px(None, 3000, 2000) == pytest.approx(30 * diagonal_px(3000, 2000))
+
+    exif = Image.open(io.BytesIO(encode(display_image(8, 8), "JPEG", focal=4.25))).getexif()
+    assert focal_length_px(exif, 3000, 2000) == pytest.approx(4.25 * 8.4 * diagonal_px(3000, 2000))
+
+    exif = Image.open(io.BytesIO(encode(display_image(8, 8), "JPEG", focal=24, focal_35mm=28))).getexif()
+    assert focal_length_px(exif, 3000, 2000) == pytest.approx(28 * diagonal_px(3000, 2000))
+
+
+def test_accepts_paths_and_file_objects(tmp_path):
+    data = encode(display_image(64, 48), "PNG")
+    path = tmp_path / "image.png"
+    path.write_bytes(data)
+    assert load_image(str(path))[1] == (64, 48)
+    assert load_image(io.BytesIO(data))[1] == (64, 48)
@@ -0,0 +1,122 @@
+"""Concurrency tests for app.utils.locks; every wait is bounded so a regression fails instead of hanging."""
+import threading
+import time
+
+from app.utils.locks import ReadWriteLock
+
+TIMEOUT = 5
+
+
+def start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def join(*threads):
+    for thread in threads:
+        thread.join(TIMEOUT)
+        assert not thread.is_alive()
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    barrier = threading.Barrier(3, timeout=TIMEOUT)
+
+    def reader():
+        with lock.read():
+            barrier.wait()  # only passes if all three hold the lock at once
+
+    join(*[start(reader) for _ in range(3)])
+
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    entered = threading.Event()
+    def reader():
+        with lock.read():
+            entered.set()
+
+    with lock.write():
+        reader_thread = start(reader)
+        assert not entered.wait(0.1)
+    assert entered.wait(TIMEOUT)
+    join(reader_thread)
+
+
+def test_writer_waits_for_readers_then_runs_alone():
+    lock = ReadWriteLock()
+    events = []
+    reading = threading.Event()
+    release = threading.Event()
+
+    def reader():
+        with lock.read():
+            reading.set()
+            release.wait(TIMEOUT)
+            events.append("read done")
+
+    def writer():
+        with lock.write():
+            events.append("write")
+
+    reader_thread = start(reader)
+    assert reading.wait(TIMEOUT)
+    writer_thread = start(writer)
+    time.sleep(0.05)
+    assert events == []
+    release.set()
+    join(reader_thread, writer_thread)
+    assert events == ["read done", "write"]
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    events = []
+    reading = threading.Event()
+    release = threading.Event()
+
+    def first_reader():
+        with lock.read():
+            reading.set()
+            release.wait(TIMEOUT)
+
+    def writer():
+        with lock.write():
+            events.append("write")
+
+    def late_reader():
+        with lock.read():
+            events.append("late read")
+
+    first = start(first_reader)
+    assert reading.wait(TIMEOUT)
+    writer_thread = start(writer)
+    deadline = time.monotonic() + TIMEOUT
+    while not lock._writers_waiting:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    late = start(late_reader)
+    time.sleep(0.05)
+    assert events == []  # the late reader queues behind the writer
+    release.set()
+    join(first, writer_thread, late)
+    assert events == ["write", "late read"]
+
+
+def test_lock_is_released_on_exceptions():
+    lock = ReadWriteLock()
+    for side in (lock.read, lock.write):
+        try:
+            with side():
+                raise ValueError
+        except ValueError:
+            pass
+    done = threading.Event()
+
+    def writer():
+        with lock.write():
+            done.set()
+
+    join(start(writer))
+    assert done.is_set()
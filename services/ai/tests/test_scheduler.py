@@ -0,0 +1,127 @@
+"""Concurrency tests for app.services.scheduler; every wait is bounded so a regression fails instead of hanging."""
+import threading
+import time
+
+import pytest
+
+from app.services.scheduler import QueueFullError, Scheduler
+
+TIMEOUT = 5
+
+LANES = {
+    "interactive": {"priority": 0, "concurrency": 2, "max_queue": 4},
+    "bulk": {"priority": 1, "concurrency": 1, "max_queue": 1},
+}
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queued(scheduler, lane):
+    return scheduler.get_stats()[lane]["queued"]
+
+
+class Holder:
+    """A thread that takes a slot and keeps it until released."""
+
+    def __init__(self, scheduler, lane, started=None):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.started = started
+        self.lane = lane
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(scheduler,), daemon=True)
+        self.thread.start()
+
+    def _run(self, scheduler):
+        try:
+            with scheduler.slot(self.lane):
+                if self.started is not None:
+                    self.started.append(self.lane)
+                self.entered.set()
+                self.release.wait(TIMEOUT)
+        except Exception as e:
+            self.error = e
+            self.entered.set()
+
+    def finish(self):
+        self.release.set()
+        self.thread.join(TIMEOUT)
+        assert not self.thread.is_alive()
+
+
+def test_free_slot_goes_to_the_highest_priority_lane():
+    scheduler = Scheduler(LANES, max_concurrent=1)
+    started = []
+    first = Holder(scheduler, "bulk")
+    assert first.entered.wait(TIMEOUT)
+
+    bulk = Holder(scheduler, "bulk", started)
+    wait_until(lambda: queued(scheduler, "bulk") == 1)
+    interactive = Holder(scheduler, "interactive", started)
+    wait_until(lambda: queued(scheduler, "interactive") == 1)
+
+    first.finish()
+    assert interactive.entered.wait(TIMEOUT)
+    assert not bulk.entered.is_set()
+    interactive.finish()
+    assert bulk.entered.wait(TIMEOUT)
+    bulk.finish()
+    assert started == ["interactive", "bulk"]
+
+
+def test_lane_concurrency_does_not_block_other_lanes():
+    scheduler = Scheduler(LANES, max_concurrent=4)
+    first = Holder(scheduler, "bulk")
+    assert first.entered.wait(TIMEOUT)
+
+    second = Holder(scheduler, "bulk")
+    wait_until(lambda: queued(scheduler, "bulk") == 1)
+    interactive = [Holder(scheduler, "interactive") for _ in range(2)]
+    for holder in interactive:
+        assert holder.entered.wait(TIMEOUT)
+    assert not second.entered.is_set()
+    assert scheduler.get_stats()["interactive"]["running"] == 2
+
+    first.finish()
+    assert second.entered.wait(TIMEOUT)
+    for holder in interactive + [second]:
+        holder.finish()
+    assert scheduler.get_stats()["bulk"]["completed"] == 2
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = Scheduler(LANES, max_concurrent=4)
+    running = Holder(scheduler, "bulk")
+    assert running.entered.wait(TIMEOUT)
+    waiting = Holder(scheduler, "bulk")
+    wait_until(lambda: queued(scheduler, "bulk") == 1)
+
+    with pytest.raises(QueueFullError) as error:
+        with scheduler.slot("bulk"):
+            pass
+    assert error.value.lane == "bulk"
+    assert error.value.retry_after >= 1
+    assert scheduler.get_stats()["bulk"]["rejected"] == 1
+
+    running.finish()
+    assert waiting.entered.wait(TIMEOUT)
+    waiting.finish()
+    assert waiting.error is None
+
+
+def test_slot_is_released_when_the_work_fails():
+    scheduler = Scheduler(LANES, max_concurrent=1)
+    with pytest.raises(RuntimeError):
+        with scheduler.slot("bulk"):
+            raise RuntimeError("inference failed")
+    stats = scheduler.get_stats()["bulk"]
+    assert (stats["running"], stats["completed"]) == (0, 1)
+
+    after = Holder(scheduler, "bulk")
+    assert after.entered.wait(TIMEOUT)
+    after.finish()
@@ -0,0 +1,83 @@
+"""Tests for app.utils.splat_decimation."""
+import numpy as np
+
+from app.utils.splat_decimation import decimate, importance, merge_cells, prune
+from app.utils.splat_io import SPLAT_FIELDS, sort_splats, splat_count
+
+
+def make_splats(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return sort_splats({
+        "means": rng.uniform(-1, 1, (count, 3)).astype(np.float32) + [0, 0, 3],
+        "scales": rng.uniform(0.001, 0.05, (count, 3)).astype(np.float32),
+        "quaternions": rng.normal(size=(count, 4)).astype(np.float32),
+        "colors": rng.uniform(0, 1, (count, 3)).astype(np.float32),
+        "opacities": rng.uniform(0.05, 1, count).astype(np.float32),
+    })
+
+
+def kept_indices(splats, subset):
+    """Indices of subset's Gaussians in splats (matched by position)."""
+    lookup = {tuple(mean): index for index, mean in enumerate(splats["means"].tolist())}
+    return np.array([lookup[tuple(mean)] for mean in subset["means"].tolist()])
+
+
+def test_importance_grows_with_opacity_and_footprint_and_falls_with_depth():
+    splats = {
+        "means": np.array([[0, 0, 1], [0, 0, 1], [0, 0, 1], [0, 0, 2]], dtype=np.float32),
+        "scales": np.array([[0.1, 0.1, 0.1], [0.1, 0.1, 0.1], [0.1, 0.2, 0.2], [0.1, 0.1, 0.1]], dtype=np.float32),
+        "opacities": np.array([0.5, 1.0, 0.5, 0.5], dtype=np.float32),
+    }
+    score = importance(splats)
+    assert score[1] == 2 * score[0]
+    np.testing.assert_allclose(score[2], 4 * score[0])
+    np.testing.assert_allclose(score[3], score[0] / 4)
+
+
+def test_prune_keeps_the_most_important_in_order():
+    splats = make_splats(1000)
+    pruned = prune(splats, 100)
+    assert splat_count(pruned) == 100
+    assert importance(pruned).min() >= np.sort(importance(splats))[-100]
+    assert np.all(np.diff(kept_indices(splats, pruned)) > 0)
+
+
+def test_prune_below_target_is_a_no_op():
+    splats = make_splats(50)
+    assert prune(splats, 100) is splats
+
+
+def test_merge_cells_leaves_at_least_target():
+    splats = make_splats(5000)
+    merged = merge_cells(splats, 500)
+    assert 500 <= splat_count(merged) < 5000
+    assert set(merged) == set(SPLAT_FIELDS)
+    assert all(len(merged[field]) == splat_count(merged) for field in SPLAT_FIELDS)
+
+
+def test_merge_cells_combines_opacity_and_keeps_bounds():
+    splats = make_splats(5000)
+    merged = merge_cells(splats, 500)
+    assert merged["opacities"].max() <= 1.0
+    # Merged opacity is at least that of any single member
+    assert merged["opacities"].mean() > splats["opacities"].mean()
+    assert np.all(merged["means"] >= splats["means"].min(axis=0) - 1e-5)
+    assert np.all(merged["means"] <= splats["means"].max(axis=0) + 1e-5)
+    assert np.all(merged["colors"] >= 0) and np.all(merged["colors"] <= 1)
+
+
+def test_merge_cells_accepts_input_not_sorted_for_its_own_bounding_box():
+    # After a prune the bounding box shrinks, so the old order need not match the new codes
+    splats = prune(make_splats(5000), 2000)
+    shuffled = {field: splats[field][::-1] for field in SPLAT_FIELDS}
+    merged = merge_cells(splats, 200)
+    assert 200 <= splat_count(merged) < 2000
+    # Cells are found from the recomputed codes, whatever the input order
+    np.testing.assert_allclose(merge_cells(shuffled, 200)["opacities"].sum(), merged["opacities"].sum(), rtol=1e-5)
+
+
+def test_decimate_respects_target():
+    splats = make_splats(5000)
+    for merge in (False, True):
+        result = decimate(splats, 300, merge=merge)
+        assert splat_count(result) == 300
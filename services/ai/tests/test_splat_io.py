@@ -0,0 +1,210 @@
+"""Tests for the splat encoders in app.utils.splat_io."""
+import numpy as np
+import pytest
+
+from app.utils.splat_io import (
+    COMPRESSED_CHUNK_PROPERTIES,
+    COMPRESSED_CHUNK_SPLATS,
+    PLY_PROPERTIES,
+    SPLAT_FIELDS,
+    SPLAT_RECORD,
+    chunk_index,
+    compressed_ply_data_offset,
+    compressed_ply_size,
+    iter_compressed_ply,
+    iter_ply,
+    iter_splat,
+    morton_codes,
+    morton_order,
+    ply_header_size,
+    ply_size,
+    sort_splats,
+    splat_file_size,
+    srgb_to_linear,
+)
+
+
+def make_splats(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "means": rng.uniform(-5, 5, (count, 3)).astype(np.float32),
+        "scales": rng.uniform(0.001, 0.5, (count, 3)).astype(np.float32),
+        "quaternions": rng.normal(size=(count, 4)).astype(np.float32),
+        "colors": rng.uniform(0, 1, (count, 3)).astype(np.float32),
+        "opacities": rng.uniform(0, 1, count).astype(np.float32),
+    }
+
+
+def unit_quaternions(quaternions):
+    return quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+
+def split_header(data):
+    end = data.index(b"end_header\n") + len(b"end_header\n")
+    return data[:end].decode("ascii"), data[end:]
+
+
+def unpack_unorm(value, bits):
+    return (value & ((1 << bits) - 1)) / ((1 << bits) - 1)
+
+
+def unpack_rot(value):
+    """PlayCanvas's unpackRot, returning (x, y, z, w)."""
+    norm = 1.0 / (np.sqrt(2) * 0.5)
+    a = (unpack_unorm(value >> 20, 10) - 0.5) * norm
+    b = (unpack_unorm(value >> 10, 10) - 0.5) * norm
+    c = (unpack_unorm(value, 10) - 0.5) * norm
+    m = np.sqrt(max(0.0, 1.0 - (a * a + b * b + c * c)))
+    return {0: (m, a, b, c), 1: (a, m, b, c), 2: (a, b, m, c), 3: (a, b, c, m)}[value >> 30]
+
+
+def unpack_111011(value, low, high):
+    unorm = np.array([unpack_unorm(value >> 21, 11), unpack_unorm(value >> 11, 10), unpack_unorm(value, 11)])
+    return low + unorm * (high - low)
+
+
+def decode_compressed_ply(data):
+    """Decode a compressed PLY the way PlayCanvas does, returning (means, scales, quaternions xyzw, rgba)."""
+    header, body = split_header(data)
+    count = int(next(line.split()[2] for line in header.splitlines() if line.startswith("element vertex")))
+    chunks = -(-count // COMPRESSED_CHUNK_SPLATS)
+    bounds = np.frombuffer(body, dtype="<f4", count=chunks * len(COMPRESSED_CHUNK_PROPERTIES))
+    bounds = bounds.reshape(chunks, len(COMPRESSED_CHUNK_PROPERTIES)).astype(np.float64)
+    packed = np.frombuffer(body, dtype="<u4", offset=bounds.size * 4).reshape(count, 4)
+
+    means, scales, quaternions, rgba = [], [], [], []
+    for i, (position, rotation, scale, color) in enumerate(packed.astype(np.int64)):
+        chunk = bounds[i // COMPRESSED_CHUNK_SPLATS]
+        means.append(unpack_111011(position, chunk[0:3], chunk[3:6]))
+        scales.append(np.exp(unpack_111011(scale, chunk[6:9], chunk[9:12])))
+        quaternions.append(unpack_rot(rotation))
+        rgba.append([unpack_unorm(color >> shift, 8) for shift in (24, 16, 8, 0)])
+    return np.array(means), np.array(scales), np.array(quaternions), np.array(rgba)
+
+
+def test_morton_codes_interleave_axes():
+    # The corners of the unit cube: bit 0 is x, bit 1 is y, bit 2 is z
+    corners = np.array([[x, y, z] for z in (0, 1) for y in (0, 1) for x in (0, 1)], dtype=np.float32)
+    codes = morton_codes(corners)
+    assert codes.dtype == np.int64
+    assert codes[0] == 0
+    assert codes[-1] == (1 << 63) - 1
+    np.testing.assert_array_equal(morton_order(corners), np.arange(8))
+    np.testing.assert_array_equal(codes[1:4], [0x1249249249249249, 0x2492492492492492, 0x36DB6DB6DB6DB6DB])
+
+
+def test_morton_order_keeps_octants_contiguous():
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-1, 1, (4096, 3))
+    positions[:2] = [[-1, -1, -1], [1, 1, 1]]  # pin the bounding box to the octants
+    octants = (positions > 0) @ np.array([1, 2, 4])
+    ordered = octants[morton_order(positions)]
+    # Each octant is one run, in Z order
+    np.testing.assert_array_equal(ordered, np.sort(ordered))
+
+
+def test_morton_codes_handle_degenerate_input():
+    codes = morton_codes(np.array([[1.0, 2.0, 3.0]] * 5 + [[np.nan, 0.0, 0.0]]))
+    assert len(codes) == 6
+    assert np.all(codes >= 0)
+
+
+def test_sort_splats_permutes_every_field():
+    splats = make_splats(500)
+    ordered = sort_splats(splats)
+    order = morton_order(splats["means"])
+    for field in SPLAT_FIELDS:
+        np.testing.assert_array_equal(ordered[field], splats[field][order])
+    assert np.all(np.diff(morton_codes(ordered["means"])) >= 0)
+
+
+def test_chunk_index_covers_every_splat():
+    splats = sort_splats(make_splats(1000))
+    chunks = chunk_index(splats, 256, 16, data_offset=100)
+    assert [chunk["count"] for chunk in chunks] == [256, 256, 256, 232]
+    assert [chunk["first"] for chunk in chunks] == [0, 256, 512, 768]
+    assert chunks[0]["byte_offset"] == 100
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert chunk["byte_offset"] + chunk["byte_length"] == following["byte_offset"]
+
+    for chunk in chunks:
+        positions = splats["means"][chunk["first"]:chunk["first"] + chunk["count"]]
+        np.testing.assert_allclose(chunk["min"], positions.min(axis=0))
+        np.testing.assert_allclose(chunk["max"], positions.max(axis=0))
+
+
+def test_chunks_of_sorted_splats_are_tighter():
+    splats = make_splats(4096)
+
+    def mean_volume(splats):
+        boxes = [np.subtract(chunk["max"], chunk["min"]) for chunk in chunk_index(splats, 256, 16)]
+        return np.mean([np.prod(box) for box in boxes])
+
+    assert mean_volume(sort_splats(splats)) < mean_volume(splats) / 4
+
+
+def test_ply_size_and_round_trip():
+    splats = make_splats(1000)
+    data = b"".join(iter_ply(splats, f_px=512.0, image_size=(640, 480), chunk_splats=300))
+    assert len(data) == ply_size(splats, f_px=512.0, image_size=(640, 480))
+
+    header, body = split_header(data)
+    assert len(header) == ply_header_size(splats, f_px=512.0, image_size=(640, 480))
+    assert "comment focal_px 512.0000" in header
+    rows = np.frombuffer(body, dtype="<f4").reshape(-1, len(PLY_PROPERTIES))
+    np.testing.assert_array_equal(rows[:, 0:3], splats["means"])
+    np.testing.assert_allclose(np.exp(rows[:, 7:10]), splats["scales"], rtol=1e-5)
+    np.testing.assert_array_equal(rows[:, 10:14], splats["quaternions"])
+    np.testing.assert_allclose(1 / (1 + np.exp(-rows[:, 6])), splats["opacities"], atol=1e-5)
+
+
+def test_splat_size_and_round_trip():
+    splats = make_splats(1000)
+    data = b"".join(iter_splat(splats, chunk_splats=300))
+    assert len(data) == splat_file_size(splats) == 1000 * 32
+
+    records = np.frombuffer(data, dtype=SPLAT_RECORD)
+    np.testing.assert_array_equal(records["position"], splats["means"])
+    np.testing.assert_array_equal(records["scale"], splats["scales"])
+    np.testing.assert_allclose(records["color"][:, 3] / 255, splats["opacities"], atol=1 / 255)
+    # Rotation bytes are (w, x, y, z), like the source quaternions
+    decoded = (records["rotation"].astype(np.float64) - 128) / 128
+    np.testing.assert_allclose(decoded, unit_quaternions(splats["quaternions"]), atol=1 / 128)
+
+
+@pytest.mark.parametrize("count", [1, 256, 1000])
+def test_compressed_ply_size(count):
+    splats = make_splats(count)
+    data = b"".join(iter_compressed_ply(splats, f_px=512.0, chunk_splats=512))
+    assert len(data) == compressed_ply_size(splats, f_px=512.0)
+    assert len(data) - compressed_ply_data_offset(splats, f_px=512.0) == count * 16
+
+
+def test_compressed_ply_empty():
+    splats = make_splats(0)
+    data = b"".join(iter_compressed_ply(splats))
+    assert len(data) == compressed_ply_size(splats)
+    assert "element vertex 0" in split_header(data)[0]
+
+
+def test_compressed_ply_round_trip():
+    splats = make_splats(1000)
+    means, scales, quaternions, rgba = decode_compressed_ply(b"".join(iter_compressed_ply(splats)))
+
+    extent = splats["means"].max(axis=0) - splats["means"].min(axis=0)
+    assert np.all(np.abs(means - splats["means"]) <= extent / 1023)
+    np.testing.assert_allclose(scales, splats["scales"], rtol=0.05)
+    np.testing.assert_allclose(srgb_to_linear(rgba[:, :3]), splats["colors"], atol=0.02)
+    np.testing.assert_allclose(rgba[:, 3], splats["opacities"], atol=1 / 255)
+
+
+def test_compressed_ply_rotations_decode_in_playcanvas_order():
+    splats = make_splats(1000)
+    # One splat per component being the largest, in (w, x, y, z) input order
+    splats["quaternions"][:4] = np.eye(4) * 0.9 + 0.1
+    _, _, decoded, _ = decode_compressed_ply(b"".join(iter_compressed_ply(splats)))
+
+    expected = unit_quaternions(splats["quaternions"].astype(np.float64))[:, [1, 2, 3, 0]]
+    # q and -q are the same rotation
+    dots = np.abs(np.sum(decoded * expected, axis=1))
+    assert dots.min() > 0.999